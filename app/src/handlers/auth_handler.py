@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.src.database import get_db
-from app.src.repositories.user_repository import UserRepository
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.src.database import get_async_db
 from app.src.services.auth_service import AuthService
+from app.src.services.password_hasher import PasswordHasherSaturated, PASSWORD_HASH_RETRY_AFTER_SECONDS
 from app.src.schemas.auth import UserCreate, UserResponse, Token
 from typing import Annotated
 
@@ -11,13 +11,22 @@ router = APIRouter(prefix="/api/v1/auth", tags=["auth"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+def hasher_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent logins, try again shortly",
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)}
+    )
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         auth_service = AuthService(db)
-        return auth_service.sign_up(user_data)
+        return await auth_service.sign_up(user_data)
     except HTTPException:
         raise
+    except PasswordHasherSaturated:
+        raise hasher_unavailable()
     except Exception as e:
         print(f"Error during registration: {e}")
         raise HTTPException(
@@ -26,15 +35,17 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         auth_service = AuthService(db)
-        return auth_service.authenticate_user(form_data.username, form_data.password)
+        return await auth_service.authenticate_user(form_data.username, form_data.password)
     except HTTPException:
         raise
+    except PasswordHasherSaturated:
+        raise hasher_unavailable()
     except Exception as e:
         print(f"Error during login: {e}")
         raise HTTPException(
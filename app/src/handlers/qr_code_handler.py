@@ -1,30 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from fastapi.responses import StreamingResponse, RedirectResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status, Request
+from fastapi.responses import FileResponse, StreamingResponse, RedirectResponse, Response
 from sqlalchemy.orm import Session
-from app.src.database import get_db
+from app.src.database import get_db, get_read_db, keep_session_for_streaming
 from app.src.repositories.qr_code_repository import QRCodeRepository
 from app.src.services.qr_code_service import QRCodeService
+from app.src.services.bulk_qr_service import BulkQRCodeService, iter_render_zip
 from app.src.services.auth_service import get_current_user
-from app.src.schemas.qr_code import QRCodeCreate, QRCodeUpdate, QRCodeResponse
-from app.src.schemas.stats import QRCodeStats
-from app.src.models.users import User
-from typing import List
+from app.src.services.image_cache import IMAGE_CACHE_MAX_AGE_SECONDS
+from app.src.services.render_executor import RenderPoolSaturated, RENDER_RETRY_AFTER_SECONDS
+from app.src.schemas.qr_code import QRCodeCreate, QRCodeUpdate, QRCodeResponse, QRCodeListItem, QRRenderVariant
+from app.src.schemas.stats import QRCodeStats, QRCodeTimeseries
+from app.src.services.principal_cache import Principal
+from typing import List, Literal, Optional
 from uuid import UUID
 import base64
+import json
 
 router = APIRouter(prefix="/api/v1/qr-codes", tags=["qr-codes"])
 
+def render_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Image rendering is at capacity, try again shortly",
+        headers={"Retry-After": str(RENDER_RETRY_AFTER_SECONDS)}
+    )
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 def create_qr_code(
     qr_data: QRCodeCreate,
     request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     try:
         service = QRCodeService(db)
         base_url = str(request.base_url).rstrip("/")
-        qr, img_buffer = service.create_qr(qr_data, current_user.uuid, base_url)
+        qr, img_buffer = service.create_qr(qr_data, current_user.uuid, base_url, background_tasks)
         
         filename = f"qr_{qr.uuid}.png"
         return StreamingResponse(
@@ -41,6 +53,8 @@ def create_qr_code(
                 "X-QR-Created-At": str(qr.created_at)
             }
         )
+    except RenderPoolSaturated:
+        raise render_unavailable()
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -50,14 +64,123 @@ def create_qr_code(
             detail=f"Error occurred while creating the QR code: {str(e)}"
         )
 
-@router.get("/", response_model=List[QRCodeResponse])
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+async def bulk_create_qr_codes(
+    request: Request,
+    format: Literal["ndjson", "zip"] = "ndjson",
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Accepts a JSON array or NDJSON (`Content-Type: application/x-ndjson`) of QR codes.
+    Responds with NDJSON of the created records or, with `format=zip`, a ZIP of their PNGs.
+    """
+    try:
+        content_type = request.headers.get("content-type", "")
+        ndjson = "ndjson" in content_type or "jsonl" in content_type
+        service = BulkQRCodeService(db)
+        created = await service.create_from_stream(request.stream(), ndjson, current_user.uuid)
+
+        if format == "zip":
+            base_url = str(request.base_url).rstrip("/")
+            return StreamingResponse(
+                service.iter_zip(created, base_url),
+                media_type="application/zip",
+                status_code=status.HTTP_201_CREATED,
+                headers={"Content-Disposition": 'attachment; filename="qr_codes.zip"'}
+            )
+        return StreamingResponse(
+            service.iter_ndjson(created),
+            media_type="application/x-ndjson",
+            status_code=status.HTTP_201_CREATED
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in bulk QR creation: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error occurred while creating the QR codes"
+        )
+
+@router.post("/render")
+def batch_render_qr_codes(
+    variants: List[QRRenderVariant],
+    request: Request,
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Renders several sizes, colors and formats (`png`, `svg`) of your codes into one ZIP.
+    Each code's matrix is built once and shared by all of its variants.
+    """
+    try:
+        service = BulkQRCodeService(db, read_db)
+        base_url = str(request.base_url).rstrip("/")
+        tasks = service.plan_renders(variants, current_user.uuid, base_url)
+        return StreamingResponse(
+            iter_render_zip(iter(tasks)),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="qr_renders.zip"'}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in batch QR render: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error occurred while rendering the QR codes"
+        )
+
+# The rows are projected by `fields=`, so they are documented here rather than validated with response_model
+LIST_RESPONSES = {
+    200: {
+        "model": List[QRCodeListItem],
+        "description": "A page of codes with the requested fields (all of them when `fields` is omitted)",
+        "headers": {
+            "X-Next-Cursor": {"description": "Value of `cursor` for the next page; absent on the last page", "schema": {"type": "string"}},
+            "X-Total-Count": {"description": "Total codes of the user, with `include_total` and no filters", "schema": {"type": "integer"}}
+        }
+    }
+}
+
+@router.get("/", response_model=None, responses=LIST_RESPONSES)
 def list_qr_codes(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. uuid,url"),
+    url_prefix: Optional[str] = Query(None, description="Only codes whose URL starts with this"),
+    color: Optional[str] = None,
+    include_total: bool = Query(False, description="Adds X-Total-Count (ignored when filtering)"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    read_db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
+    """
+    Newest first. The next page is requested with the `X-Next-Cursor` response header
+    as `cursor`; the header is absent on the last page.
+    """
     try:
-        service = QRCodeService(db)
-        return service.get_user_qr_codes(current_user.uuid)
+        service = QRCodeService(db, read_db)
+        field_names = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+        rows, next_cursor, total = service.list_qr_codes(
+            current_user.uuid, limit, cursor, field_names, url_prefix, color, include_total
+        )
+
+        headers = {"Access-Control-Expose-Headers": "X-Next-Cursor, X-Total-Count"}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        if total is not None:
+            headers["X-Total-Count"] = str(total)
+        # Rows are already plain dicts; skip response_model validation
+        return Response(
+            content=json.dumps(rows, default=str),
+            media_type="application/json",
+            headers=headers
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error listing QR codes: {e}")
         raise HTTPException(
@@ -69,10 +192,11 @@ def list_qr_codes(
 def get_qr_code(
     qr_uuid: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    read_db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     try:
-        service = QRCodeService(db)
+        service = QRCodeService(db, read_db)
         return service.get_qr_detail(qr_uuid, current_user.uuid)
     except HTTPException:
         raise
@@ -87,12 +211,16 @@ def get_qr_code(
 def update_qr_code(
     qr_uuid: UUID,
     qr_data: QRCodeUpdate,
+    request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    read_db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     try:
-        service = QRCodeService(db)
-        return service.update_qr(qr_uuid, current_user.uuid, qr_data)
+        service = QRCodeService(db, read_db)
+        base_url = str(request.base_url).rstrip("/")
+        return service.update_qr(qr_uuid, current_user.uuid, qr_data, base_url, background_tasks)
     except HTTPException:
         raise
     except Exception as e:
@@ -106,10 +234,12 @@ def update_qr_code(
 def get_qr_image(
     qr_uuid: UUID,
     request: Request,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db)
 ):
     try:
-        qr_repo = QRCodeRepository(db)
+        qr_repo = QRCodeRepository(db, read_db)
         qr = qr_repo.get_by_id(qr_uuid)
         if not qr:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="QR Code not found")
@@ -117,10 +247,28 @@ def get_qr_image(
         base_url = str(request.base_url).rstrip("/")
         tracking_url = f"{base_url}/api/v1/scan/{qr.uuid}"
         
-        img_buffer = QRCodeService.generate_qr_image(qr, tracking_url)
-        return StreamingResponse(img_buffer, media_type="image/png")
+        etag = f'"{QRCodeService.image_etag(qr, tracking_url)}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={IMAGE_CACHE_MAX_AGE_SECONDS}"
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        # A stored image is served as a file, without rendering or reading it into the worker
+        path, png = QRCodeService.get_stored_image(qr, tracking_url)
+        if path:
+            return FileResponse(path, media_type="image/png", headers=headers)
+        if png is None:
+            _, png = QRCodeService.get_qr_png(qr, tracking_url)
+            # Stored after the response, so the next request is served from the store
+            background_tasks.add_task(QRCodeService.store_image, qr, tracking_url, png)
+        return Response(content=png, media_type="image/png", headers=headers)
     except HTTPException:
         raise
+    except RenderPoolSaturated:
+        raise render_unavailable()
     except Exception as e:
         print(f"Error generating QR image: {e}")
         raise HTTPException(
@@ -131,12 +279,17 @@ def get_qr_image(
 @router.get("/{qr_uuid}/stats", response_model=QRCodeStats)
 def get_qr_stats(
     qr_uuid: UUID,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    since: Optional[int] = Query(None, description="Only scans at or after this epoch in ms"),
+    until: Optional[int] = Query(None, description="Only scans before this epoch in ms"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    read_db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     try:
-        service = QRCodeService(db)
-        return service.get_stats(qr_uuid, current_user.uuid)
+        service = QRCodeService(db, read_db)
+        return service.get_stats(qr_uuid, current_user.uuid, limit, cursor, since, until)
     except HTTPException:
         raise
     except Exception as e:
@@ -145,3 +298,56 @@ def get_qr_stats(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error occurred while fetching statistics"
         )
+
+@router.get("/{qr_uuid}/stats/timeseries", response_model=QRCodeTimeseries)
+def get_qr_timeseries(
+    qr_uuid: UUID,
+    granularity: Literal["hour", "day"] = "day",
+    since: Optional[int] = Query(None, description="First bucket start, epoch in ms"),
+    until: Optional[int] = Query(None, description="Exclusive end, epoch in ms"),
+    top: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    try:
+        service = QRCodeService(db, read_db)
+        return service.get_timeseries(qr_uuid, current_user.uuid, granularity, since, until, top)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error getting QR timeseries: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error occurred while fetching statistics"
+        )
+
+@router.get("/{qr_uuid}/scans/export")
+def export_qr_scans(
+    qr_uuid: UUID,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    try:
+        service = QRCodeService(db, read_db)
+        rows = service.export_scans(qr_uuid, current_user.uuid, format, since, until)
+        # Rows are read from the server-side cursor while the body streams
+        keep_session_for_streaming(read_db)
+        media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+        return StreamingResponse(
+            rows,
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="scans_{qr_uuid}.{format}"'}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error exporting QR scans: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error occurred while exporting scans"
+        )
@@ -0,0 +1,88 @@
+"""
+Fast path for scans of cached QR codes.
+A plain ASGI middleware answers GET /api/v1/scan/{uuid} straight from the
+redirect cache and the write-behind queue, skipping routing, dependency
+injection and the AsyncSession. Anything it cannot answer on its own (cache
+miss, unknown uuid, full queue, write-behind disabled) goes through the
+regular handler. Geo lookup is deferred to the ingestion flusher, which only
+resolves locally, so the fast path is on only when that loses nothing: in
+deferred geo mode or with a local geo database (GEO_DB_PATH).
+"""
+
+import os
+import time
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+from uuid import UUID
+from dotenv import load_dotenv
+from app.src.services.redirect_cache import redirect_cache
+from app.src.services.scan_ingestion import ScanRecord, scan_ingestion_queue, SCAN_WRITE_BEHIND
+from app.src.services.geo_resolver import GEO_DB_PATH, GEO_LOOKUP_MODE
+
+load_dotenv()
+
+SCAN_FAST_PATH = os.getenv("SCAN_FAST_PATH", "true").lower() == "true"
+
+SCAN_PATH_PREFIX = "/api/v1/scan/"
+# Labels fast-path requests like the regular route in the metrics middleware
+SCAN_ROUTE = SimpleNamespace(path=SCAN_PATH_PREFIX + "{qr_uuid}")
+
+
+@lru_cache(maxsize=4096)
+def redirect_headers(target_url: str) -> List[Tuple[bytes, bytes]]:
+    # Same headers as RedirectResponse
+    location = quote(target_url, safe=":/%#?=@[]!$&'()*+,;")
+    return [(b"content-length", b"0"), (b"location", location.encode("latin-1"))]
+
+
+def fast_path_available() -> bool:
+    # Inline geo mode without a local database resolves remotely; those scans take the regular handler
+    return SCAN_FAST_PATH and SCAN_WRITE_BEHIND and (GEO_LOOKUP_MODE == "deferred" or bool(GEO_DB_PATH))
+
+
+def client_ip(scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"x-forwarded-for":
+            return value.decode("latin-1").split(",")[0]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class ScanFastPathMiddleware:
+    def __init__(self, app, enabled: Optional[bool] = None):
+        self.app = app
+        self.enabled = fast_path_available() if enabled is None else enabled
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not self.enabled
+            or scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not scope["path"].startswith(SCAN_PATH_PREFIX)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            qr_uuid = UUID(scope["path"][len(SCAN_PATH_PREFIX):])
+        except ValueError:
+            await self.app(scope, receive, send)
+            return
+
+        # The regular handler counts the miss when it looks the uuid up again
+        _, target_url = redirect_cache.lookup(qr_uuid, count_miss=False)
+        if target_url is None:
+            await self.app(scope, receive, send)
+            return
+
+        record = ScanRecord(qr_uuid, client_ip(scope), None, None, int(time.time() * 1000))
+        if not scan_ingestion_queue.offer(record):
+            # Full or shutting down: the regular handler applies the overflow policy
+            await self.app(scope, receive, send)
+            return
+
+        scope["route"] = SCAN_ROUTE
+        await send({"type": "http.response.start", "status": 307, "headers": redirect_headers(target_url)})
+        await send({"type": "http.response.body", "body": b""})
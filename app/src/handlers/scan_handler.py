@@ -1,14 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from app.src.database import get_db
-from app.src.models.qr_code import QRCode
-from app.src.models.scans import Scan
-import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.src.database import get_async_db
 from uuid import UUID
 
 from app.src.services.scan_service import ScanService
-from uuid import UUID
 
 router = APIRouter(prefix="/api/v1", tags=["scans"])
 
@@ -16,7 +12,7 @@ router = APIRouter(prefix="/api/v1", tags=["scans"])
 async def scan_qr_code(
     qr_uuid: UUID,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         service = ScanService(db)
@@ -1,14 +1,57 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.src.database import Base, engine
-from app.src.models import User, QRCode, Scan
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+from app.src.database import engine, read_engine, async_engine, pool_stats, SessionReleaseMiddleware
 from app.src.handlers.auth_handler import router as auth_router
 from app.src.handlers.qr_code_handler import router as qr_router
 from app.src.handlers.scan_handler import router as scan_router
+from app.src.handlers.scan_fast_path import ScanFastPathMiddleware
+from app.src.services.scan_ingestion import scan_ingestion_queue, SCAN_WRITE_BEHIND
+from app.src.services.cache_invalidation import invalidation_listener, CACHE_INVALIDATION_ENABLED
+from app.src.services.geo_resolver import set_geo_resolver
+from app.src.services.render_executor import render_executor, RENDER_WARM_UP
+from app.src.services.image_cache import image_cache
+from app.src.services.metrics import MetricsMiddleware, registry, multiprocess_writer, render_metrics
+from app.src.services.scan_partitions import partition_maintainer
+from app.src.services.password_hasher import password_hasher
+from app.src.services.scan_counters import scan_counters
+from app.src.services.warm_up import warm_up
+from app.src.migrations import upgrade, DB_MIGRATE_ON_STARTUP
 
-app = FastAPI(title="QR Code Management System")
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_MIGRATE_ON_STARTUP:
+        await run_in_threadpool(upgrade)
+    await warm_up()
+    if SCAN_WRITE_BEHIND:
+        scan_ingestion_queue.start()
+    if CACHE_INVALIDATION_ENABLED:
+        invalidation_listener.start()
+    if RENDER_WARM_UP:
+        await run_in_threadpool(render_executor.warm_up)
+    multiprocess_writer.start()
+    partition_maintainer.start()
+    scan_counters.start()
+    yield
+    partition_maintainer.stop()
+    invalidation_listener.stop()
+    # Flush queued scans before the worker exits
+    await run_in_threadpool(scan_ingestion_queue.stop)
+    # After the queue, so the scans it flushed on the way out are merged too
+    await run_in_threadpool(scan_counters.stop)
+    set_geo_resolver(None)
+    await run_in_threadpool(render_executor.shutdown)
+    await run_in_threadpool(password_hasher.shutdown)
+    multiprocess_writer.stop()
+
+
+app = FastAPI(title="QR Code Management System", lifespan=lifespan)
+# Innermost, so cached scans are still measured by the metrics middleware
+app.add_middleware(ScanFastPathMiddleware)
+app.add_middleware(SessionReleaseMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth_router)
@@ -18,3 +61,43 @@ app.include_router(scan_router)
 @app.get("/")
 def read_root():
     return {"message": "Welcome to QR Code Management System API"}
+
+SCAN_INGESTION_STATS = registry.gauge("qr_scan_ingestion", "Scan ingestion queue counters and depth", ["stat"])
+DB_POOL_STATS = registry.gauge("qr_db_pool", "Connection pool state and checkout waits", ["engine", "stat"])
+IMAGE_CACHE_STATS = registry.gauge("qr_image_cache", "Rendered image cache size", ["stat"])
+SCAN_COUNTER_STATS = registry.gauge("qr_scan_counters", "Sharded scan counter merges and pending keys", ["stat"])
+
+
+def collect_runtime_stats() -> None:
+    for stat, value in scan_ingestion_queue.stats().items():
+        SCAN_INGESTION_STATS.set(value, stat=stat)
+    engines = {"primary": engine, "async": async_engine, "replica": read_engine}
+    for name, db_engine in engines.items():
+        if db_engine is None:
+            continue
+        for stat, value in pool_stats(db_engine).items():
+            if isinstance(value, (int, float)):
+                DB_POOL_STATS.set(value, engine=name, stat=stat)
+    for stat, value in image_cache.stats().items():
+        IMAGE_CACHE_STATS.set(value, stat=stat)
+    for stat, value in scan_counters.stats().items():
+        SCAN_COUNTER_STATS.set(value, stat=stat)
+
+
+registry.add_collector(collect_runtime_stats)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/health/scan-ingestion")
+def scan_ingestion_stats():
+    return scan_ingestion_queue.stats()
+
+@app.get("/health/db-pool")
+def db_pool_stats():
+    return {
+        "primary": pool_stats(engine),
+        "async": pool_stats(async_engine),
+        "replica": pool_stats(read_engine) if read_engine is not None else None
+    }
@@ -0,0 +1,138 @@
+"""
+Schema migrations.
+The schema is created and upgraded by an explicit step instead of at import
+time, so workers boot without DDL or catalog queries:
+
+    python -m app.src.migrations upgrade|status
+
+Each migration runs once, in its own transaction, and is recorded in
+schema_migrations; an advisory lock serializes concurrent runs (several
+instances deploying at once). Migrations are no-ops on a schema created from
+the current models, so a fresh database only records them.
+"""
+
+import os
+import sys
+import time
+from typing import Callable, List, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from app.src.database import Base, engine
+
+load_dotenv()
+
+# Convenient for development; deployments run the upgrade once, before the workers start
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "false").lower() == "true"
+
+MIGRATION_LOCK_KEY = 7_317_002
+
+CREATE_VERSION_TABLE = text("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at BIGINT NOT NULL
+    )
+""")
+
+
+def _create_tables(connection: Connection) -> None:
+    # Registers every model on Base.metadata; creating scans also creates its partitions
+    import app.src.models  # noqa: F401
+    Base.metadata.create_all(bind=connection)
+
+
+def _partition_scans(connection: Connection) -> None:
+    from app.src.services.scan_partitions import convert_legacy_table
+    convert_legacy_table(connection)
+
+
+def _shard_scan_counters(connection: Connection) -> None:
+    connection.execute(text("ALTER TABLE qr_scan_counters ADD COLUMN IF NOT EXISTS shard_id SMALLINT NOT NULL DEFAULT 0"))
+    connection.execute(text("ALTER TABLE qr_scan_counters ALTER COLUMN shard_id DROP DEFAULT"))
+    sharded = connection.execute(text("""
+        SELECT 1 FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = 'qr_scan_counters'::regclass AND i.indisprimary AND a.attname = 'shard_id'
+    """)).scalar()
+    if not sharded:
+        connection.execute(text("ALTER TABLE qr_scan_counters DROP CONSTRAINT qr_scan_counters_pkey"))
+        connection.execute(text("ALTER TABLE qr_scan_counters ADD PRIMARY KEY (qr_uuid, shard_id)"))
+
+
+def _qr_code_encoding_columns(connection: Connection) -> None:
+    connection.execute(text("""
+        ALTER TABLE qr_codes
+            ADD COLUMN IF NOT EXISTS error_correction VARCHAR(1),
+            ADD COLUMN IF NOT EXISTS mask_pattern SMALLINT,
+            ADD COLUMN IF NOT EXISTS qr_matrix BYTEA
+    """))
+
+
+def _qr_code_listing_index(connection: Connection) -> None:
+    # create_all never adds indexes to existing tables; the keyset listing needs this one,
+    # and it also serves the per-user lookups the single-column index was for
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_qr_codes_user_uuid_created_at ON qr_codes (user_uuid, created_at, uuid)"))
+    connection.execute(text("DROP INDEX IF EXISTS ix_qr_codes_user_uuid"))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "create_tables", _create_tables),
+    (2, "partition_scans", _partition_scans),
+    (3, "shard_scan_counters", _shard_scan_counters),
+    (4, "qr_code_encoding_columns", _qr_code_encoding_columns),
+    (5, "qr_code_listing_index", _qr_code_listing_index),
+]
+
+
+def applied_versions(connection: Connection) -> set:
+    return {row[0] for row in connection.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def upgrade(db_engine: Engine = engine) -> List[str]:
+    """Applies the pending migrations in order; returns their names."""
+    applied = []
+    with db_engine.connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        connection.commit()
+        try:
+            connection.execute(CREATE_VERSION_TABLE)
+            connection.commit()
+            done = applied_versions(connection)
+            for version, name, migrate in MIGRATIONS:
+                if version in done:
+                    continue
+                migrate(connection)
+                connection.execute(
+                    text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :now)"),
+                    {"version": version, "name": name, "now": int(time.time() * 1000)}
+                )
+                connection.commit()
+                applied.append(name)
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
+    return applied
+
+
+def status(db_engine: Engine = engine) -> List[Tuple[int, str, bool]]:
+    with db_engine.connect() as connection:
+        connection.execute(CREATE_VERSION_TABLE)
+        connection.commit()
+        done = applied_versions(connection)
+    return [(version, name, version in done) for version, name, _ in MIGRATIONS]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("upgrade", "status"):
+        print("usage: python -m app.src.migrations upgrade|status")
+        sys.exit(1)
+    if sys.argv[1] == "upgrade":
+        applied = upgrade()
+        print(f"Applied: {', '.join(applied)}" if applied else "Schema is up to date")
+    else:
+        for version, name, done in status():
+            print(f"{version:>3} {name:<28} {'applied' if done else 'pending'}")
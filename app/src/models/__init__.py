@@ -1,4 +1,8 @@
 """Models package - Contains all database models."""
 from .users import User
 from .qr_code import QRCode
+from .scan_dimensions import ScanCountry, ScanTimezone
 from .scans import Scan
+from .scan_rollups import ScanHourlyRollup, ScanDailyRollup
+from .qr_scan_counter import QRScanCounter
+from .user_qr_counter import UserQRCounter
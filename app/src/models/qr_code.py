@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, BigInteger, ForeignKey, Index
+from sqlalchemy import Column, String, Integer, SmallInteger, BigInteger, LargeBinary, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 import time
@@ -11,6 +11,11 @@ class QRCode(Base):
     url = Column(String, nullable=False)
     color = Column(String, nullable=False)
     size = Column(Integer, nullable=False)
+    # NULL means the defaults: level L and an automatically chosen mask
+    error_correction = Column(String(1), nullable=True)
+    mask_pattern = Column(SmallInteger, nullable=True)
+    # Encoded module matrix as packed bits (see qr_rasterizer.pack_matrix)
+    qr_matrix = Column(LargeBinary, nullable=True)
 
     created_at = Column(BigInteger, default=lambda: int(time.time() * 1000))
     updated_at = Column(
@@ -26,6 +31,7 @@ class QRCode(Base):
     )
 
     __table_args__ = (
-        Index("ix_qr_codes_user_uuid", "user_uuid"),
+        # Serves per-user lookups and the keyset-paginated listing
+        Index("ix_qr_codes_user_uuid_created_at", "user_uuid", "created_at", "uuid"),
         Index("ix_qr_codes_created_at", "created_at"),
     )
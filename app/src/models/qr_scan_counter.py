@@ -0,0 +1,15 @@
+from sqlalchemy import Column, BigInteger, SmallInteger, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from app.src.database import Base
+
+class QRScanCounter(Base):
+    __tablename__ = "qr_scan_counters"
+
+    qr_uuid = Column(
+        UUID(as_uuid=True),
+        ForeignKey("qr_codes.uuid", ondelete="CASCADE"),
+        primary_key=True
+    )
+    # One row per QR and worker shard (see services/scan_counters.py); the total is their sum
+    shard_id = Column(SmallInteger, primary_key=True, default=0)
+    total_scans = Column(BigInteger, nullable=False, default=0)
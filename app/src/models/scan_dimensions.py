@@ -0,0 +1,17 @@
+from sqlalchemy import Column, SmallInteger, String
+from app.src.database import Base
+
+# Dictionary-encoded scan attributes: each distinct name is stored once and
+# scans reference it by a 2-byte id
+
+class ScanCountry(Base):
+    __tablename__ = "scan_countries"
+
+    id = Column(SmallInteger, primary_key=True, autoincrement=True)
+    name = Column(String, nullable=False, unique=True)
+
+class ScanTimezone(Base):
+    __tablename__ = "scan_timezones"
+
+    id = Column(SmallInteger, primary_key=True, autoincrement=True)
+    name = Column(String, nullable=False, unique=True)
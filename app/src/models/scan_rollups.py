@@ -0,0 +1,33 @@
+from sqlalchemy import Column, String, BigInteger, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from app.src.database import Base
+
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+
+class ScanHourlyRollup(Base):
+    __tablename__ = "scan_rollups_hourly"
+
+    qr_uuid = Column(
+        UUID(as_uuid=True),
+        ForeignKey("qr_codes.uuid", ondelete="CASCADE"),
+        primary_key=True
+    )
+    # Bucket start in epoch ms (UTC)
+    bucket_start = Column(BigInteger, primary_key=True)
+    country = Column(String, primary_key=True)
+    timezone = Column(String, primary_key=True)
+    scan_count = Column(BigInteger, nullable=False, default=0)
+
+class ScanDailyRollup(Base):
+    __tablename__ = "scan_rollups_daily"
+
+    qr_uuid = Column(
+        UUID(as_uuid=True),
+        ForeignKey("qr_codes.uuid", ondelete="CASCADE"),
+        primary_key=True
+    )
+    bucket_start = Column(BigInteger, primary_key=True)
+    country = Column(String, primary_key=True)
+    timezone = Column(String, primary_key=True)
+    scan_count = Column(BigInteger, nullable=False, default=0)
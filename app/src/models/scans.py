@@ -1,25 +1,31 @@
-from sqlalchemy import Column, String, BigInteger, ForeignKey, Index
-from sqlalchemy.dialects.postgresql import UUID
-import uuid
-import time
+from sqlalchemy import Column, SmallInteger, BigInteger, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID, INET
 from app.src.database import Base
 
 class Scan(Base):
     __tablename__ = "scans"
 
-    uuid = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # Generated by the database, so batched inserts do not send them
+    uuid = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     qr_uuid = Column(
         UUID(as_uuid=True),
         ForeignKey("qr_codes.uuid", ondelete="CASCADE"),
         nullable=False
     )
-    ip = Column(String, nullable=False)
-    country = Column(String, nullable=True)
-    timezone = Column(String, nullable=True)
-    created_at = Column(BigInteger, default=lambda: int(time.time() * 1000))
+    # NULL when the client address is not an IP (e.g. a unix socket or a test client)
+    ip = Column(INET, nullable=True)
+    country_id = Column(SmallInteger, ForeignKey("scan_countries.id"), nullable=True)
+    timezone_id = Column(SmallInteger, ForeignKey("scan_timezones.id"), nullable=True)
+    # Partition key, so it is part of the primary key
+    created_at = Column(
+        BigInteger,
+        primary_key=True,
+        server_default=text("(extract(epoch from clock_timestamp()) * 1000)::bigint")
+    )
 
     __table_args__ = (
-        Index("ix_scans_qr_uuid", "qr_uuid"),
-        Index("ix_scans_created_at", "created_at"),
-        Index("ix_scans_qr_uuid_created_at", "qr_uuid", "created_at"),
+        # Serves per-QR lookups, time ranges and the (created_at, uuid) keyset;
+        # partitions (see services/scan_partitions.py) replace a global created_at index
+        Index("ix_scans_qr_uuid_created_at", "qr_uuid", "created_at", "uuid"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
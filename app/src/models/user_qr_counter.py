@@ -0,0 +1,13 @@
+from sqlalchemy import Column, BigInteger, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from app.src.database import Base
+
+class UserQRCounter(Base):
+    __tablename__ = "user_qr_counters"
+
+    user_uuid = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.uuid", ondelete="CASCADE"),
+        primary_key=True
+    )
+    total_qr_codes = Column(BigInteger, nullable=False, default=0)
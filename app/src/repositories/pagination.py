@@ -0,0 +1,24 @@
+"""Opaque keyset cursors shared by the paginated repository queries."""
+
+import base64
+import json
+from typing import Tuple
+from uuid import UUID
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: int, row_uuid: UUID) -> str:
+    raw = json.dumps([created_at, str(row_uuid)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_uuid = json.loads(raw)
+        return int(created_at), UUID(row_uuid)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
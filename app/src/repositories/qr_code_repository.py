@@ -1,76 +1,359 @@
+from sqlalchemy import insert, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.src.models.qr_code import QRCode
+from app.src.models.user_qr_counter import UserQRCounter
 from app.src.schemas.qr_code import QRCodeCreate, QRCodeUpdate
+from app.src.repositories.pagination import encode_cursor, decode_cursor
+from app.src.services.cache_invalidation import publish
+from app.src.services.redirect_cache import redirect_cache
+from app.src.services.scan_counters import scan_counters
 from uuid import UUID
-from typing import List
+from typing import Iterator, List, Optional, Sequence, Tuple
+import time
+import uuid
+
+# Columns the listing can project with `fields=`
+LISTABLE_FIELDS = {
+    "uuid": QRCode.uuid,
+    "url": QRCode.url,
+    "color": QRCode.color,
+    "size": QRCode.size,
+    "error_correction": QRCode.error_correction,
+    "mask_pattern": QRCode.mask_pattern,
+    "user_uuid": QRCode.user_uuid,
+    "created_at": QRCode.created_at,
+    "updated_at": QRCode.updated_at
+}
+
+# Seeds a missing counter from the table, so rows created before the counter existed are included
+BUMP_USER_COUNTER = text("""
+    INSERT INTO user_qr_counters (user_uuid, total_qr_codes)
+    VALUES (:user_uuid, (SELECT COUNT(*) FROM qr_codes WHERE user_uuid = :user_uuid))
+    ON CONFLICT (user_uuid)
+    DO UPDATE SET total_qr_codes = user_qr_counters.total_qr_codes + :amount
+""")
+
+# Scan rows with the dictionary-encoded country/timezone decoded back to names
+SCAN_COLUMNS = "uuid, qr_uuid, host(ip), scan_countries.name, scan_timezones.name, created_at"
+SCAN_SOURCE = """scans
+            LEFT JOIN scan_countries ON scan_countries.id = scans.country_id
+            LEFT JOIN scan_timezones ON scan_timezones.id = scans.timezone_id"""
 
 class QRCodeRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, read_db: Session | None = None):
         self.db = db
+        # Read-only queries go to the replica session when one is given
+        self.read_db = read_db if read_db is not None else db
 
-    def create(self, qr_data: QRCodeCreate, user_uuid: UUID) -> QRCode:
+    def create(
+        self,
+        qr_data: QRCodeCreate,
+        user_uuid: UUID,
+        qr_uuid: UUID | None = None,
+        qr_matrix: bytes | None = None
+    ) -> QRCode:
         db_qr = QRCode(
             url=qr_data.url,
             color=qr_data.color,
             size=qr_data.size,
+            error_correction=qr_data.error_correction,
+            mask_pattern=qr_data.mask_pattern,
+            qr_matrix=qr_matrix,
             user_uuid=user_uuid
         )
+        if qr_uuid:
+            db_qr.uuid = qr_uuid
         self.db.add(db_qr)
+        self.db.flush()
+        self._bump_user_counter(user_uuid, 1)
         self.db.commit()
         self.db.refresh(db_qr)
         return db_qr
 
+    def create_many(self, items: List[QRCodeCreate], user_uuid: UUID, commit: bool = True) -> List[dict]:
+        """Inserts all items with one multi-row INSERT ... RETURNING; commit=False leaves the transaction open."""
+        if not items:
+            return []
+
+        now = int(time.time() * 1000)
+        rows = [
+            {
+                "uuid": uuid.uuid4(),
+                "url": item.url,
+                "color": item.color,
+                "size": item.size,
+                "error_correction": item.error_correction,
+                "mask_pattern": item.mask_pattern,
+                "user_uuid": user_uuid,
+                "created_at": now,
+                "updated_at": now
+            }
+            for item in items
+        ]
+        result = self.db.execute(
+            insert(QRCode.__table__).values(rows).returning(
+                QRCode.uuid,
+                QRCode.url,
+                QRCode.color,
+                QRCode.size,
+                QRCode.error_correction,
+                QRCode.mask_pattern,
+                QRCode.user_uuid,
+                QRCode.created_at,
+                QRCode.updated_at
+            )
+        )
+        created = [dict(row) for row in result.mappings()]
+        self._bump_user_counter(user_uuid, len(created))
+        if commit:
+            self.db.commit()
+        return created
+
     def get_by_id(self, qr_uuid: UUID) -> QRCode | None:
-        return self.db.query(QRCode).filter(QRCode.uuid == qr_uuid).first()
+        return self.read_db.query(QRCode).filter(QRCode.uuid == qr_uuid).first()
+
+    def get_many(self, qr_uuids: Sequence[UUID]) -> List[QRCode]:
+        return self.read_db.query(QRCode).filter(QRCode.uuid.in_(qr_uuids)).all()
+
+    def get_url(self, qr_uuid: UUID) -> str | None:
+        return self.db.query(QRCode.url).filter(QRCode.uuid == qr_uuid).scalar()
 
     def get_by_user(self, user_uuid: UUID) -> List[QRCode]:
-        return self.db.query(QRCode).filter(QRCode.user_uuid == user_uuid).all()
+        return self.read_db.query(QRCode).filter(QRCode.user_uuid == user_uuid).all()
+
+    def list_by_user(
+        self,
+        user_uuid: UUID,
+        limit: int = 100,
+        cursor: str | None = None,
+        fields: Optional[Sequence[str]] = None,
+        url_prefix: str | None = None,
+        color: str | None = None
+    ) -> Tuple[List[dict], str | None]:
+        """One page of a user's codes, newest first, with only the requested columns."""
+        fields = list(fields) if fields else list(LISTABLE_FIELDS)
+        # The keyset columns are always read to build the next cursor
+        columns = [LISTABLE_FIELDS[name] for name in fields]
+        columns += [column for column in (QRCode.created_at, QRCode.uuid) if column.key not in fields]
+
+        query = select(*columns).where(QRCode.user_uuid == user_uuid)
+        if url_prefix:
+            query = query.where(QRCode.url.startswith(url_prefix, autoescape=True))
+        if color:
+            query = query.where(QRCode.color == color)
+        if cursor:
+            cursor_created_at, cursor_uuid = decode_cursor(cursor)
+            query = query.where(tuple_(QRCode.created_at, QRCode.uuid) < (cursor_created_at, cursor_uuid))
+        query = query.order_by(QRCode.created_at.desc(), QRCode.uuid.desc()).limit(limit + 1)
+
+        # Plain mappings: no ORM instances or identity map for large pages
+        rows = self.read_db.execute(query).mappings().all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["uuid"])
+        return [{name: row[name] for name in fields} for row in rows], next_cursor
+
+    def count_by_user(self, user_uuid: UUID) -> int:
+        total = self.read_db.execute(
+            select(UserQRCounter.total_qr_codes).where(UserQRCounter.user_uuid == user_uuid)
+        ).scalar()
+        if total is None:
+            # Only users who never created a code through the counter-aware paths get here
+            total = self.read_db.execute(
+                text("SELECT COUNT(*) FROM qr_codes WHERE user_uuid = :user_uuid"),
+                {"user_uuid": user_uuid}
+            ).scalar()
+        return total
+
+    def _bump_user_counter(self, user_uuid: UUID, amount: int) -> None:
+        if amount:
+            self.db.execute(BUMP_USER_COUNTER, {"user_uuid": user_uuid, "amount": amount})
 
     def update(self, qr_uuid: UUID, qr_data: QRCodeUpdate) -> QRCode | None:
-        db_qr = self.get_by_id(qr_uuid)
+        db_qr = self.db.query(QRCode).filter(QRCode.uuid == qr_uuid).first()
         if not db_qr:
             return None
         
         update_data = qr_data.model_dump(exclude_unset=True)
+        url_changed = "url" in update_data and update_data["url"] != db_qr.url
         for key, value in update_data.items():
             setattr(db_qr, key, value)
-        
+
+        if url_changed:
+            publish(self.db, "redirect", str(qr_uuid))
         self.db.commit()
+        if url_changed:
+            redirect_cache.invalidate(qr_uuid)
+
         self.db.refresh(db_qr)
         return db_qr
 
-    def get_stats(self, qr_uuid: UUID) -> dict:
+    def get_stats(
+        self,
+        qr_uuid: UUID,
+        limit: int = 100,
+        cursor: str | None = None,
+        since: int | None = None,
+        until: int | None = None
+    ) -> dict:
         # Requirement: Use native SQL for statistics
         from sqlalchemy import text
         
-        # Fetch total count
-        total_scans = self.db.execute(
-            text("SELECT COUNT(*) FROM scans WHERE qr_uuid = :qr_uuid"),
+        # Total count comes from the sharded counters maintained at ingestion, not COUNT(*)
+        total_scans = self.read_db.execute(
+            text("SELECT COALESCE(SUM(total_scans), 0) FROM qr_scan_counters WHERE qr_uuid = :qr_uuid"),
             {"qr_uuid": qr_uuid}
-        ).scalar() or 0
-
-        # Fetch detailed logs
-        scans_query = text("""
-            SELECT uuid, qr_uuid, ip, country, timezone, created_at 
-            FROM scans 
-            WHERE qr_uuid = :qr_uuid 
-            ORDER BY created_at DESC
+        ).scalar() + scan_counters.pending(qr_uuid)
+
+        # Fetch one page of detailed logs, newest first, keyset-paginated on (created_at, uuid)
+        where, params = self._scan_filters(qr_uuid, since, until)
+        if cursor:
+            cursor_created_at, cursor_uuid = decode_cursor(cursor)
+            where += " AND (created_at, uuid) < (:cursor_created_at, :cursor_uuid)"
+            params.update({"cursor_created_at": cursor_created_at, "cursor_uuid": cursor_uuid})
+
+        scans_query = text(f"""
+            SELECT {SCAN_COLUMNS}
+            FROM {SCAN_SOURCE}
+            WHERE {where}
+            ORDER BY created_at DESC, uuid DESC
+            LIMIT :limit
         """)
-        result = self.db.execute(scans_query, {"qr_uuid": qr_uuid})
+        # One extra row tells whether there is a next page
+        result = self.read_db.execute(scans_query, {**params, "limit": limit + 1})
         
-        scans = []
-        for row in result:
-            scans.append({
-                "uuid": row[0],
-                "qr_uuid": row[1],
-                "ip": row[2],
-                "country": row[3],
-                "timezone": row[4],
-                "created_at": row[5]
-            })
+        scans = [self._scan_row(row) for row in result]
+        next_cursor = None
+        if len(scans) > limit:
+            scans = scans[:limit]
+            next_cursor = encode_cursor(scans[-1]["created_at"], scans[-1]["uuid"])
 
         return {
             "qr_uuid": qr_uuid,
             "total_scans": total_scans,
-            "scans": scans
+            "scans": scans,
+            "next_cursor": next_cursor
         }
+
+    def get_scan_timeseries(
+        self,
+        qr_uuid: UUID,
+        granularity: str = "day",
+        since: int | None = None,
+        until: int | None = None,
+        top: int = 10
+    ) -> dict:
+        """Time series and top-N breakdowns from the rollup tables in one round trip."""
+        from sqlalchemy import text
+
+        table = "scan_rollups_hourly" if granularity == "hour" else "scan_rollups_daily"
+        where = "qr_uuid = :qr_uuid"
+        params = {"qr_uuid": qr_uuid, "top": top}
+        if since is not None:
+            where += " AND bucket_start >= :since"
+            params["since"] = since
+        if until is not None:
+            where += " AND bucket_start < :until"
+            params["until"] = until
+
+        query = text(f"""
+            WITH buckets AS (
+                SELECT bucket_start, country, timezone, scan_count
+                FROM {table}
+                WHERE {where}
+            )
+            SELECT 'series' AS kind, bucket_start, NULL::text AS label, SUM(scan_count) AS scans
+            FROM buckets GROUP BY bucket_start
+            UNION ALL
+            (SELECT 'country', NULL, country, SUM(scan_count)
+             FROM buckets GROUP BY country ORDER BY 4 DESC, 3 LIMIT :top)
+            UNION ALL
+            (SELECT 'timezone', NULL, timezone, SUM(scan_count)
+             FROM buckets GROUP BY timezone ORDER BY 4 DESC, 3 LIMIT :top)
+            UNION ALL
+            SELECT 'total', NULL, NULL, COALESCE(SUM(total_scans), 0)
+            FROM qr_scan_counters WHERE qr_uuid = :qr_uuid
+        """)
+
+        series, countries, timezones = [], [], []
+        total_scans = 0
+        for kind, bucket_start, label, scans in self.read_db.execute(query, params):
+            if kind == "series":
+                series.append({"bucket_start": bucket_start, "scans": scans})
+            elif kind == "country":
+                countries.append({"name": label, "scans": scans})
+            elif kind == "timezone":
+                timezones.append({"name": label, "scans": scans})
+            else:
+                total_scans = scans + scan_counters.pending(qr_uuid)
+
+        series.sort(key=lambda point: point["bucket_start"])
+        return {
+            "qr_uuid": qr_uuid,
+            "granularity": granularity,
+            "total_scans": total_scans,
+            "series": series,
+            "top_countries": countries,
+            "top_timezones": timezones
+        }
+
+    def iter_scans(
+        self,
+        qr_uuid: UUID,
+        since: int | None = None,
+        until: int | None = None,
+        batch_size: int = 1000
+    ) -> Iterator[dict]:
+        """Streams every matching scan through a server-side cursor."""
+        from sqlalchemy import text
+
+        where, params = self._scan_filters(qr_uuid, since, until)
+        scans_query = text(f"""
+            SELECT {SCAN_COLUMNS}
+            FROM {SCAN_SOURCE}
+            WHERE {where}
+            ORDER BY created_at DESC, uuid DESC
+        """).execution_options(stream_results=True, yield_per=batch_size)
+
+        for row in self.read_db.execute(scans_query, params):
+            yield self._scan_row(row)
+
+    @staticmethod
+    def _scan_filters(qr_uuid: UUID, since: int | None, until: int | None) -> Tuple[str, dict]:
+        where = "qr_uuid = :qr_uuid"
+        params = {"qr_uuid": qr_uuid}
+        if since is not None:
+            where += " AND created_at >= :since"
+            params["since"] = since
+        if until is not None:
+            where += " AND created_at < :until"
+            params["until"] = until
+        return where, params
+
+    @staticmethod
+    def _scan_row(row) -> dict:
+        return {
+            "uuid": row[0],
+            "qr_uuid": row[1],
+            "ip": row[2],
+            "country": row[3],
+            "timezone": row[4],
+            "created_at": row[5]
+        }
+
+
+class AsyncQRCodeRepository:
+    """Read paths used by the async scan endpoint."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_by_id(self, qr_uuid: UUID) -> QRCode | None:
+        result = await self.db.execute(select(QRCode).where(QRCode.uuid == qr_uuid))
+        return result.scalars().first()
+
+    async def get_url(self, qr_uuid: UUID) -> str | None:
+        result = await self.db.execute(select(QRCode.url).where(QRCode.uuid == qr_uuid))
+        return result.scalar()
@@ -0,0 +1,198 @@
+import ipaddress
+import threading
+from collections import Counter
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.src.models.scans import Scan
+from app.src.models.scan_dimensions import ScanCountry, ScanTimezone
+from app.src.models.scan_rollups import ScanHourlyRollup, ScanDailyRollup, HOUR_MS, DAY_MS
+from app.src.services.scan_counters import scan_counters, counter_upsert_statement
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class DimensionCache:
+    """In-process name -> id map of a lookup table (countries, timezones)."""
+
+    def __init__(self, model):
+        self.model = model
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: Optional[str]) -> Optional[int]:
+        return self._ids.get(name) if name is not None else None
+
+    def missing(self, names: Iterable[Optional[str]]) -> List[str]:
+        # Sorted so concurrent flushers insert new names in the same order
+        return sorted({name for name in names if name is not None and name not in self._ids})
+
+    def upsert_statement(self, names: List[str]):
+        statement = pg_insert(self.model).values([{"name": name} for name in names])
+        # A no-op update instead of DO NOTHING, so RETURNING also yields names that already existed
+        return statement.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"name": statement.excluded.name}
+        ).returning(self.model.name, self.model.id)
+
+    def update(self, ids: Dict[str, int]) -> None:
+        with self._lock:
+            self._ids.update(ids)
+
+    def load(self, db: Session) -> int:
+        """Caches every existing name; returns how many there are."""
+        ids = dict(db.execute(select(self.model.name, self.model.id)).all())
+        self.update(ids)
+        return len(ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+
+
+country_ids = DimensionCache(ScanCountry)
+timezone_ids = DimensionCache(ScanTimezone)
+
+
+def normalize_ip(ip: Optional[str]) -> Optional[str]:
+    try:
+        return str(ipaddress.ip_address(ip.strip()))
+    except (AttributeError, ValueError):
+        return None
+
+
+def build_scan_rows(records: Iterable) -> List[dict]:
+    return [
+        {
+            "qr_uuid": record.qr_uuid,
+            "ip": normalize_ip(record.ip),
+            "country": record.country,
+            "timezone": record.timezone,
+            "created_at": record.created_at
+        }
+        for record in records
+    ]
+
+
+def missing_dimensions(rows: List[dict]) -> List[Tuple[DimensionCache, List[str]]]:
+    """Names not cached yet, per lookup table; they are upserted before the scans."""
+    pending = [
+        (country_ids, country_ids.missing(row["country"] for row in rows)),
+        (timezone_ids, timezone_ids.missing(row["timezone"] for row in rows))
+    ]
+    return [(cache, names) for cache, names in pending if names]
+
+
+def build_scan_statements(rows: List[dict], new_ids: Optional[Dict[DimensionCache, Dict[str, int]]] = None) -> List[Tuple]:
+    """The scan insert plus the rollup/counter upserts, as (statement, params) pairs."""
+    new_ids = new_ids or {}
+    new_countries = new_ids.get(country_ids, {})
+    new_timezones = new_ids.get(timezone_ids, {})
+    # uuid is generated by the database; created_at is sent so rollups bucket the same instant
+    scan_rows = [
+        {
+            "qr_uuid": row["qr_uuid"],
+            "ip": row["ip"],
+            "country_id": country_ids.get(row["country"]) or new_countries.get(row["country"]),
+            "timezone_id": timezone_ids.get(row["timezone"]) or new_timezones.get(row["timezone"]),
+            "created_at": row["created_at"]
+        }
+        for row in rows
+    ]
+    # executemany on a Core insert is sent as multi-row VALUES batches
+    statements = [(insert(Scan.__table__), scan_rows)]
+
+    hourly = Counter()
+    daily = Counter()
+    for row in rows:
+        country = row["country"] or "Unknown"
+        timezone = row["timezone"] or "Unknown"
+        hourly[(row["qr_uuid"], row["created_at"] // HOUR_MS * HOUR_MS, country, timezone)] += 1
+        daily[(row["qr_uuid"], row["created_at"] // DAY_MS * DAY_MS, country, timezone)] += 1
+
+    for model, buckets in ((ScanHourlyRollup, hourly), (ScanDailyRollup, daily)):
+        statements.append(_upsert_counts(
+            model,
+            ["qr_uuid", "bucket_start", "country", "timezone"],
+            "scan_count",
+            buckets
+        ))
+    if scan_counters.flush_interval <= 0:
+        statements.append((counter_upsert_statement(scan_counters.shard_id, count_by_qr(rows)), None))
+    return statements
+
+
+def count_by_qr(rows: List[dict]) -> Dict:
+    return Counter(row["qr_uuid"] for row in rows)
+
+
+def count_committed_scans(rows: List[dict]) -> None:
+    # Merged into qr_scan_counters by the counter thread, unless it was done in the transaction
+    if scan_counters.flush_interval > 0:
+        scan_counters.add_many(count_by_qr(rows))
+
+
+def _upsert_counts(model, key_columns: List[str], count_column: str, counts: dict) -> Tuple:
+    # Sorted keys make concurrent flushers lock rows in the same order
+    values = [
+        {**dict(zip(key_columns, key)), count_column: count}
+        for key, count in sorted(counts.items(), key=lambda item: tuple(str(part) for part in item[0]))
+    ]
+    statement = pg_insert(model).values(values)
+    statement = statement.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={count_column: getattr(model, count_column) + statement.excluded[count_column]}
+    )
+    return statement, None
+
+
+class ScanRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(self, record) -> None:
+        self.create_many([record])
+
+    def create_many(self, records: Iterable) -> int:
+        rows = build_scan_rows(records)
+        if not rows:
+            return 0
+
+        new_ids = {
+            cache: dict(self.db.execute(cache.upsert_statement(names)).all())
+            for cache, names in missing_dimensions(rows)
+        }
+        # Rollups and counters are updated in the same transaction as the scans
+        for statement, params in build_scan_statements(rows, new_ids):
+            self.db.execute(statement, params)
+        self.db.commit()
+        # Cached only once committed: a rolled back name has no row to reference
+        for cache, ids in new_ids.items():
+            cache.update(ids)
+        count_committed_scans(rows)
+        return len(rows)
+
+
+class AsyncScanRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create(self, record) -> None:
+        await self.create_many([record])
+
+    async def create_many(self, records: Iterable) -> int:
+        rows = build_scan_rows(records)
+        if not rows:
+            return 0
+
+        new_ids = {
+            cache: dict((await self.db.execute(cache.upsert_statement(names))).all())
+            for cache, names in missing_dimensions(rows)
+        }
+        for statement, params in build_scan_statements(rows, new_ids):
+            await self.db.execute(statement, params)
+        await self.db.commit()
+        for cache, ids in new_ids.items():
+            cache.update(ids)
+        count_committed_scans(rows)
+        return len(rows)
@@ -1,3 +1,5 @@
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.src.models.users import User
 from app.src.schemas.auth import UserCreate
@@ -19,3 +21,29 @@ class UserRepository:
         self.db.commit()
         self.db.refresh(db_user)
         return db_user
+
+
+class AsyncUserRepository:
+    """Queries of the async login and registration endpoints."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_by_email(self, email: str) -> User | None:
+        result = await self.db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
+
+    async def create(self, user_data: UserCreate, hashed_password: str) -> User:
+        db_user = User(
+            email=user_data.email,
+            password_hash=hashed_password
+        )
+        self.db.add(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
+        return db_user
+
+    async def update_password_hash(self, user_uuid: uuid.UUID, password_hash: str) -> None:
+        # A Core update: a rehash is not a password change, so cached tokens stay valid
+        await self.db.execute(update(User).where(User.uuid == user_uuid).values(password_hash=password_hash))
+        await self.db.commit()
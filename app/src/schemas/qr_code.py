@@ -1,12 +1,14 @@
 from pydantic import BaseModel, HttpUrl, Field, ConfigDict, field_validator
 from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
 class QRCodeBase(BaseModel):
     url: str
     color: str = Field(..., description="HEX color (e.g., #000000)")
     size: int = Field(..., description="Dimension in pixels")
+    error_correction: Optional[Literal["L", "M", "Q", "H"]] = Field(None, description="Error correction level (L when omitted)")
+    mask_pattern: Optional[int] = Field(None, ge=0, le=7, description="Mask pattern (chosen automatically when omitted)")
 
 class QRCodeCreate(QRCodeBase):
     pass
@@ -31,3 +33,32 @@ class QRCodeResponse(QRCodeBase):
         if isinstance(v, datetime):
             return int(v.timestamp() * 1000)
         return v
+
+class QRCodeListItem(BaseModel):
+    """A listed code; with `fields=` only the requested keys are present."""
+    uuid: Optional[UUID] = None
+    url: Optional[str] = None
+    color: Optional[str] = None
+    size: Optional[int] = None
+    error_correction: Optional[Literal["L", "M", "Q", "H"]] = None
+    mask_pattern: Optional[int] = None
+    user_uuid: Optional[UUID] = None
+    created_at: Optional[int] = None
+    updated_at: Optional[int] = None
+
+class QRRenderVariant(BaseModel):
+    qr_uuid: UUID
+    size: Optional[int] = Field(None, gt=0, le=8192, description="Defaults to the code's size")
+    color: Optional[str] = Field(None, description="Defaults to the code's color")
+    format: Literal["png", "svg"] = "png"
+
+    @field_validator('color')
+    @classmethod
+    def validate_color(cls, v):
+        if v is not None:
+            from PIL import ImageColor
+            try:
+                ImageColor.getrgb(v)
+            except ValueError:
+                raise ValueError(f"Unknown color: {v}")
+        return v
@@ -8,7 +8,7 @@ class ScanResponse(BaseModel):
 
     uuid: UUID
     qr_uuid: UUID
-    ip: str
+    ip: Optional[str] = None
     country: Optional[str] = None
     timezone: Optional[str] = None
     created_at: int
@@ -24,3 +24,20 @@ class QRCodeStats(BaseModel):
     qr_uuid: UUID
     total_scans: int
     scans: List[ScanResponse]
+    next_cursor: Optional[str] = None
+
+class TimeseriesPoint(BaseModel):
+    bucket_start: int
+    scans: int
+
+class BreakdownEntry(BaseModel):
+    name: str
+    scans: int
+
+class QRCodeTimeseries(BaseModel):
+    qr_uuid: UUID
+    granularity: str
+    total_scans: int
+    series: List[TimeseriesPoint]
+    top_countries: List[BreakdownEntry]
+    top_timezones: List[BreakdownEntry]
@@ -2,15 +2,17 @@ import os
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Annotated
 import jwt
-from passlib.context import CryptContext
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.src.database import get_db
-from app.src.repositories.user_repository import UserRepository
+from app.src.repositories.user_repository import UserRepository, AsyncUserRepository
 from app.src.models.users import User
 from app.src.schemas.auth import UserCreate
+from app.src.services.principal_cache import Principal, principal_cache
+from app.src.services.password_hasher import password_hasher
 
 load_dotenv()
 
@@ -19,19 +21,17 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-here-change-in-product
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 class AuthService:
-    def __init__(self, db: Session):
-        self.user_repo = UserRepository(db)
+    def __init__(self, db: AsyncSession):
+        self.user_repo = AsyncUserRepository(db)
 
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+        return password_hasher.verify_and_update(plain_password, hashed_password)[0]
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        return pwd_context.hash(password)
+        return password_hasher.hash(password)
 
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -53,27 +53,35 @@ class AuthService:
         except jwt.PyJWTError:
             return None
 
-    def sign_up(self, user_data: UserCreate) -> User:
+    async def sign_up(self, user_data: UserCreate) -> User:
         # Check if user exists
-        if self.user_repo.get_by_email(user_data.email):
+        if await self.user_repo.get_by_email(user_data.email):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
         
-        hashed_password = self.get_password_hash(user_data.password)
-        return self.user_repo.create(user_data, hashed_password)
+        # Hashing runs on the password hasher's own threads
+        hashed_password = await password_hasher.hash_async(user_data.password)
+        return await self.user_repo.create(user_data, hashed_password)
 
-    def authenticate_user(self, email: str, password: str) -> dict:
-        user = self.user_repo.get_by_email(email)
-        
-        if not user or not self.verify_password(password, user.password_hash):
+    async def authenticate_user(self, email: str, password: str) -> dict:
+        user = await self.user_repo.get_by_email(email)
+
+        valid, new_hash = (False, None)
+        if user:
+            valid, new_hash = await password_hasher.verify_and_update_async(password, user.password_hash)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        
+
+        # Stored with older hashing parameters: upgrade it now that the password is known
+        if new_hash:
+            await self.user_repo.update_password_hash(user.uuid, new_hash)
+
         access_token = self.create_access_token(
             data={"sub": user.email, "user_id": str(user.uuid)}
         )
@@ -82,13 +90,18 @@ class AuthService:
 def get_current_user(
     token: Annotated[str, Depends(OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login"))],
     db: Session = Depends(get_db)
-) -> User:
+) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+    # Tokens seen before were already verified and their user checked
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     payload = AuthService.decode_token(token)
     if payload is None:
         raise credentials_exception
@@ -101,5 +114,7 @@ def get_current_user(
     user = user_repo.get_by_email(email)
     if user is None:
         raise credentials_exception
-        
-    return user
+
+    principal = Principal(uuid=user.uuid, email=user.email)
+    principal_cache.put(token, principal, payload.get("exp", 0))
+    return principal
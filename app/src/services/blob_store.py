@@ -0,0 +1,124 @@
+"""
+Blob storage for rendered QR artifacts.
+A local directory (keys sharded into two levels of subdirectories) or an
+S3-compatible bucket. The local store exposes file paths, so images can be
+served with FileResponse (sendfile where the server supports it) without
+loading them into the worker. Keys are content-addressed by the caller;
+writes are atomic, so a reader never sees a partial object.
+"""
+
+import mimetypes
+import os
+import tempfile
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "" (disabled), "local" or "s3" (s3 needs the boto3 package)
+IMAGE_ARTIFACT_STORE = os.getenv("IMAGE_ARTIFACT_STORE", "").lower()
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "qr_artifacts")
+BLOB_STORE_S3_BUCKET = os.getenv("BLOB_STORE_S3_BUCKET")
+BLOB_STORE_S3_PREFIX = os.getenv("BLOB_STORE_S3_PREFIX", "qr-images/")
+BLOB_STORE_S3_ENDPOINT_URL = os.getenv("BLOB_STORE_S3_ENDPOINT_URL")
+
+MISSING_OBJECT_CODES = ("NoSuchKey", "404", "NotFound")
+
+
+class BlobStore:
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def put(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Path of a stored object on the local filesystem, if it has one."""
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, directory: str = BLOB_STORE_DIR):
+        self.directory = directory
+
+    def path(self, key: str) -> str:
+        # Two levels of 256 directories keep every directory small
+        return os.path.join(self.directory, key[:2], key[2:4], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self.path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = self.path(key)
+        return path if os.path.exists(path) else None
+
+
+class S3BlobStore(BlobStore):
+    """Any client with the boto3 get_object / put_object / delete_object calls."""
+
+    def __init__(self, client, bucket: str, prefix: str = BLOB_STORE_S3_PREFIX):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except Exception as e:
+            if getattr(e, "response", {}).get("Error", {}).get("Code") in MISSING_OBJECT_CODES:
+                return None
+            raise
+        return response["Body"].read()
+
+    def put(self, key: str, data: bytes) -> None:
+        # A single PUT is atomic: the object is either the old one or the whole new one
+        content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data, ContentType=content_type)
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+
+def create_blob_store(kind: str = IMAGE_ARTIFACT_STORE) -> Optional[BlobStore]:
+    if not kind:
+        return None
+    if kind == "local":
+        return LocalBlobStore(BLOB_STORE_DIR)
+    if kind == "s3":
+        if not BLOB_STORE_S3_BUCKET:
+            raise RuntimeError("IMAGE_ARTIFACT_STORE=s3 requires BLOB_STORE_S3_BUCKET")
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("IMAGE_ARTIFACT_STORE=s3 requires the boto3 package")
+        return S3BlobStore(boto3.client("s3", endpoint_url=BLOB_STORE_S3_ENDPOINT_URL), BLOB_STORE_S3_BUCKET)
+    raise ValueError(f"Unknown image artifact store: {kind}")
+
+
+artifact_store = create_blob_store()
@@ -0,0 +1,306 @@
+"""
+Bulk QR code creation and batch rendering.
+The request body (JSON array or NDJSON) is parsed incrementally and validated
+into a spool file, inserted in chunks with INSERT ... RETURNING in a single
+transaction (a failed chunk leaves nothing behind to reconcile), and the created
+records are spooled again so the response can be streamed as NDJSON or as a ZIP
+of PNGs. Memory use is bounded by the chunk size, not by the number of items.
+Batch rendering groups the requested variants by code, so each code's matrix
+is built once in the render worker and shared by all of its sizes and formats.
+"""
+
+import codecs
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from collections import deque
+from typing import AsyncIterator, Dict, Iterator, List, IO, Optional, Tuple
+from uuid import UUID
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.src.repositories.qr_code_repository import QRCodeRepository
+from app.src.schemas.qr_code import QRCodeCreate, QRRenderVariant
+from app.src.services.render_executor import render_executor, RenderPoolSaturated, RENDER_TIMEOUT_SECONDS
+
+load_dotenv()
+
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", 1000))
+BULK_RENDER_WINDOW = int(os.getenv("BULK_RENDER_WINDOW", 32))
+# Fraction of the render slots (RENDER_MAX_PENDING) all ZIP renders together may hold; the rest stays for /image
+BULK_RENDER_MAX_SHARE = float(os.getenv("BULK_RENDER_MAX_SHARE", 0.5))
+BULK_MAX_ITEM_BYTES = int(os.getenv("BULK_MAX_ITEM_BYTES", 64 * 1024))
+BATCH_RENDER_MAX_VARIANTS = int(os.getenv("BATCH_RENDER_MAX_VARIANTS", 1000))
+
+batch_render_slots = threading.BoundedSemaphore(max(1, int(render_executor.max_pending * BULK_RENDER_MAX_SHARE)))
+
+# One render task: the render_qr_variants arguments for a code and the ZIP entry name of each variant
+RenderTask = Tuple[tuple, List[str]]
+
+
+class _Sink:
+    """Write-only buffer the ZIP writer streams into; drained after every entry."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _invalid_input(detail: str) -> HTTPException:
+    return HTTPException(status_code=422, detail=detail)
+
+
+async def iter_ndjson_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[object]:
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield _parse_line(line, line_number)
+        if len(buffer) > BULK_MAX_ITEM_BYTES:
+            raise _invalid_input(f"Line {line_number + 1} exceeds {BULK_MAX_ITEM_BYTES} bytes")
+    if buffer.strip():
+        yield _parse_line(buffer, line_number + 1)
+
+
+def _parse_line(line: bytes, line_number: int) -> object:
+    try:
+        return json.loads(line)
+    except ValueError:
+        raise _invalid_input(f"Invalid JSON on line {line_number}")
+
+
+async def iter_json_array_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[object]:
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    state = "start"  # start -> value -> separator -> value ... -> end
+
+    async def more() -> bool:
+        nonlocal buffer
+        async for chunk in chunk_iter:
+            buffer += text_decoder.decode(chunk)
+            return True
+        buffer += text_decoder.decode(b"", final=True)
+        return False
+
+    chunk_iter = chunks.__aiter__()
+    has_more = True
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            if not has_more:
+                break
+            has_more = await more()
+            continue
+
+        if state == "start":
+            if buffer[0] != "[":
+                raise _invalid_input("Expected a JSON array or NDJSON")
+            buffer = buffer[1:]
+            state = "first"
+        elif state == "separator":
+            if buffer[0] == ",":
+                buffer = buffer[1:]
+                state = "value"
+            elif buffer[0] == "]":
+                buffer = buffer[1:]
+                state = "end"
+            else:
+                raise _invalid_input("Expected ',' or ']' between array items")
+        elif state == "first" and buffer[0] == "]":
+            buffer = buffer[1:]
+            state = "end"
+        elif state in ("first", "value"):
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                # Most likely an item split across chunks
+                if not has_more or len(buffer) > BULK_MAX_ITEM_BYTES:
+                    raise _invalid_input("Invalid JSON array item")
+                has_more = await more()
+                continue
+            buffer = buffer[end:]
+            state = "separator"
+            yield item
+        else:
+            raise _invalid_input("Unexpected data after the JSON array")
+
+    if state != "end":
+        raise _invalid_input("Unterminated JSON array")
+
+
+class BulkQRCodeService:
+    def __init__(self, db: Session, read_db: Optional[Session] = None):
+        self.qr_repo = QRCodeRepository(db, read_db)
+
+    async def create_from_stream(self, chunks: AsyncIterator[bytes], ndjson: bool, user_uuid: UUID) -> IO[bytes]:
+        """Validates and inserts every item; returns a spool file of the created records (NDJSON)."""
+        items = iter_ndjson_items(chunks) if ndjson else iter_json_array_items(chunks)
+
+        validated = tempfile.TemporaryFile()
+        try:
+            index = 0
+            async for item in items:
+                try:
+                    qr_data = QRCodeCreate.model_validate(item)
+                except ValidationError as e:
+                    raise _invalid_input(f"Item {index}: {e.errors(include_url=False)}")
+                validated.write(qr_data.model_dump_json().encode("utf-8") + b"\n")
+                index += 1
+
+            validated.seek(0)
+            return await run_in_threadpool(self._insert_spooled, validated, user_uuid)
+        finally:
+            validated.close()
+
+    def _insert_spooled(self, validated: IO[bytes], user_uuid: UUID) -> IO[bytes]:
+        created = tempfile.TemporaryFile()
+        try:
+            chunk: List[QRCodeCreate] = []
+            for line in validated:
+                chunk.append(QRCodeCreate.model_validate_json(line))
+                if len(chunk) >= BULK_INSERT_CHUNK_SIZE:
+                    self._insert_chunk(chunk, user_uuid, created)
+                    chunk = []
+            if chunk:
+                self._insert_chunk(chunk, user_uuid, created)
+            self.qr_repo.db.commit()
+        except BaseException:
+            self.qr_repo.db.rollback()
+            created.close()
+            raise
+        created.seek(0)
+        return created
+
+    def _insert_chunk(self, chunk: List[QRCodeCreate], user_uuid: UUID, created: IO[bytes]) -> None:
+        for row in self.qr_repo.create_many(chunk, user_uuid, commit=False):
+            created.write(json.dumps(row, default=str).encode("utf-8") + b"\n")
+
+    @staticmethod
+    def iter_ndjson(created: IO[bytes]) -> Iterator[bytes]:
+        try:
+            while True:
+                data = created.read(64 * 1024)
+                if not data:
+                    break
+                yield data
+        finally:
+            created.close()
+
+    def plan_renders(self, variants: List[QRRenderVariant], user_uuid: UUID, base_url: str) -> List[RenderTask]:
+        if len(variants) > BATCH_RENDER_MAX_VARIANTS:
+            raise _invalid_input(f"At most {BATCH_RENDER_MAX_VARIANTS} variants per request")
+        codes = {
+            qr.uuid: qr for qr in self.qr_repo.get_many(list({variant.qr_uuid for variant in variants}))
+            if qr.user_uuid == user_uuid
+        }
+        missing = sorted({str(variant.qr_uuid) for variant in variants if variant.qr_uuid not in codes})
+        if missing:
+            raise HTTPException(status_code=404, detail=f"QR Code not found: {', '.join(missing)}")
+
+        from PIL import ImageColor
+
+        # Variants grouped by code in request order; repeated variants are rendered once
+        grouped: Dict[UUID, Dict[str, Tuple[int, str, str]]] = {}
+        for variant in variants:
+            qr = codes[variant.qr_uuid]
+            size = variant.size or qr.size
+            color = variant.color or qr.color or "black"
+            name = "qr_%s_%d_%02x%02x%02x.%s" % (qr.uuid, size, *ImageColor.getrgb(color)[:3], variant.format)
+            grouped.setdefault(qr.uuid, {})[name] = (int(size), color, variant.format)
+        return [
+            (
+                (
+                    f"{base_url}/api/v1/scan/{qr_uuid}",
+                    list(entries.values()),
+                    codes[qr_uuid].error_correction,
+                    codes[qr_uuid].mask_pattern,
+                    codes[qr_uuid].qr_matrix
+                ),
+                list(entries)
+            )
+            for qr_uuid, entries in grouped.items()
+        ]
+
+    @staticmethod
+    def iter_zip(created: IO[bytes], base_url: str) -> Iterator[bytes]:
+        def tasks() -> Iterator[RenderTask]:
+            for line in created:
+                record = json.loads(line)
+                tracking_url = f"{base_url}/api/v1/scan/{record['uuid']}"
+                variants = [(int(record["size"]), record["color"] or "black", "png")]
+                yield (tracking_url, variants, record["error_correction"], record["mask_pattern"]), [f"qr_{record['uuid']}.png"]
+
+        try:
+            yield from iter_render_zip(tasks())
+        finally:
+            created.close()
+
+
+def iter_render_zip(tasks: Iterator[RenderTask]) -> Iterator[bytes]:
+    """
+    Streams a ZIP of the rendered variants with up to BULK_RENDER_WINDOW tasks in
+    flight, each holding one of the batch_render_slots shared by every ZIP render.
+    """
+    from app.src.services.qr_rasterizer import render_qr_variants
+
+    slots = batch_render_slots
+    sink = _Sink()
+    pending = deque()
+
+    def write_oldest(archive: zipfile.ZipFile) -> None:
+        names, future = pending.popleft()
+        for name, data in zip(names, future.result(timeout=RENDER_TIMEOUT_SECONDS)):
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            # PNG data is already compressed, SVG is text
+            info.compress_type = zipfile.ZIP_DEFLATED if name.endswith(".svg") else zipfile.ZIP_STORED
+            archive.writestr(info, data)
+
+    try:
+        with zipfile.ZipFile(sink, mode="w") as archive:
+            for args, names in tasks:
+                # Our own renders finish first: writing the oldest frees its slot
+                while len(pending) >= BULK_RENDER_WINDOW or not slots.acquire(blocking=False):
+                    if not pending:
+                        # Other ZIP renders hold every slot
+                        if not slots.acquire(timeout=RENDER_TIMEOUT_SECONDS):
+                            raise RenderPoolSaturated()
+                        break
+                    write_oldest(archive)
+                    yield sink.take()
+                try:
+                    # Blocks for a slot /image requests are holding rather than failing the stream
+                    future = render_executor.submit(render_qr_variants, *args, wait=RENDER_TIMEOUT_SECONDS)
+                except BaseException:
+                    slots.release()
+                    raise
+                future.add_done_callback(lambda _: slots.release())
+                pending.append((names, future))
+
+            while pending:
+                write_oldest(archive)
+                yield sink.take()
+        yield sink.take()
+    finally:
+        for _, future in pending:
+            future.cancel()
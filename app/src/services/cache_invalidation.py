@@ -0,0 +1,93 @@
+"""
+Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+Every worker listens on a single channel; payloads are "<kind>:<key>" and are
+dispatched to the handler registered for that kind.
+"""
+
+import os
+import select
+import threading
+from typing import Callable, Dict, Optional
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.src.database import engine
+
+load_dotenv()
+
+CACHE_INVALIDATION_ENABLED = os.getenv("CACHE_INVALIDATION_ENABLED", "false").lower() == "true"
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "qr_cache_invalidation")
+CACHE_INVALIDATION_RECONNECT_SECONDS = float(os.getenv("CACHE_INVALIDATION_RECONNECT_SECONDS", 5))
+
+_handlers: Dict[str, Callable[[str], None]] = {}
+
+
+def register_handler(kind: str, handler: Callable[[str], None]) -> None:
+    _handlers[kind] = handler
+
+
+def publish(db: Session, kind: str, key: str) -> None:
+    """Queues a notification on the session's transaction; Postgres delivers it on commit."""
+    if not CACHE_INVALIDATION_ENABLED:
+        return
+    db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CACHE_INVALIDATION_CHANNEL, "payload": f"{kind}:{key}"}
+    )
+
+
+def dispatch(payload: str) -> None:
+    kind, _, key = payload.partition(":")
+    handler = _handlers.get(kind)
+    if handler:
+        handler(key)
+
+
+class InvalidationListener:
+    def __init__(self, channel: str = CACHE_INVALIDATION_CHANNEL):
+        self.channel = channel
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                print(f"Cache invalidation listener error: {e}")
+            self._stopping.wait(CACHE_INVALIDATION_RECONNECT_SECONDS)
+
+    def _listen(self) -> None:
+        # A dedicated connection, detached so it never goes back to the pool
+        raw = engine.raw_connection()
+        conn = raw.driver_connection
+        raw.detach()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+
+            while not self._stopping.is_set():
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    dispatch(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+
+invalidation_listener = InvalidationListener()
@@ -0,0 +1,374 @@
+"""
+Geo-IP resolution.
+Resolvers map an IP to {"country", "timezone"}. The default chain is a local
+range database (memory-mapped, searched by bisect) with the ip-api.com HTTP
+lookup as an optional fallback, all behind an LRU of recent IPs.
+
+The local database is built from a CSV of `start_ip,end_ip,country,timezone`:
+
+    python -m app.src.services.geo_resolver build ranges.csv geo.db
+"""
+
+import asyncio
+import bisect
+import csv
+import ipaddress
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+load_dotenv()
+
+GEO_DB_PATH = os.getenv("GEO_DB_PATH")
+GEO_HTTP_FALLBACK = os.getenv("GEO_HTTP_FALLBACK", "true").lower() == "true"
+GEO_HTTP_URL = os.getenv("GEO_HTTP_URL", "http://ip-api.com/json/{ip}")
+GEO_HTTP_TIMEOUT_SECONDS = float(os.getenv("GEO_HTTP_TIMEOUT_SECONDS", 1.0))
+GEO_CACHE_SIZE = int(os.getenv("GEO_CACHE_SIZE", 50000))
+# "inline" resolves during the scan request, "deferred" leaves it to the ingestion flusher
+GEO_LOOKUP_MODE = os.getenv("GEO_LOOKUP_MODE", "inline").lower()
+
+LOCALHOST_INFO = {"country": "Localhost", "timezone": "UTC"}
+UNKNOWN_INFO = {"country": "Unknown", "timezone": "Unknown"}
+
+# File layout: header, fixed-size range records sorted by start, string table.
+# Addresses are stored as 128-bit big-endian ints; IPv4 is mapped into ::ffff:0:0/96.
+_MAGIC = b"QRGEO001"
+_HEADER = struct.Struct(">8sII")
+_KEY_SIZE = 16
+_RECORD = struct.Struct(">16s16sHH")
+
+
+def _ip_key(ip: str) -> Optional[int]:
+    try:
+        address = ipaddress.ip_address(ip.strip())
+    except ValueError:
+        return None
+    if address.version == 4:
+        return int(ipaddress.IPv6Address(f"::ffff:{address}"))
+    return int(address)
+
+
+class GeoResolver:
+    # Remote resolvers are moved off the event loop by resolve_async
+    remote = False
+
+    def resolve(self, ip: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def resolve_async(self, ip: str) -> Optional[dict]:
+        if self.remote:
+            return await run_in_threadpool(self.resolve, ip)
+        return self.resolve(ip)
+
+    def resolve_local(self, ip: str) -> Optional[dict]:
+        """Like resolve, but never waits on a remote lookup."""
+        return None if self.remote else self.resolve(ip)
+
+    def close(self) -> None:
+        pass
+
+
+class _RangeStarts:
+    """Sequence view over the start keys in the mapped file, for bisect."""
+
+    def __init__(self, buffer: mmap.mmap, offset: int, count: int):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> int:
+        start = self.offset + index * _RECORD.size
+        return int.from_bytes(self.buffer[start:start + _KEY_SIZE], "big")
+
+
+class LocalGeoResolver(GeoResolver):
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count, strings_offset = _HEADER.unpack_from(self._buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a geo range database")
+
+        self._records_offset = _HEADER.size
+        self._starts = _RangeStarts(self._buffer, self._records_offset, count)
+        self._strings = self._read_strings(strings_offset)
+
+    def resolve(self, ip: str) -> Optional[dict]:
+        key = _ip_key(ip)
+        if key is None:
+            return None
+
+        index = bisect.bisect_right(self._starts, key) - 1
+        if index < 0:
+            return None
+
+        _, end, country, timezone = _RECORD.unpack_from(
+            self._buffer, self._records_offset + index * _RECORD.size
+        )
+        if key > int.from_bytes(end, "big"):
+            return None
+        return {"country": self._strings[country], "timezone": self._strings[timezone]}
+
+    def close(self) -> None:
+        self._buffer.close()
+        self._file.close()
+
+    def _read_strings(self, offset: int) -> List[str]:
+        (count,) = struct.unpack_from(">I", self._buffer, offset)
+        offset += 4
+        strings = []
+        for _ in range(count):
+            (length,) = struct.unpack_from(">H", self._buffer, offset)
+            offset += 2
+            strings.append(self._buffer[offset:offset + length].decode("utf-8"))
+            offset += length
+        return strings
+
+
+class HttpGeoResolver(GeoResolver):
+    remote = True
+
+    def __init__(self, url_template: str = GEO_HTTP_URL, timeout: float = GEO_HTTP_TIMEOUT_SECONDS, transport=None):
+        import httpx
+
+        self.url_template = url_template
+        self._timeout = httpx.Timeout(timeout)
+        self._transport = transport
+        # One pooled client for the whole worker
+        self._client = httpx.Client(timeout=self._timeout, transport=transport)
+        # Requests go out on the event loop, without holding a threadpool thread
+        self._async_client = None
+        self._async_loop = None
+
+    def resolve(self, ip: str) -> Optional[dict]:
+        if _ip_key(ip) is None:
+            return None
+        try:
+            return self._parse(self._client.get(self.url_template.format(ip=ip)))
+        except Exception:
+            return None
+
+    async def resolve_async(self, ip: str) -> Optional[dict]:
+        if _ip_key(ip) is None:
+            return None
+        try:
+            return self._parse(await self._get_async_client().get(self.url_template.format(ip=ip)))
+        except Exception:
+            return None
+
+    def close(self) -> None:
+        self._client.close()
+        client, loop = self._async_client, self._async_loop
+        self._async_client = self._async_loop = None
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if client is not None and loop is running:
+            running.create_task(client.aclose())
+
+    def _get_async_client(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        # Pooled connections belong to the loop that opened them
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(timeout=self._timeout, transport=self._transport)
+            self._async_loop = loop
+        return self._async_client
+
+    @staticmethod
+    def _parse(response) -> Optional[dict]:
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        if data.get("status", "success") != "success":
+            return None
+        return {
+            "country": data.get("country", "Unknown"),
+            "timezone": data.get("timezone", "Unknown")
+        }
+
+
+class ChainGeoResolver(GeoResolver):
+    def __init__(self, resolvers: List[GeoResolver]):
+        self.resolvers = resolvers
+        self.remote = any(resolver.remote for resolver in resolvers)
+
+    def resolve(self, ip: str) -> Optional[dict]:
+        for resolver in self.resolvers:
+            info = resolver.resolve(ip)
+            if info:
+                return info
+        return None
+
+    async def resolve_async(self, ip: str) -> Optional[dict]:
+        for resolver in self.resolvers:
+            info = await resolver.resolve_async(ip)
+            if info:
+                return info
+        return None
+
+    def resolve_local(self, ip: str) -> Optional[dict]:
+        for resolver in self.resolvers:
+            info = resolver.resolve_local(ip)
+            if info:
+                return info
+        return None
+
+    def close(self) -> None:
+        for resolver in self.resolvers:
+            resolver.close()
+
+
+class CachedGeoResolver(GeoResolver):
+    def __init__(self, resolver: GeoResolver, max_size: int = GEO_CACHE_SIZE):
+        self.resolver = resolver
+        self.remote = resolver.remote
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, ip: str) -> Optional[dict]:
+        found, info = self._lookup(ip)
+        if found:
+            return info
+        info = self.resolver.resolve(ip)
+        self._store(ip, info)
+        return info
+
+    async def resolve_async(self, ip: str) -> Optional[dict]:
+        found, info = self._lookup(ip)
+        if found:
+            return info
+        info = await self.resolver.resolve_async(ip)
+        self._store(ip, info)
+        return info
+
+    def resolve_local(self, ip: str) -> Optional[dict]:
+        # Remote answers cached by earlier lookups are used too
+        found, info = self._lookup(ip)
+        if found:
+            return info
+        info = self.resolver.resolve_local(ip)
+        self._store(ip, info)
+        return info
+
+    def close(self) -> None:
+        self.resolver.close()
+
+    def _lookup(self, ip: str) -> Tuple[bool, Optional[dict]]:
+        with self._lock:
+            if ip not in self._entries:
+                return False, None
+            self._entries.move_to_end(ip)
+            return True, self._entries[ip]
+
+    def _store(self, ip: str, info: Optional[dict]) -> None:
+        # A remote miss may be a timeout, so only definitive answers are kept
+        if self.max_size <= 0 or (info is None and self.remote):
+            return
+        with self._lock:
+            self._entries[ip] = info
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+def build_geo_resolver() -> GeoResolver:
+    resolvers: List[GeoResolver] = []
+    if GEO_DB_PATH:
+        resolvers.append(LocalGeoResolver(GEO_DB_PATH))
+    if GEO_HTTP_FALLBACK:
+        resolvers.append(HttpGeoResolver())
+    return CachedGeoResolver(ChainGeoResolver(resolvers))
+
+
+_geo_resolver: Optional[GeoResolver] = None
+_geo_resolver_lock = threading.Lock()
+
+
+def get_geo_resolver() -> GeoResolver:
+    global _geo_resolver
+    if _geo_resolver is None:
+        with _geo_resolver_lock:
+            if _geo_resolver is None:
+                _geo_resolver = build_geo_resolver()
+    return _geo_resolver
+
+
+def set_geo_resolver(resolver: Optional[GeoResolver]) -> None:
+    global _geo_resolver
+    with _geo_resolver_lock:
+        if _geo_resolver is not None and _geo_resolver is not resolver:
+            _geo_resolver.close()
+        _geo_resolver = resolver
+
+
+def lookup_geo_info(ip: str) -> dict:
+    if ip in ["127.0.0.1", "localhost", "::1"]:
+        return LOCALHOST_INFO
+    return get_geo_resolver().resolve(ip) or UNKNOWN_INFO
+
+
+def lookup_geo_info_local(ip: str) -> dict:
+    """Local database and cache only; a miss is Unknown rather than a remote call."""
+    if ip in ["127.0.0.1", "localhost", "::1"]:
+        return LOCALHOST_INFO
+    return get_geo_resolver().resolve_local(ip) or UNKNOWN_INFO
+
+
+async def lookup_geo_info_async(ip: str) -> dict:
+    if ip in ["127.0.0.1", "localhost", "::1"]:
+        return LOCALHOST_INFO
+    return await get_geo_resolver().resolve_async(ip) or UNKNOWN_INFO
+
+
+def build_geo_database(rows: Iterable[Tuple[str, str, str, str]], path: str) -> int:
+    """Writes (start_ip, end_ip, country, timezone) rows as a range database."""
+    strings: List[str] = []
+    string_ids = {}
+
+    def string_id(value: str) -> int:
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    ranges = []
+    for start_ip, end_ip, country, timezone in rows:
+        start, end = _ip_key(start_ip), _ip_key(end_ip)
+        if start is None or end is None or end < start:
+            raise ValueError(f"Invalid range: {start_ip} - {end_ip}")
+        ranges.append((start, end, string_id(country), string_id(timezone)))
+    ranges.sort()
+
+    strings_offset = _HEADER.size + len(ranges) * _RECORD.size
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(ranges), strings_offset))
+        for start, end, country, timezone in ranges:
+            f.write(_RECORD.pack(start.to_bytes(16, "big"), end.to_bytes(16, "big"), country, timezone))
+        f.write(struct.pack(">I", len(strings)))
+        for value in strings:
+            encoded = value.encode("utf-8")
+            f.write(struct.pack(">H", len(encoded)))
+            f.write(encoded)
+    return len(ranges)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "build":
+        print("usage: python -m app.src.services.geo_resolver build <ranges.csv> <output.db>")
+        sys.exit(1)
+    with open(sys.argv[2], newline="") as source:
+        count = build_geo_database((row[:4] for row in csv.reader(source) if row and row[0] != "start_ip"), sys.argv[3])
+    print(f"Wrote {count} ranges to {sys.argv[3]}")
@@ -0,0 +1,373 @@
+"""
+In-process metrics with Prometheus text exposition.
+Counters, gauges and histograms live in one registry per worker. With
+METRICS_MULTIPROC_DIR set, every worker periodically writes a snapshot there
+and /metrics merges the snapshots of all workers, so any worker can answer a
+scrape for the whole process group.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+METRICS_FLUSH_INTERVAL_SECONDS = float(os.getenv("METRICS_FLUSH_INTERVAL_SECONDS", 5))
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[str, ...]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"values": [[list(key), value] for key, value in self._values.items()]}
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"values": [[list(key), value] for key, value in self._values.items()]}
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (+Inf last), sum
+        self._values: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "buckets": list(self.buckets),
+                "values": [[list(key), list(counts), total] for key, (counts, total) in self._values.items()]
+            }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Called before every snapshot, e.g. to copy queue or pool stats into gauges."""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            metric.name: {
+                "kind": metric.kind,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                **metric.snapshot()
+            }
+            for metric in metrics
+        }
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    """Sums every series across workers (gauges included: depth, in-flight, connections)."""
+    merged: dict = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "values": {}})
+            for entry in metric["values"]:
+                key = tuple(entry[0])
+                if metric["kind"] == "histogram":
+                    counts, total = target["values"].get(key, ([0] * len(entry[1]), 0.0))
+                    target["values"][key] = ([a + b for a, b in zip(counts, entry[1])], total + entry[2])
+                else:
+                    target["values"][key] = target["values"].get(key, 0.0) + entry[1]
+    return merged
+
+
+def _format_labels(labelnames: List[str], key: Tuple, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, key))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_text(merged: dict) -> str:
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        labelnames = metric["labelnames"]
+        for key in sorted(metric["values"]):
+            value = metric["values"][key]
+            if metric["kind"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(list(metric["buckets"]) + [float("inf")], counts):
+                cumulative += count
+                labels = _format_labels(labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labelnames, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+class MultiprocessWriter:
+    """Persists this worker's snapshot to the shared directory on an interval."""
+
+    def __init__(
+        self,
+        metrics_registry: MetricsRegistry,
+        directory: Optional[str],
+        interval: float,
+        worker_id: Optional[str] = None
+    ):
+        self.registry = metrics_registry
+        self.directory = directory
+        self.interval = interval
+        self.worker_id = worker_id
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"worker_{self.worker_id or os.getpid()}.json")
+
+    def start(self) -> None:
+        if not self.directory or (self._thread and self._thread.is_alive()):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self.directory:
+            # Counters and histograms of an exited worker keep counting; its gauges do not
+            snapshot = self.registry.snapshot()
+            self.write({name: metric for name, metric in snapshot.items() if metric["kind"] != "gauge"})
+
+    def write(self, snapshot: Optional[dict] = None) -> None:
+        if not self.directory:
+            return
+        snapshot = self.registry.snapshot() if snapshot is None else snapshot
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error writing metrics snapshot: {e}")
+
+    def read_all(self) -> List[dict]:
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                # A worker is replacing its file right now; it shows up on the next scrape
+                continue
+        return snapshots
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            self.write()
+
+
+registry = MetricsRegistry()
+multiprocess_writer = MultiprocessWriter(registry, METRICS_MULTIPROC_DIR, METRICS_FLUSH_INTERVAL_SECONDS)
+
+
+def render_metrics() -> str:
+    if METRICS_MULTIPROC_DIR:
+        multiprocess_writer.write()
+        return render_text(merge_snapshots(multiprocess_writer.read_all()))
+    return render_text(merge_snapshots([registry.snapshot()]))
+
+
+STAGE_DURATION = registry.histogram(
+    "qr_stage_duration_seconds",
+    "Duration of the internal stages of a request",
+    ["component", "stage"]
+)
+
+
+@contextmanager
+def stage_timer(component: str, stage: str):
+    if not METRICS_ENABLED:
+        yield
+        return
+    with STAGE_DURATION.time(component=component, stage=stage):
+        yield
+
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "qr_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"]
+)
+HTTP_REQUESTS = registry.counter(
+    "qr_http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"]
+)
+HTTP_IN_FLIGHT = registry.gauge("qr_http_requests_in_flight", "HTTP requests being served")
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware, so streaming responses are not buffered."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope; templates keep label cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method=scope["method"], route=route_path)
+            HTTP_REQUESTS.inc(method=scope["method"], route=route_path, status=status_code)
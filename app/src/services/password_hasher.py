@@ -0,0 +1,175 @@
+"""
+Password hashing on a dedicated, bounded thread pool.
+bcrypt and argon2 release the GIL, so hashing runs in parallel on its own
+threads instead of occupying the threadpool shared with every sync endpoint.
+When more hashes are pending than allowed, PasswordHasherSaturated is raised
+and login answers 503 rather than queueing without bound. Hashes made with
+other parameters (or the other scheme) are reported for rehash on login.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+load_dotenv()
+
+# "bcrypt" or "argon2" (argon2 needs the argon2-cffi package)
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt").lower()
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", 12))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv("PASSWORD_ARGON2_TIME_COST", 3))
+PASSWORD_ARGON2_MEMORY_COST_KB = int(os.getenv("PASSWORD_ARGON2_MEMORY_COST_KB", 65536))
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", 4))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 16))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", 1))
+# Successful logins remembered so a burst of the same credentials is verified once (0 = off)
+LOGIN_VERIFY_CACHE_SIZE = int(os.getenv("LOGIN_VERIFY_CACHE_SIZE", 0))
+LOGIN_VERIFY_CACHE_TTL_SECONDS = float(os.getenv("LOGIN_VERIFY_CACHE_TTL_SECONDS", 60))
+
+SCHEMES = ("bcrypt", "argon2")
+
+
+class PasswordHasherSaturated(Exception):
+    pass
+
+
+def build_context(
+    scheme: str = PASSWORD_HASH_SCHEME,
+    bcrypt_rounds: int = PASSWORD_BCRYPT_ROUNDS,
+    argon2_time_cost: int = PASSWORD_ARGON2_TIME_COST,
+    argon2_memory_cost: int = PASSWORD_ARGON2_MEMORY_COST_KB,
+    argon2_parallelism: int = PASSWORD_ARGON2_PARALLELISM
+) -> "CryptContext":
+    # Imported on first use: workers that never hash a password skip passlib
+    from passlib.context import CryptContext
+
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown password hash scheme: {scheme}")
+    if scheme == "argon2":
+        from passlib.hash import argon2
+        if not argon2.has_backend():
+            raise RuntimeError("PASSWORD_HASH_SCHEME=argon2 requires the argon2-cffi package")
+
+    # The other scheme stays verifiable and is deprecated, so its hashes are upgraded on login;
+    # min/max rounds pinned to the configured cost flag hashes made with any other cost
+    return CryptContext(
+        schemes=[scheme] + [other for other in SCHEMES if other != scheme],
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__time_cost=argon2_time_cost,
+        argon2__min_rounds=argon2_time_cost,
+        argon2__max_rounds=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism
+    )
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        context: Optional["CryptContext"] = None,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        verify_cache_size: int = LOGIN_VERIFY_CACHE_SIZE,
+        verify_cache_ttl: float = LOGIN_VERIFY_CACHE_TTL_SECONDS
+    ):
+        self._context = context
+        self.workers = max(1, workers)
+        self.verify_cache_size = verify_cache_size
+        self.verify_cache_ttl = verify_cache_ttl
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._verified: OrderedDict = OrderedDict()
+        # Cache keys are keyed digests, so the cache never holds anything a password can be checked against offline
+        self._cache_secret = os.urandom(32)
+
+    @property
+    def context(self) -> "CryptContext":
+        if self._context is None:
+            with self._lock:
+                if self._context is None:
+                    self._context = build_context()
+        return self._context
+
+    @context.setter
+    def context(self, context: "CryptContext") -> None:
+        self._context = context
+
+    def hash(self, password: str) -> str:
+        return self.context.hash(password)
+
+    def verify_and_update(self, password: str, stored_hash: str) -> Tuple[bool, Optional[str]]:
+        """(valid, new_hash); new_hash is set when the stored hash uses outdated parameters."""
+        key = self._cache_key(password, stored_hash)
+        if self._recently_verified(key):
+            return True, None
+        valid, new_hash = self.context.verify_and_update(password, stored_hash)
+        if valid and new_hash is None:
+            self._remember(key)
+        return valid, new_hash
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run(self.hash, password)
+
+    async def verify_and_update_async(self, password: str, stored_hash: str) -> Tuple[bool, Optional[str]]:
+        if self._recently_verified(self._cache_key(password, stored_hash)):
+            return True, None
+        return await self._run(self.verify_and_update, password, stored_hash)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+
+    async def _run(self, fn: Callable, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherSaturated()
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+                executor = self._executor
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        finally:
+            self._slots.release()
+
+    def _cache_key(self, password: str, stored_hash: str) -> bytes:
+        return hmac.new(self._cache_secret, f"{stored_hash}\0{password}".encode("utf-8"), hashlib.sha256).digest()
+
+    def _recently_verified(self, key: bytes) -> bool:
+        if self.verify_cache_size <= 0:
+            return False
+        with self._lock:
+            expires_at = self._verified.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._verified[key]
+                return False
+            return True
+
+    def _remember(self, key: bytes) -> None:
+        if self.verify_cache_size <= 0:
+            return
+        with self._lock:
+            self._verified[key] = time.monotonic() + self.verify_cache_ttl
+            self._verified.move_to_end(key)
+            while len(self._verified) > self.verify_cache_size:
+                self._verified.popitem(last=False)
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,117 @@
+"""
+Authenticated principal cache.
+Maps a bearer token to the verified principal until the token expires, so
+repeated requests skip both JWT verification and the user lookup. Entries are
+revoked when a user is deleted or changes password.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set
+from uuid import UUID
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.src.models.users import User
+from app.src.services.cache_invalidation import publish, register_handler
+
+load_dotenv()
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+# Upper bound on how long a verified token is trusted without re-checking the user
+PRINCIPAL_CACHE_MAX_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_MAX_TTL_SECONDS", 1800))
+
+
+class Principal(NamedTuple):
+    uuid: UUID
+    email: str
+
+
+class PrincipalCache:
+    def __init__(self, max_size: int = PRINCIPAL_CACHE_SIZE, max_ttl: float = PRINCIPAL_CACHE_MAX_TTL_SECONDS):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._tokens_by_user: Dict[UUID, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(token)
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def put(self, token: str, principal: Principal, token_exp: float) -> None:
+        """Caches a verified token until it expires (epoch seconds), capped at max_ttl."""
+        expires_at = min(float(token_exp), time.time() + self.max_ttl)
+        if self.max_size <= 0 or expires_at <= time.time():
+            return
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (principal, expires_at)
+            self._tokens_by_user.setdefault(principal.uuid, set()).add(token)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def revoke_user(self, user_uuid: UUID) -> None:
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_uuid, ())):
+                self._remove(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry[0].uuid)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry[0].uuid]
+
+
+principal_cache = PrincipalCache()
+
+register_handler("principal", lambda key: principal_cache.revoke_user(UUID(key)))
+
+
+def revoke_principal(db: Session, user_uuid: UUID) -> None:
+    """Revocation hook: drops cached tokens of a user here and, on commit, in other workers."""
+    principal_cache.revoke_user(user_uuid)
+    publish(db, "principal", str(user_uuid))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_revoked_users(session: Session, flush_context) -> None:
+    revoked = {user.uuid for user in session.deleted if isinstance(user, User)}
+    revoked.update(
+        user.uuid for user in session.dirty
+        if isinstance(user, User) and inspect(user).attrs.password_hash.history.has_changes()
+    )
+    for user_uuid in revoked:
+        revoke_principal(session, user_uuid)
+    session.info.setdefault("revoked_principals", set()).update(revoked)
+
+
+@event.listens_for(Session, "after_commit")
+def _revoke_after_commit(session: Session) -> None:
+    # Revoke again once committed, in case a request re-cached the old row meanwhile
+    for user_uuid in session.info.pop("revoked_principals", ()):
+        principal_cache.revoke_user(user_uuid)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_revocations(session: Session) -> None:
+    session.info.pop("revoked_principals", None)
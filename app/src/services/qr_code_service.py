@@ -1,56 +1,171 @@
-import qrcode
-from io import BytesIO
-from PIL import Image
+import csv
+import json
+import os
+from io import BytesIO, StringIO
 from app.src.models.qr_code import QRCode
+from app.src.services.metrics import STAGE_DURATION, METRICS_ENABLED, stage_timer
+from app.src.services.render_executor import render_executor
+from app.src.services.blob_store import artifact_store
 
+from fastapi import BackgroundTasks
 from sqlalchemy.orm import Session
-from app.src.repositories.qr_code_repository import QRCodeRepository
+from app.src.repositories.qr_code_repository import QRCodeRepository, LISTABLE_FIELDS
+from app.src.repositories.pagination import InvalidCursor
 from app.src.schemas.qr_code import QRCodeCreate, QRCodeUpdate
+from app.src.services.image_cache import image_cache
 from uuid import UUID
-from typing import List, Tuple
+import uuid
+from typing import Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SCAN_EXPORT_COLUMNS = ["uuid", "qr_uuid", "ip", "country", "timezone", "created_at"]
+# Stores each new code's encoded matrix, so later renders skip the encoding
+QR_MATRIX_PERSIST = os.getenv("QR_MATRIX_PERSIST", "true").lower() == "true"
 
 class QRCodeService:
-    def __init__(self, db: Session):
-        self.qr_repo = QRCodeRepository(db)
+    def __init__(self, db: Session, read_db: Optional[Session] = None):
+        self.qr_repo = QRCodeRepository(db, read_db)
 
     @staticmethod
-    def generate_qr_image(qr_model: QRCode, tracking_url: str) -> BytesIO:
-        # Create QR code instance
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
+    def render_qr_png(qr_model: QRCode, tracking_url: str) -> Tuple[bytes, bytes]:
+        """PNG bytes and the packed matrix they were drawn from."""
+        # Imported on first render: workers that only serve scans never load qrcode, numpy or Pillow
+        from app.src.services.qr_rasterizer import render_qr_png_timed
+
+        # Rendering is CPU-bound, so it runs on the dedicated render executor
+        png, timings, packed_matrix = render_executor.run(
+            render_qr_png_timed,
+            tracking_url,
+            int(qr_model.size),
+            qr_model.color if qr_model.color else "black",
+            qr_model.error_correction,
+            qr_model.mask_pattern,
+            getattr(qr_model, "qr_matrix", None)
         )
-        
-        # Add tracking URL as data
-        qr.add_data(tracking_url)
-        qr.make(fit=True)
-
-        # Create image with specific color
-        fill_color = qr_model.color if qr_model.color else "black"
-        
-        img = qr.make_image(fill_color=fill_color, back_color="white")
-        
-        # Resize if needed
-        size_px = int(qr_model.size)
-        img = img.resize((size_px, size_px), Image.Resampling.LANCZOS)
-        
-        # Save to buffer
-        img_byte_arr = BytesIO()
-        img.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
-        
-        return img_byte_arr
-
-    def create_qr(self, qr_data: QRCodeCreate, user_uuid: UUID, base_url: str) -> Tuple[QRCode, BytesIO]:
-        qr = self.qr_repo.create(qr_data, user_uuid)
-        tracking_url = f"{base_url}/api/v1/scan/{qr.uuid}"
-        img_buffer = self.generate_qr_image(qr, tracking_url)
-        return qr, img_buffer
-
-    def get_user_qr_codes(self, user_uuid: UUID) -> List[QRCode]:
-        return self.qr_repo.get_by_user(user_uuid)
+        if METRICS_ENABLED:
+            for stage, seconds in timings.items():
+                STAGE_DURATION.observe(seconds, component="qr_image", stage=stage)
+        return png, packed_matrix
+
+    @staticmethod
+    def image_etag(qr_model: QRCode, tracking_url: str) -> str:
+        from app.src.services.qr_rasterizer import RENDERER_VERSION
+
+        # The destination url is not part of the image, so editing it keeps the entry
+        parts = [RENDERER_VERSION, tracking_url, qr_model.color, qr_model.size]
+        if qr_model.error_correction or qr_model.mask_pattern is not None:
+            # Only when set, so codes with the default encoding keep their ETags
+            parts += [qr_model.error_correction, qr_model.mask_pattern]
+        return image_cache.key(*parts)
+
+    @staticmethod
+    def get_qr_png(qr_model: QRCode, tracking_url: str) -> Tuple[str, bytes]:
+        etag, png, _ = QRCodeService._get_qr_png(qr_model, tracking_url)
+        return etag, png
+
+    @staticmethod
+    def _get_qr_png(qr_model: QRCode, tracking_url: str) -> Tuple[str, bytes, Optional[bytes]]:
+        etag = QRCodeService.image_etag(qr_model, tracking_url)
+        with stage_timer("qr_image", "cache_lookup"):
+            png = image_cache.get(etag)
+        packed_matrix = None
+        if png is None:
+            # Includes the wait for a render worker; the worker-side stages are recorded separately
+            with stage_timer("qr_image", "render_total"):
+                png, packed_matrix = QRCodeService.render_qr_png(qr_model, tracking_url)
+            image_cache.put(etag, png)
+        return etag, png, packed_matrix
+
+    @staticmethod
+    def artifact_key(qr_model: QRCode, tracking_url: str) -> str:
+        return f"{QRCodeService.image_etag(qr_model, tracking_url)}.png"
+
+    @staticmethod
+    def get_stored_image(qr_model: QRCode, tracking_url: str) -> Tuple[Optional[str], Optional[bytes]]:
+        """(local path, None) or (None, bytes) of the stored image; (None, None) when there is none."""
+        if artifact_store is None:
+            return None, None
+        key = QRCodeService.artifact_key(qr_model, tracking_url)
+        try:
+            path = artifact_store.local_path(key)
+            return (path, None) if path else (None, artifact_store.get(key))
+        except Exception as e:
+            print(f"Error reading QR image artifact {key}: {e}")
+            return None, None
+
+    @staticmethod
+    def store_image(
+        qr_model: QRCode,
+        tracking_url: str,
+        png: Optional[bytes] = None,
+        replaces: Optional[str] = None
+    ) -> None:
+        """Renders (unless png is given) and stores the image; meant to run as a background task."""
+        if artifact_store is None:
+            return
+        key = QRCodeService.artifact_key(qr_model, tracking_url)
+        try:
+            if png is None:
+                _, png = QRCodeService.get_qr_png(qr_model, tracking_url)
+            artifact_store.put(key, png)
+            if replaces and replaces != key:
+                artifact_store.delete(replaces)
+        except Exception as e:
+            print(f"Error storing QR image artifact {key}: {e}")
+
+    @staticmethod
+    def generate_qr_image(qr_model: QRCode, tracking_url: str) -> BytesIO:
+        _, png = QRCodeService.get_qr_png(qr_model, tracking_url)
+        return BytesIO(png)
+
+    def create_qr(
+        self,
+        qr_data: QRCodeCreate,
+        user_uuid: UUID,
+        base_url: str,
+        background_tasks: Optional[BackgroundTasks] = None
+    ) -> Tuple[QRCode, BytesIO]:
+        # Render before inserting so a saturated render pool does not leave an orphan row
+        qr_uuid = uuid.uuid4()
+        tracking_url = f"{base_url}/api/v1/scan/{qr_uuid}"
+        _, png, packed_matrix = self._get_qr_png(qr_data, tracking_url)
+        qr = self.qr_repo.create(qr_data, user_uuid, qr_uuid, packed_matrix if QR_MATRIX_PERSIST else None)
+        if artifact_store is not None and background_tasks is not None:
+            background_tasks.add_task(self.store_image, qr, tracking_url, png)
+        return qr, BytesIO(png)
+
+    def list_qr_codes(
+        self,
+        user_uuid: UUID,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        url_prefix: Optional[str] = None,
+        color: Optional[str] = None,
+        include_total: bool = False
+    ) -> Tuple[List[dict], Optional[str], Optional[int]]:
+        from fastapi import HTTPException
+        unknown = [name for name in fields or [] if name not in LISTABLE_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+        try:
+            rows, next_cursor = self.qr_repo.list_by_user(user_uuid, limit, cursor, fields, url_prefix, color)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        if not fields:
+            # Full rows keep the QRCodeResponse shape
+            for row in rows:
+                row["base64_image"] = None
+
+        # The counter tracks all of the user's codes, so it is only a valid total without filters
+        total = None
+        if include_total and not url_prefix and not color:
+            total = self.qr_repo.count_by_user(user_uuid)
+        return rows, next_cursor, total
 
     def get_qr_detail(self, qr_uuid: UUID, user_uuid: UUID) -> QRCode:
         qr = self.qr_repo.get_by_id(qr_uuid)
@@ -59,10 +174,92 @@ class QRCodeService:
             raise HTTPException(status_code=404, detail="QR Code not found")
         return qr
 
-    def update_qr(self, qr_uuid: UUID, user_uuid: UUID, qr_data: QRCodeUpdate) -> QRCode:
+    def update_qr(
+        self,
+        qr_uuid: UUID,
+        user_uuid: UUID,
+        qr_data: QRCodeUpdate,
+        base_url: Optional[str] = None,
+        background_tasks: Optional[BackgroundTasks] = None
+    ) -> QRCode:
         qr = self.get_qr_detail(qr_uuid, user_uuid)
-        return self.qr_repo.update(qr_uuid, qr_data)
+        store_image = artifact_store is not None and base_url is not None and background_tasks is not None
+        if store_image:
+            tracking_url = f"{base_url}/api/v1/scan/{qr_uuid}"
+            previous_key = self.artifact_key(qr, tracking_url)
+        updated = self.qr_repo.update(qr_uuid, qr_data)
+        if updated is None:
+            # Visible on the replica but not (yet) on the primary; treat as missing
+            from fastapi import HTTPException
+            raise HTTPException(status_code=404, detail="QR Code not found")
+        # A new color or size is a new image: rendered after the response, the old one removed
+        if store_image and self.artifact_key(updated, tracking_url) != previous_key:
+            background_tasks.add_task(self.store_image, updated, tracking_url, None, previous_key)
+        return updated
 
-    def get_stats(self, qr_uuid: UUID, user_uuid: UUID) -> dict:
+    def get_stats(
+        self,
+        qr_uuid: UUID,
+        user_uuid: UUID,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None
+    ) -> dict:
         self.get_qr_detail(qr_uuid, user_uuid)
-        return self.qr_repo.get_stats(qr_uuid)
+        try:
+            return self.qr_repo.get_stats(qr_uuid, limit, cursor, since, until)
+        except InvalidCursor:
+            from fastapi import HTTPException
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    def get_timeseries(
+        self,
+        qr_uuid: UUID,
+        user_uuid: UUID,
+        granularity: str = "day",
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        top: int = 10
+    ) -> dict:
+        self.get_qr_detail(qr_uuid, user_uuid)
+        return self.qr_repo.get_scan_timeseries(qr_uuid, granularity, since, until, top)
+
+    def export_scans(
+        self,
+        qr_uuid: UUID,
+        user_uuid: UUID,
+        format: str = "ndjson",
+        since: Optional[int] = None,
+        until: Optional[int] = None
+    ) -> Iterator[str]:
+        # Ownership is checked now, rows are only read as the response streams
+        self.get_qr_detail(qr_uuid, user_uuid)
+        rows = self.qr_repo.iter_scans(qr_uuid, since, until)
+        return self._export_csv(rows) if format == "csv" else self._export_ndjson(rows)
+
+    @staticmethod
+    def _export_ndjson(rows: Iterator[dict], chunk_rows: int = 1000) -> Iterator[str]:
+        lines = []
+        for row in rows:
+            lines.append(json.dumps(row, default=str))
+            if len(lines) >= chunk_rows:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _export_csv(rows: Iterator[dict], chunk_rows: int = 1000) -> Iterator[str]:
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(SCAN_EXPORT_COLUMNS)
+        count = 0
+        for row in rows:
+            writer.writerow([row[column] for column in SCAN_EXPORT_COLUMNS])
+            count += 1
+            if count % chunk_rows == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
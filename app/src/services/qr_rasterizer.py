@@ -0,0 +1,198 @@
+"""
+Direct-to-size QR rasterizer.
+Builds the final image straight from the boolean module matrix with integer
+module scaling, instead of rendering large and resampling down. SVG output is
+written from the same matrix as one path, with no raster step. Encoded
+matrices are memoized per process and can be stored packed with the code, so
+a render starts from a ready matrix instead of re-running version fitting,
+Reed-Solomon and mask scoring.
+"""
+
+import hashlib
+import math
+import os
+import time
+from functools import lru_cache
+from io import BytesIO
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import qrcode
+from dotenv import load_dotenv
+from PIL import Image, ImageColor
+
+load_dotenv()
+
+QR_MATRIX_CACHE_SIZE = int(os.getenv("QR_MATRIX_CACHE_SIZE", 4096))
+
+ERROR_CORRECTION_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H
+}
+DEFAULT_ERROR_CORRECTION = "L"
+MATRIX_KEY_BYTES = 8
+BACKGROUND_RGB = (255, 255, 255)
+# Part of the image cache key; bump when the output of the rasterizer changes
+RENDERER_VERSION = 2
+
+
+def rasterize_matrix(matrix: Sequence[Sequence[bool]], size: int, color: str | None = None) -> Image.Image:
+    """Returns a size x size two-color palette image; palette index 1 is a dark module."""
+    modules = np.asarray(matrix, dtype=np.uint8)
+    count = modules.shape[0]
+
+    if size >= count:
+        # Whole pixels per module; the remainder becomes extra quiet zone on each side
+        scale = size // count
+        pixels = np.repeat(np.repeat(modules, scale, axis=0), scale, axis=1)
+        padding = size - count * scale
+        if padding:
+            before = padding // 2
+            pixels = np.pad(pixels, ((before, padding - before), (before, padding - before)))
+    else:
+        # Smaller than one pixel per module: nearest-module sampling
+        index = (np.arange(size) * count) // size
+        pixels = modules[np.ix_(index, index)]
+
+    img = Image.fromarray(np.ascontiguousarray(pixels), mode="P")
+    fill_rgb = ImageColor.getrgb(color or "black")[:3]
+    img.putpalette(list(BACKGROUND_RGB) + list(fill_rgb))
+    return img
+
+
+def encode_png(img: Image.Image) -> bytes:
+    # A two-entry palette is written as a 1-bit PNG
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def render_png(matrix: List[List[bool]], size: int, color: str | None = None) -> bytes:
+    return encode_png(rasterize_matrix(matrix, int(size), color))
+
+
+def render_svg(matrix: Sequence[Sequence[bool]], size: int, color: str | None = None) -> bytes:
+    """One unit per module, scaled to size x size by the viewBox."""
+    count = len(matrix)
+    commands = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < count:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < count and row[x]:
+                x += 1
+            commands.append(f"M{start} {y}h{x - start}v1h{start - x}z")
+
+    # Normalized through PIL, so the attribute only ever holds a hex color
+    fill = "#%02x%02x%02x" % ImageColor.getrgb(color or "black")[:3]
+    background = "#%02x%02x%02x" % BACKGROUND_RGB
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 {count} {count}" shape-rendering="crispEdges">'
+        f'<rect width="{count}" height="{count}" fill="{background}"/>'
+        f'<path fill="{fill}" d="{"".join(commands)}"/></svg>'
+    ).encode("ascii")
+
+
+RENDERERS = {"png": render_png, "svg": render_svg}
+
+
+def matrix_key(data: str, error_correction: str | None = None, mask_pattern: int | None = None) -> bytes:
+    return hashlib.blake2b(
+        f"{data}\x1f{error_correction or DEFAULT_ERROR_CORRECTION}\x1f{mask_pattern}".encode("utf-8"),
+        digest_size=MATRIX_KEY_BYTES
+    ).digest()
+
+
+@lru_cache(maxsize=QR_MATRIX_CACHE_SIZE)
+def build_matrix(data: str, error_correction: str | None = None, mask_pattern: int | None = None) -> np.ndarray:
+    """Encoded module matrix (border included); memoized per process, so it is read-only."""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=ERROR_CORRECTION_LEVELS[error_correction or DEFAULT_ERROR_CORRECTION],
+        border=4,
+        mask_pattern=mask_pattern
+    )
+    qr.add_data(data)
+    # With a fixed mask, the 8 trial encodings of the automatic mask choice are skipped
+    qr.make(fit=True)
+    matrix = np.array(qr.get_matrix(), dtype=bool)
+    matrix.flags.writeable = False
+    return matrix
+
+
+def pack_matrix(
+    matrix: Sequence[Sequence[bool]],
+    data: str,
+    error_correction: str | None = None,
+    mask_pattern: int | None = None
+) -> bytes:
+    """Matrix as packed bits, prefixed with the key of what it encodes."""
+    return matrix_key(data, error_correction, mask_pattern) + np.packbits(np.asarray(matrix, dtype=bool)).tobytes()
+
+
+def load_matrix(
+    data: str,
+    error_correction: str | None = None,
+    mask_pattern: int | None = None,
+    packed_matrix: bytes | None = None
+) -> np.ndarray:
+    # A stored matrix is only used for the exact data it was built from (e.g. not after a host change)
+    if packed_matrix and packed_matrix[:MATRIX_KEY_BYTES] == matrix_key(data, error_correction, mask_pattern):
+        bits = np.unpackbits(np.frombuffer(packed_matrix, dtype=np.uint8, offset=MATRIX_KEY_BYTES))
+        # packbits pads to a whole byte, fewer bits than a row of any QR size
+        count = math.isqrt(len(bits))
+        return bits[:count * count].reshape(count, count).astype(bool)
+    return build_matrix(data, error_correction, mask_pattern)
+
+
+def render_qr_png(
+    data: str,
+    size: int,
+    color: str | None = None,
+    error_correction: str | None = None,
+    mask_pattern: int | None = None
+) -> bytes:
+    """Full render from data to PNG bytes; top-level so process pool workers can run it."""
+    return render_png(build_matrix(data, error_correction, mask_pattern), size, color)
+
+
+def render_qr_variants(
+    data: str,
+    variants: Sequence[Tuple[int, str | None, str]],
+    error_correction: str | None = None,
+    mask_pattern: int | None = None,
+    packed_matrix: bytes | None = None
+) -> List[bytes]:
+    """Renders every (size, color, format) variant of one code from a single matrix."""
+    matrix = load_matrix(data, error_correction, mask_pattern, packed_matrix)
+    return [RENDERERS[format](matrix, int(size), color) for size, color, format in variants]
+
+
+def render_qr_png_timed(
+    data: str,
+    size: int,
+    color: str | None = None,
+    error_correction: str | None = None,
+    mask_pattern: int | None = None,
+    packed_matrix: bytes | None = None
+) -> Tuple[bytes, Dict[str, float], bytes]:
+    """render_qr_png plus the duration of each stage and the packed matrix, so the
+    caller can record and store them even when the render ran in another process."""
+    timings = {}
+    started = time.perf_counter()
+    matrix = load_matrix(data, error_correction, mask_pattern, packed_matrix)
+    timings["matrix"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    image = rasterize_matrix(matrix, int(size), color)
+    timings["rasterize"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    png = encode_png(image)
+    timings["encode"] = time.perf_counter() - started
+    return png, timings, pack_matrix(matrix, data, error_correction, mask_pattern)
@@ -0,0 +1,95 @@
+"""
+Redirect resolution cache.
+Maps QR uuids to their already-normalized target URL, with negative entries
+for uuids that do not exist.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from uuid import UUID
+from dotenv import load_dotenv
+from app.src.services.cache_invalidation import register_handler
+
+load_dotenv()
+
+REDIRECT_CACHE_SIZE = int(os.getenv("REDIRECT_CACHE_SIZE", 100000))
+REDIRECT_CACHE_TTL_SECONDS = float(os.getenv("REDIRECT_CACHE_TTL_SECONDS", 300))
+REDIRECT_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("REDIRECT_CACHE_NEGATIVE_TTL_SECONDS", 30))
+
+
+def normalize_target_url(url: str) -> str:
+    if not (url.startswith("http://") or url.startswith("https://")):
+        return f"https://{url}"
+    return url
+
+
+class RedirectCache:
+    def __init__(
+        self,
+        max_size: int = REDIRECT_CACHE_SIZE,
+        ttl: float = REDIRECT_CACHE_TTL_SECONDS,
+        negative_ttl: float = REDIRECT_CACHE_NEGATIVE_TTL_SECONDS
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, qr_uuid: UUID, count_miss: bool = True) -> Tuple[bool, Optional[str]]:
+        """Returns (found, target_url); a found entry with no URL is a cached 404."""
+        with self._lock:
+            entry = self._entries.get(qr_uuid)
+            if entry is None:
+                self.misses += count_miss
+                return False, None
+
+            target_url, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[qr_uuid]
+                self.misses += count_miss
+                return False, None
+
+            self._entries.move_to_end(qr_uuid)
+            self.hits += 1
+            return True, target_url
+
+    def set(self, qr_uuid: UUID, url: str) -> str:
+        target_url = normalize_target_url(url)
+        self._store(qr_uuid, target_url, self.ttl)
+        return target_url
+
+    def set_missing(self, qr_uuid: UUID) -> None:
+        self._store(qr_uuid, None, self.negative_ttl)
+
+    def invalidate(self, qr_uuid: UUID) -> None:
+        with self._lock:
+            self._entries.pop(qr_uuid, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _store(self, qr_uuid: UUID, target_url: Optional[str], ttl: float) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[qr_uuid] = (target_url, time.monotonic() + ttl)
+            self._entries.move_to_end(qr_uuid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+redirect_cache = RedirectCache()
+
+# Updates made by other workers arrive through the invalidation channel
+register_handler("redirect", lambda key: redirect_cache.invalidate(UUID(key)))
@@ -0,0 +1,127 @@
+"""
+Dedicated executor for CPU-bound QR rendering.
+A process pool with pre-warmed workers keeps rendering off the GIL shared by
+request handlers; a thread pool is used when processes are disabled or the
+pool cannot be created. The number of pending renders is bounded so overload
+surfaces as RenderPoolSaturated instead of an ever-growing backlog.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "process" or "thread"
+RENDER_EXECUTOR = os.getenv("RENDER_EXECUTOR", "process").lower()
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", os.cpu_count() or 1))
+RENDER_MAX_PENDING = int(os.getenv("RENDER_MAX_PENDING", RENDER_WORKERS * 8))
+RENDER_TIMEOUT_SECONDS = float(os.getenv("RENDER_TIMEOUT_SECONDS", 30))
+RENDER_RETRY_AFTER_SECONDS = int(os.getenv("RENDER_RETRY_AFTER_SECONDS", 1))
+# Starts the render workers at boot; scan-only workers can skip it and start faster
+RENDER_WARM_UP = os.getenv("RENDER_WARM_UP", "true").lower() == "true"
+
+
+class RenderPoolSaturated(Exception):
+    pass
+
+
+def _warm_worker() -> None:
+    # Pay the import and first-render cost when the worker starts, not on a request
+    from app.src.services.qr_rasterizer import render_qr_png
+    render_qr_png("warm-up", 64)
+
+
+def _noop() -> None:
+    return None
+
+
+class RenderExecutor:
+    def __init__(
+        self,
+        kind: str = RENDER_EXECUTOR,
+        workers: int = RENDER_WORKERS,
+        max_pending: int = RENDER_MAX_PENDING,
+        timeout: float = RENDER_TIMEOUT_SECONDS
+    ):
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_pending = max(1, max_pending)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def mode(self) -> Optional[str]:
+        if self._executor is None:
+            return None
+        return "process" if isinstance(self._executor, ProcessPoolExecutor) else "thread"
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+
+    def warm_up(self) -> None:
+        """Starts every worker process ahead of the first request."""
+        self.start()
+        try:
+            for future in [self._executor.submit(_noop) for _ in range(self.workers)]:
+                future.result()
+        except BrokenProcessPool:
+            self._fall_back_to_threads()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+
+    def submit(self, fn: Callable, *args, wait: float = 0) -> Future:
+        """wait > 0 waits up to that many seconds for a free slot instead of failing right away."""
+        acquired = self._slots.acquire(timeout=wait) if wait > 0 else self._slots.acquire(blocking=False)
+        if not acquired:
+            raise RenderPoolSaturated()
+        try:
+            self.start()
+            try:
+                future = self._executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._fall_back_to_threads()
+                future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn: Callable, *args):
+        return self.submit(fn, *args).result(timeout=self.timeout)
+
+    def _create_executor(self) -> Executor:
+        if self.kind == "process":
+            try:
+                return ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker
+                )
+            except (OSError, NotImplementedError, ImportError) as e:
+                print(f"Process pool unavailable, rendering on threads: {e}")
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qr-render")
+
+    def _fall_back_to_threads(self) -> None:
+        with self._lock:
+            if isinstance(self._executor, ProcessPoolExecutor):
+                print("Render process pool is broken, falling back to threads")
+                self._executor.shutdown(wait=False)
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qr-render")
+
+
+render_executor = RenderExecutor()
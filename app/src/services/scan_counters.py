@@ -0,0 +1,156 @@
+"""
+Sharded per-QR scan counters.
+Inserted scans are counted in process, in striped dicts, and a background
+thread merges them into qr_scan_counters every SCAN_COUNTER_FLUSH_INTERVAL_MS
+with one batched upsert. Each worker writes its own shard row per QR
+((qr_uuid, shard_id) is the key), so a viral code costs one row update per
+worker and interval instead of one per scan batch, and workers never wait on
+each other's row locks. The total of a QR is the sum of its shard rows plus
+whatever this worker has not merged yet; counts of other workers show up
+within an interval, and a crashed worker loses at most one interval of counts.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+from dotenv import load_dotenv
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.src.database import SessionLocal
+from app.src.models.qr_scan_counter import QRScanCounter
+
+load_dotenv()
+
+SCAN_COUNTER_SHARDS = int(os.getenv("SCAN_COUNTER_SHARDS", 16))
+# 0 updates the counters inside each scan batch's transaction instead
+SCAN_COUNTER_FLUSH_INTERVAL_MS = int(os.getenv("SCAN_COUNTER_FLUSH_INTERVAL_MS", 1000))
+SCAN_COUNTER_STRIPES = int(os.getenv("SCAN_COUNTER_STRIPES", 16))
+
+
+def counter_upsert_statement(shard_id: int, counts: Dict[UUID, int]):
+    # Same row lock order as the rollup upserts of scan batches
+    values = [
+        {"qr_uuid": qr_uuid, "shard_id": shard_id, "total_scans": count}
+        for qr_uuid, count in sorted(counts.items(), key=lambda item: str(item[0]))
+    ]
+    statement = pg_insert(QRScanCounter).values(values)
+    return statement.on_conflict_do_update(
+        index_elements=["qr_uuid", "shard_id"],
+        set_={"total_scans": QRScanCounter.total_scans + statement.excluded.total_scans}
+    )
+
+
+class ShardedScanCounters:
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        shards: int = SCAN_COUNTER_SHARDS,
+        flush_interval_ms: int = SCAN_COUNTER_FLUSH_INTERVAL_MS,
+        stripes: int = SCAN_COUNTER_STRIPES,
+        shard_id: Optional[int] = None
+    ):
+        self.session_factory = session_factory
+        # Random rather than per pid: workers spread over shards without coordination
+        self.shard_id = shard_id if shard_id is not None else random.randrange(max(1, shards))
+        self.flush_interval = flush_interval_ms / 1000
+        # Threads counting different QRs rarely share a lock
+        self._stripes: List[Tuple[Dict[UUID, int], threading.Lock]] = [
+            ({}, threading.Lock()) for _ in range(max(1, stripes))
+        ]
+        # Counts being written right now; still pending until committed
+        self._in_flight: Dict[UUID, int] = {}
+        self._flush_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"flushes": 0, "flush_errors": 0, "merged_scans": 0, "last_flush_ms": 0.0}
+
+    def add_many(self, counts: Dict[UUID, int]) -> None:
+        self._restore(counts)
+        if not self._thread:
+            self.start()
+
+    def add(self, qr_uuid: UUID, amount: int = 1) -> None:
+        self.add_many({qr_uuid: amount})
+
+    def pending(self, qr_uuid: UUID) -> int:
+        """Scans of a QR counted by this worker and not merged yet."""
+        values, lock = self._stripe(qr_uuid)
+        with lock:
+            count = values.get(qr_uuid, 0)
+        return count + self._in_flight.get(qr_uuid, 0)
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            merged: Dict[UUID, int] = {}
+            # Visible to pending() while the stripes are being emptied
+            self._in_flight = merged
+            for values, lock in self._stripes:
+                with lock:
+                    for qr_uuid, amount in values.items():
+                        merged[qr_uuid] = merged.get(qr_uuid, 0) + amount
+                    values.clear()
+            if not merged:
+                return 0
+
+            started = time.perf_counter()
+            db = self.session_factory()
+            try:
+                db.execute(counter_upsert_statement(self.shard_id, merged))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Error merging scan counters for {len(merged)} QR codes: {e}")
+                self._stats["flush_errors"] += 1
+                # Kept for the next merge
+                self._in_flight = {}
+                self._restore(merged)
+                return 0
+            finally:
+                db.close()
+
+            self._in_flight = {}
+            self._stats["flushes"] += 1
+            self._stats["merged_scans"] += sum(merged.values())
+            self._stats["last_flush_ms"] = (time.perf_counter() - started) * 1000
+            return len(merged)
+
+    def start(self) -> None:
+        with self._lock:
+            if self.flush_interval <= 0 or (self._thread and self._thread.is_alive()):
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="scan-counter-merger", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        pending_keys = 0
+        for values, lock in self._stripes:
+            with lock:
+                pending_keys += len(values)
+        return {**self._stats, "pending_keys": pending_keys, "shard_id": self.shard_id}
+
+    def _stripe(self, qr_uuid: UUID) -> Tuple[Dict[UUID, int], threading.Lock]:
+        return self._stripes[hash(qr_uuid) % len(self._stripes)]
+
+    def _restore(self, counts: Dict[UUID, int]) -> None:
+        for qr_uuid, amount in counts.items():
+            values, lock = self._stripe(qr_uuid)
+            with lock:
+                values[qr_uuid] = values.get(qr_uuid, 0) + amount
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+
+
+scan_counters = ShardedScanCounters()
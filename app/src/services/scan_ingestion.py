@@ -0,0 +1,260 @@
+"""
+Write-behind scan ingestion.
+The scan endpoint pushes compact scan records onto a bounded in-process queue
+and a background thread flushes them to the scans table in batches.
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+from uuid import UUID
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+from app.src.database import SessionLocal
+from app.src.repositories.scan_repository import ScanRepository
+from app.src.services.geo_resolver import lookup_geo_info_local
+
+load_dotenv()
+
+SCAN_WRITE_BEHIND = os.getenv("SCAN_WRITE_BEHIND", "true").lower() == "true"
+SCAN_QUEUE_MAX_SIZE = int(os.getenv("SCAN_QUEUE_MAX_SIZE", 10000))
+SCAN_FLUSH_BATCH_SIZE = int(os.getenv("SCAN_FLUSH_BATCH_SIZE", 500))
+SCAN_FLUSH_INTERVAL_MS = int(os.getenv("SCAN_FLUSH_INTERVAL_MS", 200))
+# "block" waits for room in the queue, "drop" discards the scan when full
+SCAN_QUEUE_OVERFLOW = os.getenv("SCAN_QUEUE_OVERFLOW", "block").lower()
+# 0 blocks until there is room
+SCAN_QUEUE_BLOCK_TIMEOUT_MS = int(os.getenv("SCAN_QUEUE_BLOCK_TIMEOUT_MS", 0))
+# How long a scan request waits for room; then the scan is inserted directly
+SCAN_QUEUE_REQUEST_TIMEOUT_MS = int(os.getenv("SCAN_QUEUE_REQUEST_TIMEOUT_MS", 100))
+# A failed batch is retried with exponential backoff before its scans are counted as failed
+SCAN_FLUSH_RETRIES = int(os.getenv("SCAN_FLUSH_RETRIES", 3))
+SCAN_FLUSH_RETRY_BACKOFF_MS = int(os.getenv("SCAN_FLUSH_RETRY_BACKOFF_MS", 100))
+
+
+class ScanRecord:
+    """A buffered scan; slots keep a full queue at a fraction of the memory of dicts or ORM objects."""
+
+    __slots__ = ("qr_uuid", "ip", "country", "timezone", "created_at")
+
+    def __init__(self, qr_uuid: UUID, ip: str, country: Optional[str], timezone: Optional[str], created_at: int):
+        self.qr_uuid = qr_uuid
+        self.ip = ip
+        self.country = country
+        self.timezone = timezone
+        self.created_at = created_at
+
+    def __repr__(self) -> str:
+        return (
+            f"ScanRecord(qr_uuid={self.qr_uuid!r}, ip={self.ip!r}, country={self.country!r}, "
+            f"timezone={self.timezone!r}, created_at={self.created_at!r})"
+        )
+
+
+class ScanIngestionQueue:
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        max_size: int = SCAN_QUEUE_MAX_SIZE,
+        batch_size: int = SCAN_FLUSH_BATCH_SIZE,
+        flush_interval_ms: int = SCAN_FLUSH_INTERVAL_MS,
+        overflow: str = SCAN_QUEUE_OVERFLOW,
+        block_timeout_ms: int = SCAN_QUEUE_BLOCK_TIMEOUT_MS,
+        request_timeout_ms: int = SCAN_QUEUE_REQUEST_TIMEOUT_MS,
+        flush_retries: int = SCAN_FLUSH_RETRIES,
+        retry_backoff_ms: int = SCAN_FLUSH_RETRY_BACKOFF_MS
+    ):
+        if overflow not in ("block", "drop"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.overflow = overflow
+        self.block_timeout = block_timeout_ms / 1000 if block_timeout_ms > 0 else None
+        self.request_timeout = request_timeout_ms / 1000
+        if self.block_timeout is not None:
+            self.request_timeout = min(self.request_timeout, self.block_timeout)
+        self.flush_retries = max(0, flush_retries)
+        self.retry_backoff = retry_backoff_ms / 1000
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        self._counters = {
+            "enqueued": 0,
+            "dropped": 0,
+            "overflowed": 0,
+            "flushed": 0,
+            "failed": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "flush_retries": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0
+        }
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                name="scan-ingestion-flusher",
+                daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stops accepting scans and flushes everything still queued."""
+        with self._lock:
+            thread = self._thread
+            self._stopping.set()
+        if thread:
+            thread.join(timeout)
+        # Anything left behind (no flusher running, or a late put) is drained here
+        self._drain()
+
+    def put(self, record: ScanRecord) -> bool:
+        if not self._enqueue(record, self.block_timeout if self.overflow == "block" else 0):
+            self._count("dropped")
+            return False
+        return True
+
+    def offer(self, record: ScanRecord) -> bool:
+        """Enqueues only if there is room right now; never blocks and never counts a drop."""
+        return self._enqueue(record, 0)
+
+    async def put_async(self, record: ScanRecord) -> bool:
+        """
+        Enqueues from a request. In block mode the wait is bounded by the request
+        timeout; False then means the caller has to write the scan itself.
+        """
+        if self.overflow != "block":
+            return self.put(record)
+        if self.offer(record):
+            return True
+        # Off the event loop, and bounded so a full queue cannot hold threadpool threads indefinitely
+        if self.request_timeout > 0 and await run_in_threadpool(self._enqueue, record, self.request_timeout):
+            return True
+        self._count("overflowed")
+        return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        counters["depth"] = self._queue.qsize()
+        counters["capacity"] = self._queue.maxsize
+        counters["avg_flush_ms"] = (
+            counters["total_flush_ms"] / counters["flushes"] if counters["flushes"] else 0.0
+        )
+        return counters
+
+    def _enqueue(self, record: ScanRecord, timeout: Optional[float]) -> bool:
+        """Timeout 0 never waits, None waits until there is room."""
+        if self._stopping.is_set():
+            return False
+        if not self._thread:
+            self.start()
+        try:
+            if timeout == 0:
+                self._queue.put_nowait(record)
+            else:
+                self._queue.put(record, block=True, timeout=timeout)
+        except queue.Full:
+            return False
+        self._count("enqueued")
+        return True
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._flush(batch)
+        self._drain()
+
+    def _collect_batch(self) -> List[ScanRecord]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self) -> None:
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch: List[ScanRecord]) -> None:
+        started = time.perf_counter()
+        batch = self._enrich(batch)
+        for attempt in range(self.flush_retries + 1):
+            if attempt:
+                self._count("flush_retries")
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            db = self.session_factory()
+            try:
+                ScanRepository(db).create_many(batch)
+                self._count("flushed", len(batch))
+                break
+            except Exception as e:
+                db.rollback()
+                print(f"Error flushing {len(batch)} scans (attempt {attempt + 1}): {e}")
+                self._count("flush_errors")
+            finally:
+                db.close()
+        else:
+            self._count("failed", len(batch))
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._counters["flushes"] += 1
+            self._counters["last_flush_ms"] = elapsed_ms
+            self._counters["total_flush_ms"] += elapsed_ms
+            self._counters["max_flush_ms"] = max(self._counters["max_flush_ms"], elapsed_ms)
+
+    @staticmethod
+    def _enrich(batch: List[ScanRecord]) -> List[ScanRecord]:
+        # Scans queued without geo info (deferred lookup mode or the scan fast path) are resolved
+        # here, once per IP and never remotely: one slow lookup would stall the only flusher thread.
+        # Both sources are only enabled when that is by design (deferred mode) or loses nothing
+        # (a local geo database); see scan_fast_path.fast_path_available
+        resolved = {}
+        for record in batch:
+            if record.country is None:
+                if record.ip not in resolved:
+                    resolved[record.ip] = lookup_geo_info_local(record.ip)
+                geo_info = resolved[record.ip]
+                record.country = geo_info["country"]
+                record.timezone = geo_info["timezone"]
+        return batch
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+
+scan_ingestion_queue = ScanIngestionQueue()
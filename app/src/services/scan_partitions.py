@@ -0,0 +1,350 @@
+"""
+Monthly range partitions of the scans table.
+Partitions are named scans_yYYYYmMM and cover [month start, next month start)
+in epoch ms (UTC); scans_default catches anything outside them. Maintenance
+creates the upcoming months ahead of time and, with a retention policy,
+detaches expired months, exports them to gzip CSV and drops them. Rollups and
+counters are not touched, so totals and time series keep archived history.
+
+    python -m app.src.services.scan_partitions maintain
+    python -m app.src.services.scan_partitions convert   # one-off, for a pre-partitioning scans table
+"""
+
+import calendar
+import gzip
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine
+from app.src.database import engine
+from app.src.models.scans import Scan
+from app.src.models.scan_dimensions import ScanCountry, ScanTimezone
+
+load_dotenv()
+
+SCAN_PARTITION_MONTHS_AHEAD = int(os.getenv("SCAN_PARTITION_MONTHS_AHEAD", 3))
+# 0 keeps every month
+SCAN_RETENTION_MONTHS = int(os.getenv("SCAN_RETENTION_MONTHS", 0))
+SCAN_ARCHIVE_DIR = os.getenv("SCAN_ARCHIVE_DIR", "scan_archive")
+# DETACH/DROP lock scans and qr_codes; give up (and retry next run) rather than queue traffic behind them
+SCAN_PARTITION_LOCK_TIMEOUT_MS = int(os.getenv("SCAN_PARTITION_LOCK_TIMEOUT_MS", 5000))
+# 0 disables the background maintenance of each worker
+SCAN_PARTITION_MAINTENANCE_INTERVAL_SECONDS = float(os.getenv("SCAN_PARTITION_MAINTENANCE_INTERVAL_SECONDS", 3600))
+
+PARENT_TABLE = Scan.__tablename__
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+LEGACY_TABLE = f"{PARENT_TABLE}_legacy"
+# Arbitrary key for pg_try_advisory_xact_lock, so one worker maintains at a time
+MAINTENANCE_LOCK_KEY = 7_317_001
+
+_BOUND_PATTERN = re.compile(r"FROM \((MINVALUE|'?(-?\d+)'?)\) TO \((MAXVALUE|'?(-?\d+)'?)\)")
+
+
+class Partition(NamedTuple):
+    name: str
+    # None for MINVALUE / MAXVALUE
+    start: Optional[int]
+    end: Optional[int]
+
+
+def add_months(year: int, month: int, months: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def month_start_ms(year: int, month: int) -> int:
+    return calendar.timegm((year, month, 1, 0, 0, 0)) * 1000
+
+
+def month_of(epoch_ms: int) -> Tuple[int, int]:
+    moment = datetime.fromtimestamp(epoch_ms / 1000, tz=timezone.utc)
+    return moment.year, moment.month
+
+
+def partition_name(year: int, month: int) -> str:
+    return f"{PARENT_TABLE}_y{year:04d}m{month:02d}"
+
+
+def partition_bounds(year: int, month: int) -> Tuple[int, int]:
+    return month_start_ms(year, month), month_start_ms(*add_months(year, month, 1))
+
+
+def parse_bound(expression: str) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """(start, end) from pg_get_expr(relpartbound); None for the default partition."""
+    match = _BOUND_PATTERN.search(expression)
+    if match is None:
+        return None
+    start = int(match.group(2)) if match.group(2) is not None else None
+    end = int(match.group(4)) if match.group(4) is not None else None
+    return start, end
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _table_exists(connection: Connection, name: str) -> bool:
+    return connection.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def list_partitions(connection: Connection) -> List[Partition]:
+    """Range partitions of the scans table ordered by start; the default partition is left out."""
+    rows = connection.execute(text("""
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :parent
+    """), {"parent": PARENT_TABLE}).all()
+
+    partitions = []
+    for name, expression in rows:
+        bounds = parse_bound(expression or "")
+        if bounds is not None:
+            partitions.append(Partition(name, *bounds))
+    return sorted(partitions, key=lambda p: (p.start is not None, p.start or 0))
+
+
+def create_partition(connection: Connection, year: int, month: int) -> bool:
+    """Creates the partition of a month; False if it already exists."""
+    name = partition_name(year, month)
+    if _table_exists(connection, name):
+        return False
+    start, end = partition_bounds(year, month)
+
+    strays = _table_exists(connection, DEFAULT_PARTITION) and connection.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end)"),
+        {"start": start, "end": end}
+    ).scalar()
+    if not strays:
+        connection.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} FOR VALUES FROM ({start}) TO ({end})"
+        ))
+        return True
+
+    # Postgres refuses a new partition while the default one holds rows of its range:
+    # build it detached, move those rows over, then attach it
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    connection.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), {"start": start, "end": end})
+    connection.execute(text(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES FROM ({start}) TO ({end})"
+    ))
+    return True
+
+
+def ensure_partitions(
+    connection: Connection,
+    months_ahead: int = SCAN_PARTITION_MONTHS_AHEAD,
+    now_ms: Optional[int] = None
+) -> List[str]:
+    """Creates the default partition and those of the current and upcoming months."""
+    created = []
+    if not _table_exists(connection, DEFAULT_PARTITION):
+        connection.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+        created.append(DEFAULT_PARTITION)
+
+    year, month = month_of(_now_ms() if now_ms is None else now_ms)
+    for offset in range(months_ahead + 1):
+        next_year, next_month = add_months(year, month, offset)
+        if create_partition(connection, next_year, next_month):
+            created.append(partition_name(next_year, next_month))
+    return created
+
+
+def archive_partition(connection: Connection, name: str, directory: str = SCAN_ARCHIVE_DIR) -> str:
+    """Detaches a partition, exports it to <directory>/<name>.csv.gz and drops it."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.csv.gz")
+    tmp_path = f"{path}.tmp"
+
+    connection.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+    # Names instead of lookup ids, so the archive stands on its own
+    query = f"""
+        SELECT {name}.uuid, qr_uuid, host(ip) AS ip, scan_countries.name AS country,
+               scan_timezones.name AS timezone, created_at
+        FROM {name}
+        LEFT JOIN scan_countries ON scan_countries.id = {name}.country_id
+        LEFT JOIN scan_timezones ON scan_timezones.id = {name}.timezone_id
+    """
+    # COPY runs on the same DBAPI connection, inside the transaction of the detach
+    with gzip.open(tmp_path, "wb") as f:
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", f)
+    os.replace(tmp_path, path)
+    connection.execute(text(f"DROP TABLE {name}"))
+    return path
+
+
+def apply_retention(
+    connection: Connection,
+    retention_months: int = SCAN_RETENTION_MONTHS,
+    directory: str = SCAN_ARCHIVE_DIR,
+    now_ms: Optional[int] = None
+) -> List[str]:
+    """Archives every partition that ends before the first retained month."""
+    if retention_months <= 0:
+        return []
+    year, month = month_of(_now_ms() if now_ms is None else now_ms)
+    cutoff = month_start_ms(*add_months(year, month, -retention_months))
+    return [
+        archive_partition(connection, partition.name, directory)
+        for partition in list_partitions(connection)
+        if partition.end is not None and partition.end <= cutoff
+    ]
+
+
+def maintain_partitions(
+    db_engine: Engine = engine,
+    months_ahead: int = SCAN_PARTITION_MONTHS_AHEAD,
+    retention_months: int = SCAN_RETENTION_MONTHS,
+    directory: str = SCAN_ARCHIVE_DIR,
+    now_ms: Optional[int] = None
+) -> dict:
+    with db_engine.begin() as connection:
+        locked = connection.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}).scalar()
+        if not locked:
+            # Another worker is on it
+            return {"created": [], "archived": [], "skipped": True}
+        connection.execute(text(f"SET LOCAL lock_timeout = {int(SCAN_PARTITION_LOCK_TIMEOUT_MS)}"))
+        created = ensure_partitions(connection, months_ahead, now_ms)
+        archived = apply_retention(connection, retention_months, directory, now_ms)
+    return {"created": created, "archived": archived, "skipped": False}
+
+
+def convert_legacy_table(connection: Connection) -> bool:
+    """
+    Turns an unpartitioned scans table into the partitioned one without copying
+    history: the old table becomes the partition of everything before the
+    current month. Its rows can later be archived by the retention policy.
+    Text ip/country/timezone columns are re-encoded in place (a full rewrite).
+    """
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"), {"name": PARENT_TABLE}
+    ).scalar()
+    if relkind != "r":
+        return False
+
+    year, month = month_of(_now_ms())
+    cutoff = month_start_ms(year, month)
+
+    connection.execute(text(f"ALTER TABLE {PARENT_TABLE} RENAME TO {LEGACY_TABLE}"))
+    for index in ("ix_scans_qr_uuid", "ix_scans_created_at", "ix_scans_qr_uuid_created_at"):
+        connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+    connection.execute(text(f"UPDATE {LEGACY_TABLE} SET created_at = 0 WHERE created_at IS NULL"))
+    connection.execute(text(f"ALTER TABLE {LEGACY_TABLE} DROP CONSTRAINT IF EXISTS scans_pkey"))
+    connection.execute(text(f"ALTER TABLE {LEGACY_TABLE} ADD PRIMARY KEY (uuid, created_at)"))
+
+    columns = {
+        row[0]: row[1] for row in connection.execute(text(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = :name AND table_schema = current_schema()"
+        ), {"name": LEGACY_TABLE})
+    }
+    if "country" in columns:
+        _encode_legacy_dimensions(connection, columns)
+
+    # Fires the after_create hook below, which creates the current and upcoming months
+    Scan.__table__.create(connection)
+    names = ", ".join(column.name for column in Scan.__table__.columns)
+    connection.execute(text(f"""
+        WITH moved AS (DELETE FROM {LEGACY_TABLE} WHERE created_at >= :cutoff RETURNING {names})
+        INSERT INTO {PARENT_TABLE} ({names}) SELECT {names} FROM moved
+    """), {"cutoff": cutoff})
+    connection.execute(text(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {LEGACY_TABLE} FOR VALUES FROM (MINVALUE) TO ({cutoff})"
+    ))
+    return True
+
+
+def _encode_legacy_dimensions(connection: Connection, columns: dict) -> None:
+    ScanCountry.__table__.create(connection, checkfirst=True)
+    ScanTimezone.__table__.create(connection, checkfirst=True)
+    for column, table in (("country", "scan_countries"), ("timezone", "scan_timezones")):
+        connection.execute(text(f"""
+            INSERT INTO {table} (name)
+            SELECT DISTINCT {column} FROM {LEGACY_TABLE} WHERE {column} IS NOT NULL
+            ON CONFLICT (name) DO NOTHING
+        """))
+        connection.execute(text(f"ALTER TABLE {LEGACY_TABLE} ADD COLUMN {column}_id smallint"))
+        connection.execute(text(f"""
+            UPDATE {LEGACY_TABLE} SET {column}_id = {table}.id
+            FROM {table} WHERE {table}.name = {LEGACY_TABLE}.{column}
+        """))
+        connection.execute(text(f"ALTER TABLE {LEGACY_TABLE} DROP COLUMN {column}"))
+
+    if columns.get("ip") != "inet":
+        # Addresses that are not IPs (e.g. "testclient") become NULL
+        connection.execute(text("""
+            CREATE FUNCTION pg_temp.to_inet(value text) RETURNS inet AS $$
+            BEGIN
+                RETURN value::inet;
+            EXCEPTION WHEN others THEN
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql IMMUTABLE
+        """))
+        connection.execute(text(f"ALTER TABLE {LEGACY_TABLE} ALTER COLUMN ip DROP NOT NULL"))
+        connection.execute(text(f"ALTER TABLE {LEGACY_TABLE} ALTER COLUMN ip TYPE inet USING pg_temp.to_inet(ip)"))
+
+
+@event.listens_for(Scan.__table__, "after_create")
+def _create_initial_partitions(target, connection: Connection, **kw) -> None:
+    ensure_partitions(connection)
+
+
+class PartitionMaintainer:
+    """Runs maintain_partitions on startup and then on an interval, in a background thread."""
+
+    def __init__(self, interval: float = SCAN_PARTITION_MAINTENANCE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="scan-partition-maintainer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            try:
+                result = maintain_partitions()
+                if result["created"] or result["archived"]:
+                    print(f"Scan partitions created: {result['created']}, archived: {result['archived']}")
+            except Exception as e:
+                print(f"Error maintaining scan partitions: {e}")
+            if self._stopping.wait(self.interval):
+                return
+
+
+partition_maintainer = PartitionMaintainer()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("maintain", "convert"):
+        print("usage: python -m app.src.services.scan_partitions maintain|convert")
+        sys.exit(1)
+    if sys.argv[1] == "convert":
+        with engine.begin() as conn:
+            converted = convert_legacy_table(conn)
+        print("Converted scans to a partitioned table" if converted else "scans is already partitioned")
+    print(maintain_partitions())
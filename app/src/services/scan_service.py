@@ -1,36 +1,40 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Request, HTTPException
 from fastapi.responses import RedirectResponse
-from app.src.models.qr_code import QRCode
-from app.src.models.scans import Scan
-import httpx
+from app.src.repositories.qr_code_repository import AsyncQRCodeRepository
+from app.src.repositories.scan_repository import AsyncScanRepository
+from app.src.services.redirect_cache import redirect_cache
+from app.src.services.scan_ingestion import ScanRecord, scan_ingestion_queue, SCAN_WRITE_BEHIND
+from app.src.services.geo_resolver import lookup_geo_info_async, GEO_LOOKUP_MODE
+from app.src.services.metrics import stage_timer
+import time
 from uuid import UUID
 
 class ScanService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
+        self.qr_repo = AsyncQRCodeRepository(db)
+        self.scan_repo = AsyncScanRepository(db)
+
+    async def resolve_target_url(self, qr_uuid: UUID) -> str | None:
+        found, target_url = redirect_cache.lookup(qr_uuid)
+        if found:
+            return target_url
+
+        url = await self.qr_repo.get_url(qr_uuid)
+        if url is None:
+            redirect_cache.set_missing(qr_uuid)
+            return None
+        return redirect_cache.set(qr_uuid, url)
 
     async def get_geo_info(self, ip: str) -> dict:
-        default_info = {"country": "Unknown", "timezone": "Unknown"}
-        if ip in ["127.0.0.1", "localhost", "::1"]:
-            return {"country": "Localhost", "timezone": "UTC"}
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"http://ip-api.com/json/{ip}")
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "country": data.get("country", "Unknown"),
-                        "timezone": data.get("timezone", "Unknown")
-                    }
-        except Exception:
-            pass
-        return default_info
+        return await lookup_geo_info_async(ip)
 
     async def record_scan_and_redirect(self, qr_uuid: UUID, request: Request) -> RedirectResponse:
-        # 1. Get QR code
-        qr = self.db.query(QRCode).filter(QRCode.uuid == qr_uuid).first()
-        if not qr:
+        # 1. Resolve destination (cached)
+        with stage_timer("scan", "lookup"):
+            target_url = await self.resolve_target_url(qr_uuid)
+        if target_url is None:
             raise HTTPException(status_code=404, detail="QR Code not found")
 
         # 2. Get client info
@@ -39,21 +43,29 @@ class ScanService:
         if forwarded_for:
             client_ip = forwarded_for.split(",")[0]
 
-        geo_info = await self.get_geo_info(client_ip)
+        # Deferred lookups are filled in by the ingestion flusher before the insert
+        if SCAN_WRITE_BEHIND and GEO_LOOKUP_MODE == "deferred":
+            geo_info = {"country": None, "timezone": None}
+        else:
+            with stage_timer("scan", "geo"):
+                geo_info = await self.get_geo_info(client_ip)
 
-        # 3. Record scan
-        new_scan = Scan(
-            qr_uuid=qr.uuid,
+        # 3. Record scan (queued for a batched insert unless write-behind is disabled)
+        record = ScanRecord(
+            qr_uuid=qr_uuid,
             ip=client_ip,
             country=geo_info["country"],
-            timezone=geo_info["timezone"]
+            timezone=geo_info["timezone"],
+            created_at=int(time.time() * 1000)
         )
-        self.db.add(new_scan)
-        self.db.commit()
+        with stage_timer("scan", "insert"):
+            queued = SCAN_WRITE_BEHIND and await scan_ingestion_queue.put_async(record)
+            # Write-behind disabled, or the queue stayed full in block mode
+            if not queued and (not SCAN_WRITE_BEHIND or scan_ingestion_queue.overflow == "block"):
+                if record.country is None:
+                    geo_info = await self.get_geo_info(client_ip)
+                    record.country, record.timezone = geo_info["country"], geo_info["timezone"]
+                await self.scan_repo.create(record)
 
         # 4. Redirect to destination URL
-        target_url = qr.url
-        if not (target_url.startswith("http://") or target_url.startswith("https://")):
-            target_url = f"https://{target_url}"
-        
         return RedirectResponse(url=target_url)
@@ -0,0 +1,95 @@
+"""
+Worker warm-up, run from the lifespan handler before the first request.
+Opens pooled connections ahead of time and pre-loads the in-process caches
+a scan needs (lookup table ids, redirect targets of the most scanned codes),
+so the first requests after a scale-up do not pay for connects and misses.
+Failures are printed and ignored: a cold worker is still a working one.
+"""
+
+import os
+import time
+from typing import Dict
+from dotenv import load_dotenv
+from sqlalchemy import text
+from app.src.database import SessionLocal, engine, async_engine, pool_size_per_engine, DB_POOL_MODE
+
+load_dotenv()
+
+# Connections opened per engine (capped at the pool size)
+WARM_UP_DB_CONNECTIONS = int(os.getenv("WARM_UP_DB_CONNECTIONS", 0))
+WARM_UP_SCAN_DIMENSIONS = os.getenv("WARM_UP_SCAN_DIMENSIONS", "true").lower() == "true"
+# Most scanned codes whose redirect target is cached (0 = none)
+WARM_UP_REDIRECT_CACHE = int(os.getenv("WARM_UP_REDIRECT_CACHE", 0))
+
+MOST_SCANNED = text("""
+    SELECT q.uuid, q.url
+    FROM (
+        SELECT qr_uuid, SUM(total_scans) AS scans
+        FROM qr_scan_counters GROUP BY qr_uuid
+        ORDER BY scans DESC LIMIT :limit
+    ) counters
+    JOIN qr_codes q ON q.uuid = counters.qr_uuid
+""")
+
+
+def prefill_pool(count: int) -> int:
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+async def prefill_async_pool(count: int) -> int:
+    connections = []
+    try:
+        for _ in range(count):
+            connection = async_engine.connect()
+            await connection.start()
+            connections.append(connection)
+    finally:
+        for connection in connections:
+            await connection.close()
+    return len(connections)
+
+
+def preload_caches(dimensions: bool = WARM_UP_SCAN_DIMENSIONS, redirects: int = WARM_UP_REDIRECT_CACHE) -> Dict[str, int]:
+    from app.src.repositories.scan_repository import country_ids, timezone_ids
+    from app.src.services.redirect_cache import redirect_cache
+
+    loaded = {}
+    db = SessionLocal()
+    try:
+        if dimensions:
+            loaded["countries"] = country_ids.load(db)
+            loaded["timezones"] = timezone_ids.load(db)
+        if redirects > 0:
+            rows = db.execute(MOST_SCANNED, {"limit": redirects}).all()
+            for qr_uuid, url in rows:
+                redirect_cache.set(qr_uuid, url)
+            loaded["redirects"] = len(rows)
+    finally:
+        db.close()
+    return loaded
+
+
+async def warm_up() -> Dict[str, float]:
+    """Runs every enabled step; returns what was loaded and how long warm-up took."""
+    from starlette.concurrency import run_in_threadpool
+
+    started = time.perf_counter()
+    report: Dict[str, float] = {}
+    try:
+        connections = min(WARM_UP_DB_CONNECTIONS, pool_size_per_engine()[0])
+        # Without a pool there is nothing to keep open
+        if connections > 0 and DB_POOL_MODE == "queue":
+            report["connections"] = await run_in_threadpool(prefill_pool, connections)
+            report["async_connections"] = await prefill_async_pool(connections)
+        report.update(await run_in_threadpool(preload_caches))
+    except Exception as e:
+        print(f"Warm-up incomplete: {e}")
+    report["seconds"] = time.perf_counter() - started
+    return report
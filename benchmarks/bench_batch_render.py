@@ -0,0 +1,58 @@
+"""
+Print-shop batch of one code in several sizes and colors: a full render per
+variant with the matrix encoded every time against the batch renderer (one
+matrix per code), for PNG and SVG output; plus the cost of getting a matrix
+by encoding it, from the in-process memo and from the packed stored form.
+
+    python -m benchmarks.bench_batch_render [--repeat 20] [--output batch.json]
+"""
+
+import argparse
+from app.src.services.qr_rasterizer import build_matrix, load_matrix, pack_matrix, render_qr_png, render_qr_variants
+from benchmarks.common import emit, summarize, time_calls
+
+TRACKING_URL = "https://qr.example.com/api/v1/scan/8c4f6b2e-3a1d-4c5e-9f7a-2b6d8e0c1a3f"
+SIZES = [100, 250, 500, 1000, 2000]
+COLORS = ["#000000", "#1A73E8", "#D93025"]
+
+
+def cold_render(size: int, color: str) -> bytes:
+    build_matrix.cache_clear()
+    return render_qr_png(TRACKING_URL, size, color)
+
+
+def encode_matrix():
+    build_matrix.cache_clear()
+    return build_matrix(TRACKING_URL)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    variants = [(size, color) for size in SIZES for color in COLORS]
+    runs = {
+        "per_variant_png": lambda: [cold_render(size, color) for size, color in variants],
+        "batch_png": lambda: render_qr_variants(TRACKING_URL, [(size, color, "png") for size, color in variants]),
+        "batch_svg": lambda: render_qr_variants(TRACKING_URL, [(size, color, "svg") for size, color in variants])
+    }
+    results = []
+    for mode, run in runs.items():
+        build_matrix.cache_clear()
+        results.append(summarize("batch_render", time_calls(run, args.repeat, warmup=0), mode=mode, variants=len(variants)))
+
+    packed = pack_matrix(build_matrix(TRACKING_URL), TRACKING_URL)
+    matrix_sources = {
+        "encode": encode_matrix,
+        "memoized": lambda: build_matrix(TRACKING_URL),
+        "packed": lambda: load_matrix(TRACKING_URL, packed_matrix=packed)
+    }
+    for source, run in matrix_sources.items():
+        results.append(summarize("qr_matrix", time_calls(run, args.repeat * 10), source=source))
+    emit("batch_render", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Sustained scan rate on a single hot QR code: flusher threads insert batches of
+scans of the same code on a fixed schedule (--rate scans/sec overall), as the
+write-behind queues of several workers would, with the sharded counters
+merging in the background. Reports the achieved rate, how late batches ran
+against the schedule and the batch insert latency, and checks that the
+merged counter equals the scans inserted.
+
+    python -m benchmarks.bench_hot_counter [--rate 10000] [--seconds 10] [--flushers 4] [--batch-size 500]
+"""
+
+import argparse
+import threading
+import time
+import uuid
+from typing import List
+from sqlalchemy import text
+from app.src.database import SessionLocal, engine
+from app.src.repositories import scan_repository
+from app.src.repositories.scan_repository import ScanRepository
+from app.src.services.scan_counters import ShardedScanCounters
+from app.src.services.scan_ingestion import ScanRecord
+from benchmarks.common import emit, summarize
+from benchmarks.datagen import drop_dataset, seed_dataset
+
+SEED = 21
+
+
+def run(qr_uuid: uuid.UUID, rate: int, seconds: float, flushers: int, batch_size: int) -> dict:
+    interval = batch_size / rate
+    batches = max(1, int(rate * seconds / batch_size))
+    latencies: List[List[float]] = [[] for _ in range(flushers)]
+    lag: List[List[float]] = [[] for _ in range(flushers)]
+    started = time.perf_counter() + 0.1
+
+    def flusher(index: int) -> None:
+        db = SessionLocal()
+        try:
+            repository = ScanRepository(db)
+            # Batches are dealt round-robin, so together the threads keep the overall rate
+            for batch in range(index, batches, flushers):
+                due = started + batch * interval
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                lag[index].append(max(0.0, -delay) * 1000)
+                now = int(time.time() * 1000)
+                records = [
+                    ScanRecord(qr_uuid, f"10.{index}.{batch % 256}.{position % 256}", "Argentina", "America/Buenos_Aires", now)
+                    for position in range(batch_size)
+                ]
+                insert_started = time.perf_counter()
+                repository.create_many(records)
+                latencies[index].append((time.perf_counter() - insert_started) * 1000)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=flusher, args=(index,)) for index in range(flushers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        "inserted": batches * batch_size,
+        "elapsed": elapsed,
+        "latencies": [sample for samples in latencies for sample in samples],
+        "lag": [sample for samples in lag for sample in samples]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=int, default=10000, help="target scans per second")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--flushers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--merge-interval-ms", type=int, default=1000)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    manifest = seed_dataset(SEED, qr_codes=1)
+    qr_uuid = uuid.UUID(manifest["qr_uuids"][0])
+    counters = ShardedScanCounters(flush_interval_ms=args.merge_interval_ms)
+    scan_repository.scan_counters = counters
+    try:
+        result = run(qr_uuid, args.rate, args.seconds, args.flushers, args.batch_size)
+        counters.stop()
+        with engine.connect() as connection:
+            counted = connection.execute(
+                text("SELECT COALESCE(SUM(total_scans), 0) FROM qr_scan_counters WHERE qr_uuid = :qr_uuid"),
+                {"qr_uuid": qr_uuid}
+            ).scalar()
+        if counted != result["inserted"]:
+            raise RuntimeError(f"counter is {counted}, {result['inserted']} scans were inserted")
+
+        params = {"target_rate": args.rate, "flushers": args.flushers, "batch_size": args.batch_size}
+        achieved = result["inserted"] / result["elapsed"]
+        emit("hot_counter", [
+            summarize("batch_insert", result["latencies"], result["elapsed"], achieved_rate=round(achieved), **params),
+            summarize("schedule_lag", result["lag"], **params),
+            summarize("counter_merge", [counters.stats()["last_flush_ms"]], merges=counters.stats()["flushes"])
+        ], args.output)
+    finally:
+        drop_dataset(SEED)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Password verification cost and login throughput at different hashing
+settings, with no database: single verifications on the calling thread, then
+a burst of concurrent verifications through the bounded password hasher while
+a ticker measures how late the event loop runs (what other endpoints feel).
+
+    python -m benchmarks.bench_login [--bcrypt-rounds 10,12] [--argon2] [--logins 200] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+from app.src.services.password_hasher import PasswordHasher, PASSWORD_HASH_WORKERS, build_context
+from benchmarks.common import emit, summarize, time_calls
+
+PASSWORD = "bench-password-123"
+
+
+async def burst(hasher: PasswordHasher, stored_hash: str, logins: int, concurrency: int) -> tuple:
+    samples: List[float] = []
+    lag: List[float] = []
+    remaining = iter(range(logins))
+    done = asyncio.Event()
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            valid, _ = await hasher.verify_and_update_async(PASSWORD, stored_hash)
+            samples.append((time.perf_counter() - started) * 1000)
+            if not valid:
+                raise RuntimeError("verification failed")
+
+    async def ticker():
+        # A 1 ms sleep that wakes up late means the loop was busy
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag.append((time.perf_counter() - started) * 1000 - 1)
+
+    ticking = asyncio.ensure_future(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticking
+    return samples, elapsed, lag
+
+
+def bench_setting(name: str, context, logins: int, concurrency: int, workers: int) -> list:
+    stored_hash = context.hash(PASSWORD)
+    results = [summarize("verify", time_calls(lambda: context.verify(PASSWORD, stored_hash), 5), setting=name)]
+
+    # Pending slots sized to the burst, so the whole burst is measured rather than rejected
+    hasher = PasswordHasher(context=context, workers=workers, max_pending=concurrency)
+    try:
+        samples, elapsed, lag = asyncio.run(burst(hasher, stored_hash, logins, concurrency))
+    finally:
+        hasher.shutdown()
+    results.append(summarize("login_burst", samples, elapsed, setting=name, concurrency=concurrency, workers=workers))
+    results.append(summarize("event_loop_lag", lag, setting=name, concurrency=concurrency))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bcrypt-rounds", default="10,12")
+    parser.add_argument("--argon2", action="store_true", help="also measure argon2id (needs argon2-cffi)")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=PASSWORD_HASH_WORKERS)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    settings = [(f"bcrypt-{rounds}", build_context("bcrypt", bcrypt_rounds=int(rounds))) for rounds in args.bcrypt_rounds.split(",")]
+    if args.argon2:
+        settings.append(("argon2id", build_context("argon2")))
+
+    results = []
+    for name, context in settings:
+        results += bench_setting(name, context, args.logins, args.concurrency, args.workers)
+    emit("login", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Micro-benchmarks for the hot paths, with no database or network:
+QR image generation across sizes and colors, JWT decoding, and serialization
+of get_stats responses.
+
+    python -m benchmarks.bench_micro [--repeat 50] [--stats-rows 1000,100000,1000000] [--output micro.json]
+"""
+
+import os
+
+# Render in-process so the timings are the rendering itself, not pool hand-off
+os.environ.setdefault("RENDER_EXECUTOR", "thread")
+
+import argparse
+import random
+import uuid
+from types import SimpleNamespace
+from app.src.schemas.stats import QRCodeStats
+from app.src.services.auth_service import AuthService
+from app.src.services.image_cache import image_cache
+from app.src.services.qr_code_service import QRCodeService
+from app.src.services.render_executor import render_executor
+from benchmarks.common import emit, summarize, time_calls
+
+TRACKING_URL = "https://qr.example.com/api/v1/scan/8c4f6b2e-3a1d-4c5e-9f7a-2b6d8e0c1a3f"
+SIZES = [100, 250, 500, 1000, 2000]
+COLORS = ["black", "#1A73E8"]
+
+
+def bench_generate_qr_image(repeat: int) -> list:
+    results = []
+    for size in SIZES:
+        for color in COLORS:
+            qr_model = SimpleNamespace(color=color, size=size)
+
+            def generate():
+                # Every call is a cache miss
+                image_cache.clear()
+                QRCodeService.generate_qr_image(qr_model, TRACKING_URL)
+
+            results.append(summarize("generate_qr_image", time_calls(generate, repeat), size=size, color=color))
+    return results
+
+
+def bench_decode_token(repeat: int) -> list:
+    token = AuthService.create_access_token({"sub": "bench@example.com"})
+    samples = time_calls(lambda: AuthService.decode_token(token), repeat * 20)
+    return [summarize("decode_token", samples)]
+
+
+def make_scan_rows(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    qr_uuid = uuid.UUID(int=rng.getrandbits(128), version=4)
+    return [
+        {
+            "uuid": uuid.UUID(int=rng.getrandbits(128), version=4),
+            "qr_uuid": qr_uuid,
+            "ip": f"10.0.{rng.randrange(256)}.{rng.randrange(256)}",
+            "country": "Argentina",
+            "timezone": "America/Argentina/Buenos_Aires",
+            "created_at": 1_750_000_000_000 - index
+        }
+        for index in range(count)
+    ]
+
+
+def bench_stats_serialization(row_counts: list) -> list:
+    results = []
+    for count in row_counts:
+        rows = make_scan_rows(count)
+        payload = {"qr_uuid": rows[0]["qr_uuid"], "total_scans": count, "scans": rows, "next_cursor": None}
+
+        def serialize():
+            # What FastAPI does with the response_model: validate, then dump to JSON
+            QRCodeStats.model_validate(payload).model_dump_json()
+
+        repeat = max(3, min(50, 200_000 // count))
+        results.append(summarize("get_stats_serialization", time_calls(serialize, repeat), rows=count))
+        del rows, payload
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--stats-rows", default="1000,100000,1000000")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    render_executor.start()
+    try:
+        results = bench_generate_qr_image(args.repeat)
+        results += bench_decode_token(args.repeat)
+        results += bench_stats_serialization([int(count) for count in args.stats_rows.split(",")])
+    finally:
+        render_executor.shutdown()
+    emit("micro", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
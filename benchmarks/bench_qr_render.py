@@ -0,0 +1,66 @@
+"""
+Compares the original render path (box_size=10 image + LANCZOS resize) with
+the direct-to-size rasterizer.
+
+    python -m benchmarks.bench_qr_render [--repeat 50]
+"""
+
+import argparse
+import statistics
+import time
+from io import BytesIO
+import qrcode
+from PIL import Image
+from app.src.services.qr_rasterizer import render_png
+
+TRACKING_URL = "https://qr.example.com/api/v1/scan/8c4f6b2e-3a1d-4c5e-9f7a-2b6d8e0c1a3f"
+SIZES = [100, 250, 500, 1000, 2000]
+COLOR = "#1A73E8"
+
+
+def make_qr() -> qrcode.QRCode:
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
+    qr.add_data(TRACKING_URL)
+    qr.make(fit=True)
+    return qr
+
+
+def legacy_render(size: int) -> bytes:
+    img = make_qr().make_image(fill_color=COLOR, back_color="white")
+    img = img.resize((size, size), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def rasterizer_render(size: int) -> bytes:
+    return render_png(make_qr().get_matrix(), size, COLOR)
+
+
+def measure(fn, size: int, repeat: int) -> dict:
+    fn(size)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = fn(size)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": statistics.median(timings), "bytes": len(output)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'legacy ms':>10} {'raster ms':>10} {'speedup':>8} {'legacy B':>9} {'raster B':>9}")
+    for size in SIZES:
+        legacy = measure(legacy_render, size, args.repeat)
+        raster = measure(rasterizer_render, size, args.repeat)
+        print(
+            f"{size:>6} {legacy['median_ms']:>10.2f} {raster['median_ms']:>10.2f} "
+            f"{legacy['median_ms'] / raster['median_ms']:>7.1f}x {legacy['bytes']:>9} {raster['bytes']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+End-to-end load driver for the scan redirect.
+Seeds a dataset, then issues scans at a fixed concurrency and reports latency
+percentiles and throughput as JSON. No network access is needed: the
+in-process mode installs a stub geo resolver, and the HTTP mode starts uvicorn
+with the HTTP geo fallback disabled.
+
+    python -m benchmarks.bench_scan_e2e --mode asgi [--requests 5000] [--concurrency 100]
+    python -m benchmarks.bench_scan_e2e --mode http [--workers 2] [--url http://127.0.0.1:8000]
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import List, Optional
+import httpx
+from benchmarks.common import emit, summarize
+from benchmarks.datagen import drop_dataset, seed_dataset
+
+
+async def drive(client: httpx.AsyncClient, paths: List[str], total: int, concurrency: int) -> tuple:
+    samples: List[float] = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for index in remaining:
+            # Spoofed client addresses spread the geo lookups like real traffic
+            headers = {"X-Forwarded-For": f"10.1.{index // 256 % 256}.{index % 256}"}
+            started = time.perf_counter()
+            response = await client.get(paths[index % len(paths)], headers=headers)
+            samples.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 307:
+                errors += 1
+
+    await client.get(paths[0])
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started, errors
+
+
+async def run_asgi(paths: List[str], total: int, concurrency: int) -> tuple:
+    from app.src.main import app
+    from app.src.services.geo_resolver import set_geo_resolver
+    from benchmarks.stub_geo import StubGeoResolver
+
+    set_geo_resolver(StubGeoResolver())
+    transport = httpx.ASGITransport(app=app)
+    # The lifespan (write-behind flusher, render pool) is not run by the transport
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await drive(client, paths, total, concurrency)
+
+
+async def run_http(url: str, paths: List[str], total: int, concurrency: int) -> tuple:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        return await drive(client, paths, total, concurrency)
+
+
+def start_uvicorn(port: int, workers: int) -> subprocess.Popen:
+    env = {**os.environ, "GEO_HTTP_FALLBACK": "false"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.src.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["asgi", "http"], default="asgi")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--qr-codes", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="HTTP mode: target an already running server instead of starting uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    manifest = seed_dataset(args.seed, qr_codes=args.qr_codes)
+    paths = [f"/api/v1/scan/{qr_uuid}" for qr_uuid in manifest["qr_uuids"]]
+    server: Optional[subprocess.Popen] = None
+    try:
+        if args.mode == "asgi":
+            samples, elapsed, errors = asyncio.run(run_asgi(paths, args.requests, args.concurrency))
+        else:
+            url = args.url
+            if not url:
+                server = start_uvicorn(args.port, args.workers)
+                url = f"http://127.0.0.1:{args.port}"
+            samples, elapsed, errors = asyncio.run(run_http(url, paths, args.requests, args.concurrency))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        drop_dataset(args.seed)
+
+    result = summarize(
+        "scan_redirect",
+        samples,
+        elapsed_seconds=elapsed,
+        mode=args.mode,
+        concurrency=args.concurrency,
+        workers=args.workers if args.mode == "http" else 1
+    )
+    result["errors"] = errors
+    emit("scan_e2e", [result], args.output)
+
+
+if __name__ == "__main__":
+    main()
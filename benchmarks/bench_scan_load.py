@@ -0,0 +1,115 @@
+"""
+Scan endpoint throughput on a single worker: the original path (synchronous
+Session used from the async handler) against the AsyncSession path.
+Requests are driven in-process through the ASGI app, so both variants share
+one event loop, the same database and the same concurrency.
+
+    python -m benchmarks.bench_scan_load [--requests 2000] [--concurrency 200]
+"""
+
+import os
+
+# Measure the database round trips, not the redirect cache or the ingestion queue
+os.environ["REDIRECT_CACHE_SIZE"] = "0"
+os.environ["SCAN_WRITE_BEHIND"] = "false"
+
+import argparse
+import asyncio
+import time
+from typing import List
+from uuid import UUID
+import httpx
+from fastapi import Depends, HTTPException, Request
+from fastapi.responses import RedirectResponse
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.src.database import SessionLocal, get_db, engine
+from app.src.migrations import upgrade
+from app.src.main import app
+from app.src.models.qr_code import QRCode
+from app.src.models.users import User
+from app.src.repositories.scan_repository import ScanRepository
+from app.src.services.scan_ingestion import ScanRecord
+
+BENCH_EMAIL = "bench-scan-load@example.com"
+# Spread scans over many codes so they do not all contend on one counter row
+BENCH_QR_CODES = 500
+
+
+@app.get("/bench/legacy-scan/{qr_uuid}", include_in_schema=False)
+async def legacy_scan(qr_uuid: UUID, request: Request, db: Session = Depends(get_db)):
+    # Blocking calls on the event loop, as the handler did before the async engine
+    url = db.query(QRCode.url).filter(QRCode.uuid == qr_uuid).scalar()
+    if url is None:
+        raise HTTPException(status_code=404, detail="QR Code not found")
+    ScanRepository(db).create(ScanRecord(
+        qr_uuid=qr_uuid,
+        ip=request.client.host,
+        country="Local",
+        timezone="UTC",
+        created_at=int(time.time() * 1000)
+    ))
+    return RedirectResponse(url=url)
+
+
+def seed_qr_codes(count: int) -> List[UUID]:
+    upgrade()
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == BENCH_EMAIL).first()
+        if user is None:
+            user = User(email=BENCH_EMAIL, password_hash="x")
+            db.add(user)
+            db.flush()
+        qr_codes = [QRCode(url="https://example.com", user_uuid=user.uuid, color="black", size=250) for _ in range(count)]
+        db.add_all(qr_codes)
+        db.commit()
+        return [qr_code.uuid for qr_code in qr_codes]
+    finally:
+        db.close()
+
+
+def cleanup(user_email: str) -> None:
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM users WHERE email = :email"), {"email": user_email})
+
+
+async def run_load(prefix: str, qr_uuids: List[UUID], total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        paths = [f"{prefix}/{qr_uuid}" for qr_uuid in qr_uuids]
+        remaining = iter(range(total))
+
+        async def worker():
+            for i in remaining:
+                response = await client.get(paths[i % len(paths)])
+                if response.status_code != 307:
+                    raise RuntimeError(f"{prefix} returned {response.status_code}")
+
+        await client.get(paths[0])
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    qr_uuids = seed_qr_codes(BENCH_QR_CODES)
+    try:
+        legacy = asyncio.run(run_load("/bench/legacy-scan", qr_uuids, args.requests, args.concurrency))
+        current = asyncio.run(run_load("/api/v1/scan", qr_uuids, args.requests, args.concurrency))
+    finally:
+        cleanup(BENCH_EMAIL)
+
+    print(f"{'path':>8} {'scans/s':>10}")
+    print(f"{'sync':>8} {legacy:>10.0f}")
+    print(f"{'async':>8} {current:>10.0f}")
+    print(f"speedup {current / legacy:.1f}x (concurrency {args.concurrency}, 1 worker)")
+
+
+if __name__ == "__main__":
+    main()
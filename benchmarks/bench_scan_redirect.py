@@ -0,0 +1,111 @@
+"""
+App time of a cached scan redirect: the raw ASGI fast path against the
+regular FastAPI handler. Requests are plain ASGI calls on one event loop (no
+HTTP client or server), both variants hit a warm redirect cache and enqueue
+to the write-behind queue, and geo lookups are deferred to the flusher.
+
+    python -m benchmarks.bench_scan_redirect [--requests 20000] [--output redirect.json]
+"""
+
+import os
+
+os.environ["SCAN_WRITE_BEHIND"] = "true"
+os.environ["SCAN_FAST_PATH"] = "true"
+os.environ["GEO_LOOKUP_MODE"] = "deferred"
+
+import argparse
+import asyncio
+import time
+from typing import List
+from benchmarks.common import emit, summarize
+from benchmarks.datagen import drop_dataset, seed_dataset
+
+SEED = 19
+
+
+def find_fast_path(app):
+    from app.src.handlers.scan_fast_path import ScanFastPathMiddleware
+
+    layer = app.middleware_stack
+    while layer is not None and not isinstance(layer, ScanFastPathMiddleware):
+        layer = getattr(layer, "app", None)
+    return layer
+
+
+async def measure(app, paths: List[str], total: int) -> List[float]:
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    samples = []
+    for index in range(total):
+        path = paths[index % len(paths)]
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"bench"), (b"x-forwarded-for", f"10.2.{index // 256 % 256}.{index % 256}".encode())],
+            "client": ("10.0.0.1", 50000),
+            "server": ("bench", 80),
+            "app": app
+        }
+        started = time.perf_counter()
+        await app(scope, receive, send)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    if any(code != 307 for code in status):
+        raise RuntimeError(f"unexpected status codes: {sorted(set(status))}")
+    return samples
+
+
+async def run(paths: List[str], total: int) -> list:
+    from app.src.main import app
+    from app.src.services.geo_resolver import set_geo_resolver
+    from app.src.services.scan_ingestion import scan_ingestion_queue
+    from benchmarks.stub_geo import StubGeoResolver
+
+    set_geo_resolver(StubGeoResolver())
+    results = []
+    async with app.router.lifespan_context(app):
+        # Warms the redirect cache and builds the middleware stack
+        await measure(app, paths, len(paths))
+        fast_path = find_fast_path(app)
+        for name, enabled in (("regular", False), ("fast_path", True)):
+            fast_path.enabled = enabled
+            samples = await measure(app, paths, total)
+            results.append(summarize("scan_redirect", samples, path=name))
+            # Keeps the flusher's backlog out of the next variant
+            while scan_ingestion_queue.stats()["depth"]:
+                await asyncio.sleep(0.05)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--qr-codes", type=int, default=100)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    manifest = seed_dataset(SEED, qr_codes=args.qr_codes)
+    try:
+        paths = [f"/api/v1/scan/{qr_uuid}" for qr_uuid in manifest["qr_uuids"]]
+        results = asyncio.run(run(paths, args.requests))
+    finally:
+        drop_dataset(SEED)
+    emit("scan_redirect", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Startup profile: where a worker spends its boot time. Imports the app in a
+fresh interpreter with -X importtime and reports the slowest modules by
+cumulative and self time, then times the lifespan startup (warm-up, executor
+start) in process. Run it before and after touching imports at module level.
+
+    python -m benchmarks.bench_startup [--top 15] [--runs 5] [--no-lifespan]
+"""
+
+import argparse
+import asyncio
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+from benchmarks.common import emit, summarize
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(module: str) -> Tuple[float, Dict[str, Tuple[float, float]]]:
+    """Wall time of one import of the module and (self_ms, cumulative_ms) per imported module."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)) / 1000, int(match.group(2)) / 1000)
+    return elapsed, modules
+
+
+async def lifespan_startup() -> float:
+    from app.src.main import app, lifespan
+
+    started = time.perf_counter()
+    async with lifespan(app):
+        elapsed = (time.perf_counter() - started) * 1000
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app.src.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--no-lifespan", action="store_true", help="skip the lifespan (no database needed)")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    wall: List[float] = []
+    runs: List[Dict[str, Tuple[float, float]]] = []
+    for _ in range(args.runs):
+        elapsed, modules = import_profile(args.module)
+        wall.append(elapsed)
+        runs.append(modules)
+
+    results = [summarize("interpreter_and_import", wall, module=args.module)]
+    # Medians per module, so one slow run (cold disk cache) does not pick the list
+    names = set().union(*runs)
+    cumulative = {name: sorted(run.get(name, (0.0, 0.0))[1] for run in runs)[len(runs) // 2] for name in names}
+    own = {name: sorted(run.get(name, (0.0, 0.0))[0] for run in runs)[len(runs) // 2] for name in names}
+    for rank, name in enumerate(sorted(cumulative, key=cumulative.get, reverse=True)[:args.top], 1):
+        results.append(summarize("import_cumulative", [cumulative[name]], module=name, rank=rank))
+    for rank, name in enumerate(sorted(own, key=own.get, reverse=True)[:args.top], 1):
+        results.append(summarize("import_self", [own[name]], module=name, rank=rank))
+
+    if not args.no_lifespan:
+        results.append(summarize("lifespan_startup", [asyncio.run(lifespan_startup())]))
+    emit("startup", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
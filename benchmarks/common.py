@@ -0,0 +1,74 @@
+"""
+Shared helpers for the benchmark scripts: timing, percentiles and the JSON
+result format used to compare runs between commits (see benchmarks.compare).
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, List, Optional
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def summarize(name: str, samples_ms: List[float], elapsed_seconds: Optional[float] = None, **params) -> dict:
+    """One result entry; throughput comes from the wall time when the samples overlapped."""
+    samples = sorted(samples_ms)
+    total_seconds = elapsed_seconds if elapsed_seconds is not None else sum(samples) / 1000
+    return {
+        "name": name,
+        "params": params,
+        "iterations": len(samples),
+        "p50_ms": percentile(samples, 0.50),
+        "p90_ms": percentile(samples, 0.90),
+        "p99_ms": percentile(samples, 0.99),
+        "max_ms": samples[-1] if samples else 0.0,
+        "mean_ms": sum(samples) / len(samples) if samples else 0.0,
+        "ops_per_sec": len(samples) / total_seconds if total_seconds else 0.0
+    }
+
+
+def time_calls(fn: Callable[[], object], repeat: int, warmup: int = 1) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": int(time.time())
+    }
+
+
+def emit(benchmark: str, results: List[dict], output: Optional[str] = None) -> dict:
+    report = {"benchmark": benchmark, "environment": environment(), "results": results}
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return report
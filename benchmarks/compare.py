@@ -0,0 +1,48 @@
+"""
+Compares two benchmark JSON reports and flags regressions.
+
+    python -m benchmarks.compare before.json after.json [--threshold 10]
+
+Exits with status 1 when any p50 or p99 grew by more than the threshold (%).
+"""
+
+import argparse
+import json
+import sys
+
+
+def result_key(result: dict) -> str:
+    params = ",".join(f"{key}={value}" for key, value in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = {result_key(result): result for result in json.load(f)["results"]}
+    with open(args.after) as f:
+        after = {result_key(result): result for result in json.load(f)["results"]}
+
+    regressed = False
+    print(f"{'benchmark':<60} {'p50 before':>11} {'p50 after':>10} {'p99 before':>11} {'p99 after':>10}")
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        flags = []
+        for metric in ("p50_ms", "p99_ms"):
+            if old[metric] and (new[metric] - old[metric]) / old[metric] * 100 > args.threshold:
+                flags.append(metric)
+        regressed = regressed or bool(flags)
+        print(
+            f"{key:<60} {old['p50_ms']:>11.3f} {new['p50_ms']:>10.3f} "
+            f"{old['p99_ms']:>11.3f} {new['p99_ms']:>10.3f} {'REGRESSED ' + ','.join(flags) if flags else ''}"
+        )
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Seeded dataset generator for the benchmarks.
+The same seed always produces the same users, QR codes and scans, so runs on
+different commits measure the same data.
+
+    python -m benchmarks.datagen --seed 1 --qr-codes 100 --scans-per-qr 1000
+    python -m benchmarks.datagen --seed 1 --drop
+"""
+
+import argparse
+import random
+import uuid
+from typing import List
+from sqlalchemy import insert, text
+from app.src.database import SessionLocal, engine
+from app.src.migrations import upgrade
+from app.src.models.qr_code import QRCode
+from app.src.models.users import User
+from app.src.repositories.scan_repository import ScanRepository
+from app.src.services.auth_service import AuthService
+from app.src.services.scan_ingestion import ScanRecord
+from benchmarks.stub_geo import LOCATIONS
+
+BENCH_PASSWORD = "bench-password"
+# Scans are spread over the 30 days before this instant (fixed for reproducibility)
+EPOCH_MS = 1_750_000_000_000
+SPAN_MS = 30 * 24 * 60 * 60 * 1000
+
+
+def bench_email(seed: int) -> str:
+    return f"bench-{seed}@example.com"
+
+
+def seed_dataset(seed: int, qr_codes: int = 100, scans_per_qr: int = 0, chunk_size: int = 5000) -> dict:
+    """Creates (or recreates) the dataset for `seed`; returns its manifest."""
+    upgrade()
+    drop_dataset(seed)
+    rng = random.Random(seed)
+
+    def next_uuid() -> uuid.UUID:
+        return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+    db = SessionLocal()
+    try:
+        user = User(uuid=next_uuid(), email=bench_email(seed), password_hash=AuthService.get_password_hash(BENCH_PASSWORD))
+        db.add(user)
+        db.commit()
+
+        rows = [
+            {
+                "uuid": next_uuid(),
+                "url": f"https://example.com/{seed}/{index}",
+                "color": "#000000",
+                "size": 250,
+                "user_uuid": user.uuid,
+                "created_at": EPOCH_MS - SPAN_MS + index,
+                "updated_at": EPOCH_MS - SPAN_MS + index
+            }
+            for index in range(qr_codes)
+        ]
+        if rows:
+            db.execute(insert(QRCode.__table__), rows)
+            db.commit()
+        qr_uuids = [row["uuid"] for row in rows]
+
+        repository = ScanRepository(db)
+        batch: List[ScanRecord] = []
+        for qr_uuid in qr_uuids:
+            for _ in range(scans_per_qr):
+                country, timezone = LOCATIONS[rng.randrange(len(LOCATIONS))]
+                batch.append(ScanRecord(
+                    qr_uuid=qr_uuid,
+                    ip=f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+                    country=country,
+                    timezone=timezone,
+                    created_at=EPOCH_MS - rng.randrange(SPAN_MS)
+                ))
+                if len(batch) >= chunk_size:
+                    repository.create_many(batch)
+                    batch = []
+        if batch:
+            repository.create_many(batch)
+
+        return {
+            "seed": seed,
+            "email": user.email,
+            "password": BENCH_PASSWORD,
+            "user_uuid": str(user.uuid),
+            "qr_uuids": [str(qr_uuid) for qr_uuid in qr_uuids],
+            "scans_per_qr": scans_per_qr
+        }
+    finally:
+        db.close()
+
+
+def drop_dataset(seed: int) -> None:
+    # Codes, scans, rollups and counters cascade from the user
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM users WHERE email = :email"), {"email": bench_email(seed)})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--qr-codes", type=int, default=100)
+    parser.add_argument("--scans-per-qr", type=int, default=0)
+    parser.add_argument("--drop", action="store_true", help="Delete the dataset of this seed and exit")
+    args = parser.parse_args()
+
+    if args.drop:
+        drop_dataset(args.seed)
+        return
+    manifest = seed_dataset(args.seed, args.qr_codes, args.scans_per_qr)
+    print(f"Seeded {len(manifest['qr_uuids'])} QR codes for {manifest['email']}")
+
+
+if __name__ == "__main__":
+    main()
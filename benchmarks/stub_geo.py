@@ -0,0 +1,20 @@
+"""Deterministic, network-free geo resolver for benchmarks."""
+
+import zlib
+from typing import Optional
+from app.src.services.geo_resolver import GeoResolver
+
+LOCATIONS = [
+    ("Argentina", "America/Argentina/Buenos_Aires"),
+    ("Brazil", "America/Sao_Paulo"),
+    ("Germany", "Europe/Berlin"),
+    ("India", "Asia/Kolkata"),
+    ("Japan", "Asia/Tokyo"),
+    ("United States", "America/New_York"),
+]
+
+
+class StubGeoResolver(GeoResolver):
+    def resolve(self, ip: str) -> Optional[dict]:
+        country, timezone = LOCATIONS[zlib.crc32(ip.encode("utf-8")) % len(LOCATIONS)]
+        return {"country": country, "timezone": timezone}
@@ -1,10 +1,22 @@
 import pytest
 import os
+
+# Scans are written inline so tests can read them back right after the request
+os.environ.setdefault("SCAN_WRITE_BEHIND", "false")
+# Tests create partitions explicitly instead of a background thread on the main database
+os.environ.setdefault("SCAN_PARTITION_MAINTENANCE_INTERVAL_SECONDS", "0")
+# Counters are updated with each scan batch; the merger thread would write to the main database
+os.environ.setdefault("SCAN_COUNTER_FLUSH_INTERVAL_MS", "0")
+# Warm-up runs against the main database; cached lookup ids would not exist in the test one
+os.environ.setdefault("WARM_UP_SCAN_DIMENSIONS", "false")
+
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.src.main import app
-from app.src.database import Base, get_db, DATABASE_URL
+from app.src.database import Base, get_db, get_async_db, DATABASE_URL, to_async_url
 
 # Build test URL dynamically: replacement 'qr_challenge' with 'qr_challenge_test'
 # or use what's in TEST_DATABASE_URL environment variable.
@@ -20,6 +32,10 @@ if not TEST_DATABASE_URL:
 engine = create_engine(TEST_DATABASE_URL)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The TestClient runs the app on its own event loop, so async connections are not pooled
+async_engine = create_async_engine(to_async_url(TEST_DATABASE_URL), poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_db():
     """
@@ -40,18 +56,22 @@ def setup_test_db():
 @pytest.fixture
 def db_session():
     """
-    Function-level fixture that provides a transactional database session.
-    Rolls back changes after each test.
+    Function-level fixture that provides a database session.
+    Changes are committed so the async engine can see them, and every table is
+    truncated after each test.
     """
-    connection = engine.connect()
-    transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
+    session = TestingSessionLocal()
 
     yield session
 
     session.close()
-    transaction.rollback()
-    connection.close()
+    # Lookup tables are kept: their ids stay cached in-process across tests
+    tables = ", ".join(
+        table.name for table in Base.metadata.sorted_tables
+        if table.name not in ("scan_countries", "scan_timezones")
+    )
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {tables} CASCADE"))
 
 @pytest.fixture
 def client(db_session):
@@ -64,7 +84,12 @@ def client(db_session):
         finally:
             pass
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
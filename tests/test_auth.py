@@ -56,3 +56,21 @@ def test_login_wrong_password(client):
         data={"username": email, "password": "wrongpassword"}
     )
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_deleted_user_token_is_revoked(client, db_session):
+    from app.src.models.users import User
+    email = "revoked@example.com"
+    password = "password123"
+    client.post("/api/v1/auth/register", json={"email": email, "password": password})
+    token = client.post(
+        "/api/v1/auth/login",
+        data={"username": email, "password": password}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/api/v1/qr-codes/", headers=headers).status_code == status.HTTP_200_OK
+
+    db_session.delete(db_session.query(User).filter(User.email == email).first())
+    db_session.commit()
+
+    assert client.get("/api/v1/qr-codes/", headers=headers).status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,112 @@
+import io
+import json
+import zipfile
+import pytest
+from unittest.mock import patch
+from fastapi import status
+from app.src.repositories.qr_code_repository import QRCodeRepository
+
+@pytest.fixture
+def auth_header(client):
+    email = "bulkuser@example.com"
+    password = "password123"
+    client.post("/api/v1/auth/register", json={"email": email, "password": password})
+    response = client.post("/api/v1/auth/login", data={"username": email, "password": password})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def test_bulk_create_json_array(client, auth_header):
+    items = [{"url": f"https://example.com/{i}", "color": "#000000", "size": 200} for i in range(5)]
+    response = client.post("/api/v1/qr-codes/bulk", json=items, headers=auth_header)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["url"] for r in records] == [item["url"] for item in items]
+    assert all("uuid" in r for r in records)
+
+    listed = client.get("/api/v1/qr-codes/", headers=auth_header).json()
+    assert len(listed) == 5
+
+def test_bulk_create_ndjson_to_zip(client, auth_header):
+    body = "\n".join(
+        json.dumps({"url": f"https://example.com/{i}", "color": "#FF0000", "size": 150}) for i in range(3)
+    )
+    response = client.post(
+        "/api/v1/qr-codes/bulk?format=zip",
+        content=body,
+        headers={**auth_header, "Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    names = archive.namelist()
+    assert len(names) == 3
+    assert all(archive.read(name).startswith(b"\x89PNG") for name in names)
+
+def test_bulk_create_invalid_item_inserts_nothing(client, auth_header):
+    items = [
+        {"url": "https://example.com/ok", "color": "#000000", "size": 200},
+        {"url": "https://example.com/missing-size", "color": "#000000"},
+    ]
+    response = client.post("/api/v1/qr-codes/bulk", json=items, headers=auth_header)
+
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith("Item 1")
+    assert client.get("/api/v1/qr-codes/", headers=auth_header).json() == []
+
+def test_bulk_create_failed_chunk_inserts_nothing(client, auth_header):
+    items = [{"url": f"https://example.com/{i}", "color": "#000000", "size": 200} for i in range(5)]
+    create_many = QRCodeRepository.create_many
+    calls = []
+
+    def fail_third_chunk(self, chunk, user_uuid, commit=True):
+        calls.append(len(chunk))
+        if len(calls) == 3:
+            raise RuntimeError("connection lost")
+        return create_many(self, chunk, user_uuid, commit=commit)
+
+    with patch("app.src.services.bulk_qr_service.BULK_INSERT_CHUNK_SIZE", 2), \
+            patch.object(QRCodeRepository, "create_many", fail_third_chunk):
+        response = client.post("/api/v1/qr-codes/bulk", json=items, headers=auth_header)
+
+    assert response.status_code == 500
+    assert calls == [2, 2, 1]
+    # The first two chunks were rolled back with the failed one, so the request can be retried as is
+    assert client.get("/api/v1/qr-codes/", headers=auth_header).json() == []
+
+def test_batch_render_variants_to_zip(client, auth_header):
+    first = client.post(
+        "/api/v1/qr-codes/",
+        json={"url": "https://example.com/print", "color": "#000000", "size": 200},
+        headers=auth_header
+    ).headers["X-QR-UUID"]
+    variants = [
+        {"qr_uuid": first},
+        {"qr_uuid": first, "size": 600, "color": "#FF0000"},
+        {"qr_uuid": first, "format": "svg"},
+        {"qr_uuid": first}
+    ]
+    response = client.post("/api/v1/qr-codes/render", json=variants, headers=auth_header)
+
+    assert response.status_code == status.HTTP_200_OK
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert sorted(archive.namelist()) == sorted([
+        f"qr_{first}_200_000000.png",
+        f"qr_{first}_600_ff0000.png",
+        f"qr_{first}_200_000000.svg"
+    ])
+    assert archive.read(f"qr_{first}_600_ff0000.png").startswith(b"\x89PNG")
+    assert archive.read(f"qr_{first}_200_000000.svg").startswith(b"<svg")
+
+def test_batch_render_rejects_unknown_codes_and_colors(client, auth_header):
+    missing = "00000000-0000-0000-0000-000000000000"
+    response = client.post("/api/v1/qr-codes/render", json=[{"qr_uuid": missing}], headers=auth_header)
+    assert response.status_code == 404
+    assert missing in response.json()["detail"]
+
+    response = client.post(
+        "/api/v1/qr-codes/render",
+        json=[{"qr_uuid": missing, "color": '"/><script>'}],
+        headers=auth_header
+    )
+    assert response.status_code == 422
@@ -0,0 +1,24 @@
+from fastapi import status
+
+def test_metrics_endpoint_reports_routes_and_stages(client):
+    email = "metrics@example.com"
+    client.post("/api/v1/auth/register", json={"email": email, "password": "password123"})
+    token = client.post("/api/v1/auth/login", data={"username": email, "password": "password123"}).json()["access_token"]
+    create_res = client.post(
+        "/api/v1/qr-codes/",
+        json={"url": "https://example.com", "color": "#000000", "size": 200},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    qr_uuid = create_res.headers["X-QR-UUID"]
+    client.get(f"/api/v1/scan/{qr_uuid}", follow_redirects=False)
+
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'qr_http_requests_total{method="GET",route="/api/v1/scan/{qr_uuid}",status="307"}' in body
+    assert 'qr_stage_duration_seconds_count{component="scan",stage="lookup"}' in body
+    assert 'qr_stage_duration_seconds_count{component="qr_image",stage="matrix"}' in body
+    assert 'qr_db_query_duration_seconds_count{operation="INSERT",table="scans"}' in body
+    assert 'qr_db_pool{engine="primary",stat="checked_out"}' in body
+    assert "qr_http_requests_in_flight 1" in body
@@ -0,0 +1,93 @@
+import uuid
+import pytest
+from sqlalchemy import create_engine, text
+from app.src.migrations import MIGRATIONS, status, upgrade
+from tests.conftest import TEST_DATABASE_URL, engine
+
+SCHEMA = "migration_test"
+
+@pytest.fixture
+def schema_engine():
+    """An engine whose tables live in a scratch schema, away from the test tables."""
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    scratch = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={SCHEMA}"})
+    yield scratch
+    scratch.dispose()
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+def test_fresh_database_only_records_migrations(schema_engine):
+    assert upgrade(schema_engine) == [name for _, name, _ in MIGRATIONS]
+    assert upgrade(schema_engine) == []
+    assert all(done for _, _, done in status(schema_engine))
+
+    with schema_engine.connect() as connection:
+        assert connection.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('scans')")).scalar() == "p"
+
+def test_upgrades_counters_and_qr_codes_of_an_older_schema(schema_engine):
+    upgrade(schema_engine)
+    qr_uuid = uuid.uuid4()
+    with schema_engine.begin() as connection:
+        # Back to the shape before sharded counters, selectable encodings and the listing index
+        connection.execute(text("DELETE FROM schema_migrations WHERE version > 2"))
+        connection.execute(text("DROP INDEX ix_qr_codes_user_uuid_created_at"))
+        connection.execute(text("CREATE INDEX ix_qr_codes_user_uuid ON qr_codes (user_uuid)"))
+        connection.execute(text("ALTER TABLE qr_codes DROP COLUMN error_correction, DROP COLUMN mask_pattern, DROP COLUMN qr_matrix"))
+        connection.execute(text("ALTER TABLE qr_scan_counters DROP COLUMN shard_id"))
+        connection.execute(text("ALTER TABLE qr_scan_counters ADD PRIMARY KEY (qr_uuid)"))
+        user_uuid = connection.execute(text(
+            "INSERT INTO users (uuid, email, password_hash) VALUES (gen_random_uuid(), 'old@example.com', 'x') RETURNING uuid"
+        )).scalar()
+        connection.execute(
+            text("INSERT INTO qr_codes (uuid, url, color, size, user_uuid) VALUES (:qr_uuid, 'https://example.com', '#000000', 200, :user_uuid)"),
+            {"qr_uuid": qr_uuid, "user_uuid": user_uuid}
+        )
+        connection.execute(text("INSERT INTO qr_scan_counters (qr_uuid, total_scans) VALUES (:qr_uuid, 7)"), {"qr_uuid": qr_uuid})
+
+    assert upgrade(schema_engine) == ["shard_scan_counters", "qr_code_encoding_columns", "qr_code_listing_index"]
+
+    with schema_engine.begin() as connection:
+        assert connection.execute(text("SELECT shard_id, total_scans FROM qr_scan_counters")).all() == [(0, 7)]
+        # A second shard row for the same code is now allowed
+        connection.execute(text("INSERT INTO qr_scan_counters (qr_uuid, shard_id, total_scans) VALUES (:qr_uuid, 1, 3)"), {"qr_uuid": qr_uuid})
+        assert connection.execute(
+            text("SELECT error_correction, mask_pattern, qr_matrix FROM qr_codes WHERE uuid = :qr_uuid"), {"qr_uuid": qr_uuid}
+        ).one() == (None, None, None)
+        indexes = connection.execute(
+            text("SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = :schema AND tablename = 'qr_codes'"),
+            {"schema": SCHEMA}
+        ).all()
+        definitions = dict(indexes)
+        assert "ix_qr_codes_user_uuid" not in definitions
+        assert definitions["ix_qr_codes_user_uuid_created_at"].endswith("(user_uuid, created_at, uuid)")
+
+def test_partitioning_reads_the_columns_of_its_own_schema(schema_engine):
+    upgrade(schema_engine)
+    with engine.begin() as connection:
+        # A same-named table in another schema, still in the old text layout
+        connection.execute(text("CREATE SCHEMA IF NOT EXISTS migration_test_other"))
+        connection.execute(text("CREATE TABLE IF NOT EXISTS migration_test_other.scans_legacy (country TEXT, timezone TEXT, ip TEXT)"))
+    try:
+        with schema_engine.begin() as connection:
+            # An unpartitioned scans table that already has the encoded columns
+            connection.execute(text("DROP TABLE scans CASCADE"))
+            connection.execute(text("""
+                CREATE TABLE scans (
+                    uuid UUID NOT NULL DEFAULT gen_random_uuid() PRIMARY KEY,
+                    qr_uuid UUID NOT NULL REFERENCES qr_codes (uuid) ON DELETE CASCADE,
+                    ip INET,
+                    country_id SMALLINT REFERENCES scan_countries (id),
+                    timezone_id SMALLINT REFERENCES scan_timezones (id),
+                    created_at BIGINT
+                )
+            """))
+            connection.execute(text("DELETE FROM schema_migrations WHERE version = 2"))
+
+        assert upgrade(schema_engine) == ["partition_scans"]
+        with schema_engine.connect() as connection:
+            assert connection.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('scans')")).scalar() == "p"
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DROP SCHEMA migration_test_other CASCADE"))
@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import patch
 from fastapi import status
 
 @pytest.fixture
@@ -68,3 +69,218 @@ def test_scan_qr_flow(client, auth_header):
     stats_data = stats_res.json()
     assert stats_data["total_scans"] == 1
     assert len(stats_data["scans"]) == 1
+    # The test client address is not an IP
+    assert stats_data["scans"][0]["ip"] is None
+
+def test_scan_ip_and_location_round_trip(client, auth_header):
+    create_res = client.post(
+        "/api/v1/qr-codes/",
+        json={"url": "https://example.com", "color": "#000000", "size": 200},
+        headers=auth_header
+    )
+    qr_uuid = create_res.headers["X-QR-UUID"]
+    for forwarded_for in ("127.0.0.1, 10.0.0.1", "::1"):
+        client.get(f"/api/v1/scan/{qr_uuid}", headers={"X-Forwarded-For": forwarded_for}, follow_redirects=False)
+
+    scans = client.get(f"/api/v1/qr-codes/{qr_uuid}/stats", headers=auth_header).json()["scans"]
+    assert sorted(scan["ip"] for scan in scans) == ["127.0.0.1", "::1"]
+    assert {(scan["country"], scan["timezone"]) for scan in scans} == {("Localhost", "UTC")}
+
+def test_scan_follows_url_update(client, auth_header):
+    create_res = client.post(
+        "/api/v1/qr-codes/",
+        json={"url": "https://old.example.com", "color": "#000000", "size": 200},
+        headers=auth_header
+    )
+    qr_uuid = create_res.headers["X-QR-UUID"]
+
+    scan_res = client.get(f"/api/v1/scan/{qr_uuid}", follow_redirects=False)
+    assert scan_res.headers["location"] == "https://old.example.com"
+
+    client.patch(f"/api/v1/qr-codes/{qr_uuid}", json={"url": "new.example.com"}, headers=auth_header)
+
+    scan_res = client.get(f"/api/v1/scan/{qr_uuid}", follow_redirects=False)
+    assert scan_res.headers["location"] == "https://new.example.com"
+
+def test_scan_unknown_qr(client):
+    unknown = "00000000-0000-0000-0000-000000000000"
+    assert client.get(f"/api/v1/scan/{unknown}", follow_redirects=False).status_code == 404
+    assert client.get(f"/api/v1/scan/{unknown}", follow_redirects=False).status_code == 404
+
+def test_qr_image_etag_and_not_modified(client, auth_header):
+    create_res = client.post(
+        "/api/v1/qr-codes/",
+        json={"url": "https://example.com", "color": "#0000FF", "size": 250},
+        headers=auth_header
+    )
+    qr_uuid = create_res.headers["X-QR-UUID"]
+
+    image_res = client.get(f"/api/v1/qr-codes/{qr_uuid}/image")
+    assert image_res.status_code == status.HTTP_200_OK
+    assert image_res.headers["content-type"] == "image/png"
+    etag = image_res.headers["etag"]
+
+    cached_res = client.get(f"/api/v1/qr-codes/{qr_uuid}/image", headers={"If-None-Match": etag})
+    assert cached_res.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # Changing the destination keeps the image; changing the color does not
+    client.patch(f"/api/v1/qr-codes/{qr_uuid}", json={"url": "https://other.com"}, headers=auth_header)
+    assert client.get(f"/api/v1/qr-codes/{qr_uuid}/image").headers["etag"] == etag
+
+    client.patch(f"/api/v1/qr-codes/{qr_uuid}", json={"color": "#00FF00"}, headers=auth_header)
+    assert client.get(f"/api/v1/qr-codes/{qr_uuid}/image").headers["etag"] != etag
+
+def test_error_correction_and_mask_are_stored_with_the_matrix(client, auth_header, db_session):
+    from app.src.models.qr_code import QRCode
+    from app.src.services.qr_rasterizer import build_matrix, load_matrix
+
+    create_res = client.post(
+        "/api/v1/qr-codes/",
+        json={"url": "https://example.com", "color": "#000000", "size": 200, "error_correction": "H", "mask_pattern": 2},
+        headers=auth_header
+    )
+    assert create_res.status_code == status.HTTP_201_CREATED
+    qr_uuid = create_res.headers["X-QR-UUID"]
+
+    qr = db_session.query(QRCode).filter(QRCode.uuid == qr_uuid).one()
+    assert (qr.error_correction, qr.mask_pattern) == ("H", 2)
+    tracking_url = f"http://testserver/api/v1/scan/{qr_uuid}"
+    assert (load_matrix(tracking_url, "H", 2, qr.qr_matrix) == build_matrix(tracking_url, "H", 2)).all()
+
+    detail = client.get(f"/api/v1/qr-codes/{qr_uuid}", headers=auth_header).json()
+    assert (detail["error_correction"], detail["mask_pattern"]) == ("H", 2)
+
+    invalid = client.post(
+        "/api/v1/qr-codes/",
+        json={"url": "https://example.com", "color": "#000000", "size": 200, "mask_pattern": 8},
+        headers=auth_header
+    )
+    assert invalid.status_code == 422
+
+def test_image_is_stored_at_create_and_replaced_on_update(client, auth_header, tmp_path, monkeypatch):
+    from app.src.services.blob_store import LocalBlobStore
+
+    store = LocalBlobStore(str(tmp_path))
+    monkeypatch.setattr("app.src.services.qr_code_service.artifact_store", store)
+    create_res = client.post(
+        "/api/v1/qr-codes/",
+        json={"url": "https://example.com", "color": "#000000", "size": 200},
+        headers=auth_header
+    )
+    qr_uuid = create_res.headers["X-QR-UUID"]
+    stored = list(tmp_path.rglob("*.png"))
+    assert len(stored) == 1
+    assert stored[0].read_bytes() == create_res.content
+
+    with patch("app.src.services.qr_code_service.QRCodeService.get_qr_png") as render:
+        image_res = client.get(f"/api/v1/qr-codes/{qr_uuid}/image")
+    render.assert_not_called()
+    assert image_res.status_code == status.HTTP_200_OK
+    assert image_res.content == create_res.content
+    assert image_res.headers["etag"] == f'"{stored[0].stem}"'
+
+    client.patch(f"/api/v1/qr-codes/{qr_uuid}", json={"size": 300}, headers=auth_header)
+    replaced = list(tmp_path.rglob("*.png"))
+    assert len(replaced) == 1 and replaced[0] != stored[0]
+    assert client.get(f"/api/v1/qr-codes/{qr_uuid}/image").content == replaced[0].read_bytes()
+
+def test_stats_pagination_and_export(client, auth_header):
+    create_res = client.post(
+        "/api/v1/qr-codes/",
+        json={"url": "https://example.com", "color": "#000000", "size": 200},
+        headers=auth_header
+    )
+    qr_uuid = create_res.headers["X-QR-UUID"]
+    for _ in range(3):
+        client.get(f"/api/v1/scan/{qr_uuid}", follow_redirects=False)
+
+    first_page = client.get(f"/api/v1/qr-codes/{qr_uuid}/stats?limit=2", headers=auth_header).json()
+    assert first_page["total_scans"] == 3
+    assert len(first_page["scans"]) == 2
+    assert first_page["next_cursor"]
+
+    second_page = client.get(
+        f"/api/v1/qr-codes/{qr_uuid}/stats",
+        params={"limit": 2, "cursor": first_page["next_cursor"]},
+        headers=auth_header
+    ).json()
+    assert len(second_page["scans"]) == 1
+    assert second_page["next_cursor"] is None
+    seen = {scan["uuid"] for scan in first_page["scans"] + second_page["scans"]}
+    assert len(seen) == 3
+
+    bad_cursor = client.get(f"/api/v1/qr-codes/{qr_uuid}/stats?cursor=nope", headers=auth_header)
+    assert bad_cursor.status_code == status.HTTP_400_BAD_REQUEST
+
+    ndjson = client.get(f"/api/v1/qr-codes/{qr_uuid}/scans/export", headers=auth_header)
+    assert ndjson.status_code == status.HTTP_200_OK
+    assert len(ndjson.text.splitlines()) == 3
+
+    csv_export = client.get(f"/api/v1/qr-codes/{qr_uuid}/scans/export?format=csv", headers=auth_header)
+    lines = csv_export.text.splitlines()
+    assert lines[0] == "uuid,qr_uuid,ip,country,timezone,created_at"
+    assert len(lines) == 4
+
+    future = client.get(f"/api/v1/qr-codes/{qr_uuid}/stats?since=99999999999999", headers=auth_header).json()
+    assert future["scans"] == []
+
+def test_timeseries_from_rollups(client, auth_header):
+    create_res = client.post(
+        "/api/v1/qr-codes/",
+        json={"url": "https://example.com", "color": "#000000", "size": 200},
+        headers=auth_header
+    )
+    qr_uuid = create_res.headers["X-QR-UUID"]
+    for _ in range(3):
+        client.get(f"/api/v1/scan/{qr_uuid}", headers={"X-Forwarded-For": "127.0.0.1"}, follow_redirects=False)
+
+    for granularity in ("hour", "day"):
+        res = client.get(
+            f"/api/v1/qr-codes/{qr_uuid}/stats/timeseries?granularity={granularity}",
+            headers=auth_header
+        )
+        assert res.status_code == status.HTTP_200_OK
+        data = res.json()
+        assert data["total_scans"] == 3
+        assert sum(point["scans"] for point in data["series"]) == 3
+        assert data["top_countries"] == [{"name": "Localhost", "scans": 3}]
+        assert data["top_timezones"] == [{"name": "UTC", "scans": 3}]
+
+def test_list_pagination_projection_and_filters(client, auth_header):
+    for url, color in [("https://a.example.com/1", "#000000"), ("https://a.example.com/2", "#FF0000"), ("https://b.example.com", "#000000")]:
+        res = client.post("/api/v1/qr-codes/", json={"url": url, "color": color, "size": 200}, headers=auth_header)
+        assert res.status_code == status.HTTP_201_CREATED
+    client.post(
+        "/api/v1/qr-codes/bulk",
+        json=[{"url": "https://c.example.com", "color": "#00FF00", "size": 200}],
+        headers=auth_header
+    )
+
+    first = client.get("/api/v1/qr-codes/?limit=3&include_total=true", headers=auth_header)
+    assert first.status_code == status.HTTP_200_OK
+    assert len(first.json()) == 3
+    assert first.headers["X-Total-Count"] == "4"
+    second = client.get(
+        "/api/v1/qr-codes/",
+        params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]},
+        headers=auth_header
+    )
+    assert len(second.json()) == 1
+    assert "X-Next-Cursor" not in second.headers
+    assert len({row["uuid"] for row in first.json() + second.json()}) == 4
+
+    projected = client.get("/api/v1/qr-codes/?fields=uuid,url&url_prefix=https://a.", headers=auth_header)
+    assert sorted(row["url"] for row in projected.json()) == ["https://a.example.com/1", "https://a.example.com/2"]
+    assert all(set(row) == {"uuid", "url"} for row in projected.json())
+
+    by_color = client.get("/api/v1/qr-codes/?color=%23000000&include_total=true", headers=auth_header)
+    assert len(by_color.json()) == 2
+    assert "X-Total-Count" not in by_color.headers
+
+    bad_field = client.get("/api/v1/qr-codes/?fields=uuid,password_hash", headers=auth_header)
+    assert bad_field.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_list_openapi_documents_the_projection(client):
+    response = client.get("/openapi.json").json()["paths"]["/api/v1/qr-codes/"]["get"]["responses"]["200"]
+    assert response["content"]["application/json"]["schema"]["items"]["$ref"].endswith("/QRCodeListItem")
+    assert set(response["headers"]) == {"X-Next-Cursor", "X-Total-Count"}
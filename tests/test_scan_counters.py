@@ -0,0 +1,67 @@
+import threading
+import time
+import uuid
+from sqlalchemy import text
+from app.src.repositories.scan_repository import ScanRepository
+from app.src.services.scan_counters import ShardedScanCounters
+from app.src.services.scan_ingestion import ScanRecord
+from tests.conftest import TestingSessionLocal, engine
+
+WORKER_THREADS = 8
+BATCHES_PER_THREAD = 10
+BATCH_SIZE = 125
+
+def create_qr_code(client):
+    email = "counters@example.com"
+    client.post("/api/v1/auth/register", json={"email": email, "password": "password123"})
+    token = client.post("/api/v1/auth/login", data={"username": email, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    create_res = client.post(
+        "/api/v1/qr-codes/",
+        json={"url": "https://example.com", "color": "#000000", "size": 200},
+        headers=headers
+    )
+    return create_res.headers["X-QR-UUID"], headers
+
+def test_hot_qr_code_receives_10k_scans(client, db_session, monkeypatch):
+    # Correctness under concurrent batches; the sustained rate is measured by benchmarks.bench_hot_counter
+    qr_uuid, headers = create_qr_code(client)
+    counters = ShardedScanCounters(session_factory=TestingSessionLocal, flush_interval_ms=50, shard_id=2)
+    monkeypatch.setattr("app.src.repositories.scan_repository.scan_counters", counters)
+    monkeypatch.setattr("app.src.repositories.qr_code_repository.scan_counters", counters)
+
+    # Each thread is a write-behind flusher inserting batches of scans of the same code
+    def flusher(thread_index):
+        db = TestingSessionLocal()
+        try:
+            repository = ScanRepository(db)
+            for batch in range(BATCHES_PER_THREAD):
+                now = int(time.time() * 1000)
+                repository.create_many([
+                    ScanRecord(uuid.UUID(qr_uuid), f"10.{thread_index}.{batch}.{index % 256}", None, None, now)
+                    for index in range(BATCH_SIZE)
+                ])
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=flusher, args=(index,)) for index in range(WORKER_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = WORKER_THREADS * BATCHES_PER_THREAD * BATCH_SIZE
+
+    # Merged or not, the total already includes every committed scan
+    stats = client.get(f"/api/v1/qr-codes/{qr_uuid}/stats?limit=1", headers=headers).json()
+    assert stats["total_scans"] == total
+
+    counters.stop()
+    assert counters.pending(uuid.UUID(qr_uuid)) == 0
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text("SELECT shard_id, total_scans FROM qr_scan_counters WHERE qr_uuid = :qr_uuid"),
+            {"qr_uuid": qr_uuid}
+        ).all()
+    # One row for this worker's shard, however many batches it merged
+    assert rows == [(2, total)]
+    assert counters.stats()["flushes"] < WORKER_THREADS * BATCHES_PER_THREAD
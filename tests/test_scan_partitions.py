@@ -0,0 +1,71 @@
+import gzip
+import time
+from sqlalchemy import text
+from app.src.services.scan_partitions import (
+    DEFAULT_PARTITION,
+    apply_retention,
+    create_partition,
+    list_partitions,
+    month_start_ms,
+    partition_name
+)
+from tests.conftest import engine
+
+def create_qr_code(client):
+    email = "partitions@example.com"
+    client.post("/api/v1/auth/register", json={"email": email, "password": "password123"})
+    token = client.post("/api/v1/auth/login", data={"username": email, "password": "password123"}).json()["access_token"]
+    create_res = client.post(
+        "/api/v1/qr-codes/",
+        json={"url": "https://example.com", "color": "#000000", "size": 200},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    return create_res.headers["X-QR-UUID"]
+
+def insert_scan(connection, qr_uuid, created_at):
+    connection.execute(
+        text("INSERT INTO scans (uuid, qr_uuid, ip, created_at) VALUES (gen_random_uuid(), :qr_uuid, '127.0.0.1', :created_at)"),
+        {"qr_uuid": qr_uuid, "created_at": created_at}
+    )
+
+def test_current_month_has_a_partition(client):
+    qr_uuid = create_qr_code(client)
+    client.get(f"/api/v1/scan/{qr_uuid}", follow_redirects=False)
+
+    now = time.gmtime()
+    with engine.connect() as connection:
+        names = {partition.name for partition in list_partitions(connection)}
+        assert partition_name(now.tm_year, now.tm_mon) in names
+        assert connection.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")).scalar() == 0
+        assert connection.execute(text("SELECT count(*) FROM scans")).scalar() == 1
+
+def test_old_month_is_moved_out_of_default_then_archived(client, db_session, tmp_path):
+    qr_uuid = create_qr_code(client)
+    # Dropping the archived partition locks qr_codes, which the request session still reads
+    db_session.close()
+    old_scan_at = month_start_ms(2020, 1) + 1000
+    name = partition_name(2020, 1)
+
+    with engine.begin() as connection:
+        insert_scan(connection, qr_uuid, old_scan_at)
+        insert_scan(connection, qr_uuid, int(time.time() * 1000))
+        assert connection.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")).scalar() == 1
+
+        assert create_partition(connection, 2020, 1) is True
+        assert create_partition(connection, 2020, 1) is False
+        assert connection.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")).scalar() == 0
+        assert connection.execute(text(f"SELECT count(*) FROM {name}")).scalar() == 1
+
+    with engine.begin() as connection:
+        archived = apply_retention(connection, retention_months=12, directory=str(tmp_path))
+    assert archived == [str(tmp_path / f"{name}.csv.gz")]
+
+    with gzip.open(archived[0], "rt") as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "uuid,qr_uuid,ip,country,timezone,created_at"
+    assert lines[1].endswith(f",{old_scan_at}") and qr_uuid in lines[1]
+
+    with engine.connect() as connection:
+        assert name not in {partition.name for partition in list_partitions(connection)}
+        assert connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None
+        assert connection.execute(text("SELECT count(*) FROM scans")).scalar() == 1
@@ -1,5 +1,6 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 from app.src.services.auth_service import AuthService
 from app.src.schemas.auth import UserCreate
 from fastapi import HTTPException
@@ -7,7 +8,7 @@ from fastapi import HTTPException
 def test_sign_up_user_already_exists():
     # 1. Setup Mock Repository
     mock_db = MagicMock()
-    mock_repo = MagicMock()
+    mock_repo = AsyncMock()
     
     # Simulate that get_by_email returns a user (meaning email is taken)
     mock_repo.get_by_email.return_value = {"email": "taken@example.com"}
@@ -20,7 +21,7 @@ def test_sign_up_user_already_exists():
     user_data = UserCreate(email="taken@example.com", password="password123")
     
     with pytest.raises(HTTPException) as excinfo:
-        service.sign_up(user_data)
+        asyncio.run(service.sign_up(user_data))
     
     assert excinfo.value.status_code == 400
     assert excinfo.value.detail == "Email already registered"
@@ -29,7 +30,7 @@ def test_sign_up_user_already_exists():
 
 def test_authenticate_user_success():
     mock_db = MagicMock()
-    mock_repo = MagicMock()
+    mock_repo = AsyncMock()
     service = AuthService(mock_db)
     service.user_repo = mock_repo
     
@@ -44,7 +45,30 @@ def test_authenticate_user_success():
     mock_repo.get_by_email.return_value = mock_user
     
     # Test
-    result = service.authenticate_user("test@example.com", password)
+    result = asyncio.run(service.authenticate_user("test@example.com", password))
     
     assert "access_token" in result
     assert result["token_type"] == "bearer"
+    mock_repo.update_password_hash.assert_not_called()
+
+def test_login_rehashes_outdated_hash():
+    from app.src.services.password_hasher import build_context, password_hasher
+
+    mock_repo = AsyncMock()
+    service = AuthService(MagicMock())
+    service.user_repo = mock_repo
+
+    mock_user = MagicMock()
+    mock_user.email = "test@example.com"
+    mock_user.uuid = "some-uuid"
+    # Same password, hashed with a lower cost than configured
+    mock_user.password_hash = build_context(bcrypt_rounds=4).hash("secretpassword")
+    mock_repo.get_by_email.return_value = mock_user
+
+    asyncio.run(service.authenticate_user("test@example.com", "secretpassword"))
+
+    mock_repo.update_password_hash.assert_called_once()
+    user_uuid, new_hash = mock_repo.update_password_hash.call_args.args
+    assert user_uuid == "some-uuid"
+    assert password_hasher.context.verify("secretpassword", new_hash)
+    assert not password_hasher.context.needs_update(new_hash)
@@ -0,0 +1,52 @@
+import io
+import os
+from app.src.services.blob_store import LocalBlobStore, S3BlobStore
+
+class MissingKey(Exception):
+    response = {"Error": {"Code": "NoSuchKey"}}
+
+class LocalS3:
+    """Stand-in for a boto3 S3 client."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise MissingKey()
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)][0])}
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[(Bucket, Key)] = (Body, ContentType)
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+def test_local_store_shards_keys(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    assert store.get("abcdef.png") is None
+    assert store.local_path("abcdef.png") is None
+
+    store.put("abcdef.png", b"png")
+    path = store.local_path("abcdef.png")
+    assert path == os.path.join(str(tmp_path), "ab", "cd", "abcdef.png")
+    assert store.get("abcdef.png") == b"png"
+    # Only the file itself is left: no temporary files next to it
+    assert os.listdir(os.path.dirname(path)) == ["abcdef.png"]
+
+    store.delete("abcdef.png")
+    store.delete("abcdef.png")
+    assert store.get("abcdef.png") is None
+
+def test_s3_store_with_a_local_stand_in():
+    client = LocalS3()
+    store = S3BlobStore(client, "bucket", prefix="images/")
+    assert store.get("abcdef.png") is None
+
+    store.put("abcdef.png", b"png")
+    assert client.objects[("bucket", "images/abcdef.png")] == (b"png", "image/png")
+    assert store.get("abcdef.png") == b"png"
+    assert store.local_path("abcdef.png") is None
+
+    store.delete("abcdef.png")
+    assert store.get("abcdef.png") is None
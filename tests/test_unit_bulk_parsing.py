@@ -0,0 +1,65 @@
+import asyncio
+import io
+import threading
+import time
+import zipfile
+import pytest
+from unittest.mock import patch
+from fastapi import HTTPException
+from app.src.services.bulk_qr_service import iter_json_array_items, iter_ndjson_items, iter_render_zip
+from app.src.services.render_executor import RenderExecutor, RenderPoolSaturated
+
+async def chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+def collect(parser, data: bytes, size: int):
+    async def run():
+        return [item async for item in parser(chunked(data, size))]
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1024])
+def test_json_array_split_across_chunks(size):
+    data = '[ {"url": "https://a.com", "n": [1, 2]} ,{"url": "https://ñ.com"} ]'.encode("utf-8")
+    assert collect(iter_json_array_items, data, size) == [
+        {"url": "https://a.com", "n": [1, 2]},
+        {"url": "https://ñ.com"},
+    ]
+
+def test_empty_json_array():
+    assert collect(iter_json_array_items, b" [ ] ", 2) == []
+
+@pytest.mark.parametrize("data", [b'{"url": "x"}', b'[{"url": "x"}', b'[{"url": "x"} {"url": "y"}]', b"[1,]"])
+def test_malformed_json_array(data):
+    with pytest.raises(HTTPException):
+        collect(iter_json_array_items, data, 4)
+
+def test_ndjson_lines_split_across_chunks():
+    data = b'{"a": 1}\n\n{"a": 2}\n{"a": 3}'
+    assert collect(iter_ndjson_items, data, 5) == [{"a": 1}, {"a": 2}, {"a": 3}]
+
+def test_zip_render_leaves_slots_for_image_requests():
+    executor = RenderExecutor(kind="thread", workers=4, max_pending=4)
+    image_requests = []
+
+    def render(*args):
+        # What an /image request arriving mid-batch would get
+        try:
+            executor.submit(len, "x").result(timeout=5)
+            image_requests.append(True)
+        except RenderPoolSaturated:
+            image_requests.append(False)
+        time.sleep(0.01)
+        return [b"data"]
+
+    tasks = ((("url",), [f"qr_{i}.png"]) for i in range(20))
+    try:
+        with patch("app.src.services.bulk_qr_service.render_executor", executor), \
+                patch("app.src.services.bulk_qr_service.batch_render_slots", threading.BoundedSemaphore(2)), \
+                patch("app.src.services.qr_rasterizer.render_qr_variants", render):
+            archive = zipfile.ZipFile(io.BytesIO(b"".join(iter_render_zip(tasks))))
+    finally:
+        executor.shutdown()
+
+    assert len(archive.namelist()) == 20
+    assert image_requests == [True] * 20
@@ -0,0 +1,106 @@
+import sqlite3
+import time
+import uuid
+import pytest
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine, exc, text
+from app.src.database import TimedQueuePool, pool_stats, _install_health_check
+from app.src.repositories.qr_code_repository import QRCodeRepository
+
+class CountingConnection:
+    """sqlite3 connection that counts the cursors opened on it."""
+
+    def __init__(self, fail=False):
+        self._connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self.fail = fail
+        self.cursors = 0
+
+    def cursor(self):
+        self.cursors += 1
+        if self.fail:
+            raise sqlite3.OperationalError("server closed the connection")
+        return self._connection.cursor()
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+def make_engine(creator, **kwargs):
+    return create_engine("sqlite://", creator=creator, poolclass=TimedQueuePool, **kwargs)
+
+def test_pool_stats_track_checkouts_and_timeouts():
+    engine = make_engine(lambda: sqlite3.connect(":memory:", check_same_thread=False), pool_size=1, max_overflow=0, pool_timeout=0.05)
+
+    held = engine.connect()
+    stats = pool_stats(engine)
+    assert stats["checked_out"] == 1
+    assert stats["checkouts"] == 1
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    held.close()
+
+    stats = pool_stats(engine)
+    assert stats["checked_out"] == 0
+    assert stats["timeouts"] == 1
+    assert stats["max_wait_ms"] >= 0
+
+def test_health_check_pings_only_idle_connections():
+    connections = []
+
+    def creator():
+        connections.append(CountingConnection())
+        return connections[-1]
+
+    engine = make_engine(creator, pool_size=1, max_overflow=0)
+    _install_health_check(engine, interval=0.05)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    baseline = connections[0].cursors
+
+    # Reused right away: no ping
+    with engine.connect():
+        pass
+    assert connections[0].cursors == baseline
+
+    time.sleep(0.06)
+    with engine.connect():
+        pass
+    assert connections[0].cursors == baseline + 1
+
+def test_failed_health_check_replaces_the_connection():
+    connections = []
+
+    def creator():
+        connections.append(CountingConnection())
+        return connections[-1]
+
+    engine = make_engine(creator, pool_size=1, max_overflow=0)
+    _install_health_check(engine, interval=0)
+
+    with engine.connect():
+        pass
+    connections[0].fail = True
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+    assert len(connections) == 2
+
+def test_repository_reads_go_to_the_read_session():
+    db, read_db = MagicMock(), MagicMock()
+    repo = QRCodeRepository(db, read_db)
+
+    repo.get_by_id(uuid.uuid4())
+    repo.get_by_user(uuid.uuid4())
+
+    assert read_db.query.call_count == 2
+    db.query.assert_not_called()
+
+def test_repository_update_reads_from_the_primary():
+    db, read_db = MagicMock(), MagicMock()
+    db.query.return_value.filter.return_value.first.return_value = None
+    repo = QRCodeRepository(db, read_db)
+
+    assert repo.update(uuid.uuid4(), MagicMock()) is None
+    db.query.assert_called_once()
+    read_db.query.assert_not_called()
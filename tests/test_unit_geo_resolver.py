@@ -0,0 +1,97 @@
+import asyncio
+import httpx
+import pytest
+from app.src.services.geo_resolver import (
+    GeoResolver,
+    LocalGeoResolver,
+    HttpGeoResolver,
+    ChainGeoResolver,
+    CachedGeoResolver,
+    build_geo_database
+)
+
+@pytest.fixture
+def geo_db(tmp_path):
+    path = tmp_path / "geo.db"
+    build_geo_database(
+        [
+            ("10.0.0.0", "10.0.255.255", "Argentina", "America/Buenos_Aires"),
+            ("1.0.0.0", "1.0.0.255", "Australia", "Australia/Sydney"),
+            ("2001:db8::", "2001:db8::ffff", "Germany", "Europe/Berlin"),
+        ],
+        str(path)
+    )
+    resolver = LocalGeoResolver(str(path))
+    yield resolver
+    resolver.close()
+
+class CountingResolver(GeoResolver):
+    def __init__(self, info):
+        self.info = info
+        self.calls = 0
+
+    def resolve(self, ip):
+        self.calls += 1
+        return self.info
+
+def test_local_lookup_ipv4_and_ipv6(geo_db):
+    assert geo_db.resolve("10.0.3.4") == {"country": "Argentina", "timezone": "America/Buenos_Aires"}
+    assert geo_db.resolve("1.0.0.0")["country"] == "Australia"
+    assert geo_db.resolve("1.0.0.255")["country"] == "Australia"
+    assert geo_db.resolve("2001:db8::42")["country"] == "Germany"
+
+def test_local_lookup_misses(geo_db):
+    assert geo_db.resolve("1.0.1.0") is None
+    assert geo_db.resolve("0.0.0.1") is None
+    assert geo_db.resolve("testclient") is None
+
+def test_chain_falls_back(geo_db):
+    fallback = CountingResolver({"country": "Chile", "timezone": "America/Santiago"})
+    chain = ChainGeoResolver([geo_db, fallback])
+
+    assert chain.resolve("10.0.0.1")["country"] == "Argentina"
+    assert chain.resolve("8.8.8.8")["country"] == "Chile"
+    assert fallback.calls == 1
+
+def test_cache_avoids_repeated_lookups():
+    inner = CountingResolver({"country": "Chile", "timezone": "America/Santiago"})
+    cached = CachedGeoResolver(inner, max_size=1)
+
+    cached.resolve("8.8.8.8")
+    cached.resolve("8.8.8.8")
+    assert inner.calls == 1
+
+    cached.resolve("8.8.4.4")
+    cached.resolve("8.8.8.8")
+    assert inner.calls == 3
+
+def test_http_resolver_async_lookup():
+    def handler(request):
+        if request.url.path.endswith("/8.8.8.8"):
+            return httpx.Response(200, json={"status": "success", "country": "United States", "timezone": "America/Chicago"})
+        return httpx.Response(200, json={"status": "fail"})
+
+    resolver = HttpGeoResolver("http://geo.test/json/{ip}", transport=httpx.MockTransport(handler))
+
+    async def lookups():
+        try:
+            return [await resolver.resolve_async(ip) for ip in ("8.8.8.8", "1.1.1.1", "testclient")]
+        finally:
+            resolver.close()
+            await asyncio.sleep(0)
+
+    assert asyncio.run(lookups()) == [{"country": "United States", "timezone": "America/Chicago"}, None, None]
+
+def test_local_resolution_skips_remote_resolvers(geo_db):
+    remote = CountingResolver({"country": "Chile", "timezone": "America/Santiago"})
+    remote.remote = True
+    cached = CachedGeoResolver(ChainGeoResolver([geo_db, remote]))
+
+    assert cached.resolve_local("10.0.0.1")["country"] == "Argentina"
+    assert cached.resolve_local("8.8.8.8") is None
+    assert remote.calls == 0
+
+    # A remote answer cached earlier is reused
+    cached.resolve("8.8.8.8")
+    assert cached.resolve_local("8.8.8.8")["country"] == "Chile"
+    assert remote.calls == 1
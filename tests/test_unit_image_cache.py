@@ -0,0 +1,27 @@
+from app.src.services.image_cache import ImageCache
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = ImageCache(max_bytes=10, disk_dir=None)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    cache.get("a")
+    cache.put("c", b"12345")
+
+    assert cache.get("a") == b"12345"
+    assert cache.get("b") is None
+    assert cache.stats()["bytes"] == 10
+
+def test_disk_tier_survives_memory_eviction(tmp_path):
+    cache = ImageCache(max_bytes=4, disk_dir=str(tmp_path))
+    key = ImageCache.key("https://host/api/v1/scan/x", "#000000", 300)
+    cache.put(key, b"png-bytes")
+
+    assert cache.stats()["entries"] == 0
+    assert cache.get(key) == b"png-bytes"
+    assert ImageCache(max_bytes=4, disk_dir=str(tmp_path)).get(key) == b"png-bytes"
+
+def test_key_depends_on_every_input():
+    base = ImageCache.key("https://host/api/v1/scan/x", "#000000", 300)
+    assert base == ImageCache.key("https://host/api/v1/scan/x", "#000000", 300)
+    assert base != ImageCache.key("https://host/api/v1/scan/x", "#000001", 300)
+    assert base != ImageCache.key("https://host/api/v1/scan/x", "#000000", 301)
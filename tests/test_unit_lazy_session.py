@@ -0,0 +1,74 @@
+from fastapi import Depends, FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from unittest.mock import MagicMock
+from app.src.database import LazySession, SessionReleaseMiddleware, keep_session_for_streaming
+
+def test_session_is_created_on_first_use():
+    factory = MagicMock()
+    db = LazySession(factory)
+    assert db.release() == 0.0
+    factory.assert_not_called()
+
+    db.execute("SELECT 1")
+    factory.assert_called_once()
+    db.release()
+    factory.return_value.close.assert_called_once()
+
+def make_app(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'lazy.db'}")
+    factory = sessionmaker(bind=engine)
+    app = FastAPI()
+    app.add_middleware(SessionReleaseMiddleware)
+    observed = {}
+
+    def get_db():
+        db = LazySession(factory)
+        try:
+            yield db
+        finally:
+            db.release()
+
+    @app.get("/stream")
+    def stream(keep: bool = False, db=Depends(get_db)):
+        db.execute(text("SELECT 1"))
+        if keep:
+            keep_session_for_streaming(db)
+
+        def body():
+            observed["checked_out"] = engine.pool.checkedout()
+            yield b"png bytes"
+        return StreamingResponse(body())
+
+    @app.get("/unused")
+    def unused(db=Depends(get_db)):
+        observed["acquired"] = db.acquired
+        return {}
+
+    return app, engine, observed
+
+def test_connection_is_released_before_the_body_streams(tmp_path):
+    app, engine, observed = make_app(tmp_path)
+    with TestClient(app) as client:
+        assert client.get("/stream").content == b"png bytes"
+        assert observed["checked_out"] == 0
+
+        client.get("/stream?keep=true")
+        assert observed["checked_out"] == 1
+    assert engine.pool.checkedout() == 0
+
+def test_unused_session_never_checks_out(tmp_path):
+    app, engine, observed = make_app(tmp_path)
+    with TestClient(app) as client:
+        client.get("/unused")
+    assert observed["acquired"] is False
+    assert engine.pool.checkedout() == 0
+
+def test_hold_time_is_reported(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hold.db'}")
+    db = LazySession(sessionmaker(bind=engine))
+    db.execute(text("SELECT 1"))
+    assert db.release() > 0
+    assert db.release() == 0.0
@@ -0,0 +1,43 @@
+from app.src.services.metrics import MetricsRegistry, MultiprocessWriter, merge_snapshots, render_text
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", ["route"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.5, route="/a")
+    histogram.observe(5, route="/a")
+
+    text = render_text(merge_snapshots([registry.snapshot()]))
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+    assert 'latency_seconds_sum{route="/a"} 5.55' in text
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("events_total", "Events", ["name"]).inc(name='say "hi"\n')
+    assert 'events_total{name="say \\"hi\\"\\n"} 1' in render_text(merge_snapshots([registry.snapshot()]))
+
+def test_worker_snapshots_are_summed(tmp_path):
+    workers = []
+    for requests in (2, 3):
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Requests", ["status"]).inc(requests, status="200")
+        registry.gauge("in_flight", "In flight").set(1)
+        workers.append(registry)
+
+    for index, registry in enumerate(workers):
+        writer = MultiprocessWriter(registry, str(tmp_path), interval=60, worker_id=str(index))
+        writer.write()
+
+    text = render_text(merge_snapshots(writer.read_all()))
+    assert 'requests_total{status="200"} 5' in text
+    assert "in_flight 2" in text
+
+def test_collectors_run_before_snapshot():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("queue_depth", "Depth")
+    registry.add_collector(lambda: gauge.set(7))
+    assert "queue_depth 7" in render_text(merge_snapshots([registry.snapshot()]))
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+import pytest
+from app.src.services.password_hasher import PasswordHasher, PasswordHasherSaturated, build_context
+
+def make_hasher(**kwargs):
+    return PasswordHasher(context=build_context(bcrypt_rounds=4), **kwargs)
+
+def test_saturated_executor_rejects_instead_of_queueing():
+    hasher = make_hasher(workers=1, max_pending=1)
+    release = threading.Event()
+    hasher.context = type("Blocking", (), {"hash": lambda self, password: release.wait(5) and "hashed"})()
+
+    async def burst():
+        first = asyncio.ensure_future(hasher.hash_async("a"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(PasswordHasherSaturated):
+            await hasher.hash_async("b")
+        release.set()
+        return await first
+
+    assert asyncio.run(burst()) == "hashed"
+    hasher.shutdown()
+
+def test_verify_cache_only_remembers_successes():
+    hasher = make_hasher(verify_cache_size=10, verify_cache_ttl=60)
+    stored = hasher.hash("secret")
+    calls = []
+    verify = hasher.context.verify_and_update
+    hasher.context.verify_and_update = lambda *args: calls.append(args) or verify(*args)
+
+    assert hasher.verify_and_update("secret", stored) == (True, None)
+    assert asyncio.run(hasher.verify_and_update_async("secret", stored)) == (True, None)
+    assert len(calls) == 1
+
+    assert hasher.verify_and_update("wrong", stored) == (False, None)
+    assert hasher.verify_and_update("wrong", stored) == (False, None)
+    assert len(calls) == 3
+    hasher.shutdown()
+
+def test_unknown_scheme_is_rejected():
+    with pytest.raises(ValueError):
+        build_context(scheme="md5")
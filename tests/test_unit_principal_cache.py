@@ -0,0 +1,60 @@
+import time
+import uuid
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi import HTTPException
+from app.src.services.auth_service import AuthService, get_current_user
+from app.src.services.principal_cache import Principal, PrincipalCache, principal_cache
+
+def make_principal():
+    return Principal(uuid=uuid.uuid4(), email="cached@example.com")
+
+def test_entries_expire_with_the_token():
+    cache = PrincipalCache(max_size=10)
+    principal = make_principal()
+
+    cache.put("token", principal, time.time() + 60)
+    assert cache.get("token") == principal
+
+    cache.put("expired", principal, time.time() - 1)
+    assert cache.get("expired") is None
+
+def test_revoke_user_drops_all_tokens():
+    cache = PrincipalCache(max_size=10)
+    principal, other = make_principal(), make_principal()
+    cache.put("a", principal, time.time() + 60)
+    cache.put("b", principal, time.time() + 60)
+    cache.put("c", other, time.time() + 60)
+
+    cache.revoke_user(principal.uuid)
+
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.get("c") == other
+
+def test_bounded_size():
+    cache = PrincipalCache(max_size=2)
+    for token in ("a", "b", "c"):
+        cache.put(token, make_principal(), time.time() + 60)
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+
+def test_get_current_user_skips_lookup_and_verification_on_repeat():
+    user = MagicMock(uuid=uuid.uuid4(), email="repeat@example.com")
+    token = AuthService.create_access_token({"sub": user.email, "user_id": str(user.uuid)})
+
+    with patch("app.src.services.auth_service.UserRepository") as repo_cls:
+        repo_cls.return_value.get_by_email.return_value = user
+        first = get_current_user(token, MagicMock())
+        with patch.object(AuthService, "decode_token") as decode:
+            second = get_current_user(token, MagicMock())
+            decode.assert_not_called()
+
+    assert first == second == Principal(uuid=user.uuid, email=user.email)
+    repo_cls.return_value.get_by_email.assert_called_once()
+    principal_cache.revoke_user(user.uuid)
+
+def test_get_current_user_rejects_invalid_token():
+    with pytest.raises(HTTPException) as excinfo:
+        get_current_user("not-a-token", MagicMock())
+    assert excinfo.value.status_code == 401
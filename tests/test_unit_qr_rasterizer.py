@@ -0,0 +1,79 @@
+from io import BytesIO
+from PIL import Image
+from unittest.mock import patch
+from app.src.services import qr_rasterizer
+from app.src.services.qr_rasterizer import (
+    build_matrix,
+    load_matrix,
+    pack_matrix,
+    rasterize_matrix,
+    render_png,
+    render_qr_variants,
+    render_svg
+)
+
+MATRIX = [
+    [True, False, True],
+    [False, True, False],
+    [True, False, True],
+]
+
+def test_integer_scaling_with_centered_padding():
+    img = rasterize_matrix(MATRIX, 10, "#FF0000").convert("RGB")
+
+    assert img.size == (10, 10)
+    # 3 modules * 3 px = 9 px, one px of padding split as 0 before / 1 after
+    assert img.getpixel((0, 0)) == (255, 0, 0)
+    assert img.getpixel((3, 0)) == (255, 255, 255)
+    assert img.getpixel((4, 4)) == (255, 0, 0)
+    assert img.getpixel((9, 9)) == (255, 255, 255)
+
+def test_smaller_than_matrix_samples_modules():
+    img = rasterize_matrix(MATRIX, 2, "black").convert("RGB")
+    assert img.size == (2, 2)
+    assert img.getpixel((0, 0)) == (0, 0, 0)
+
+def test_png_is_one_bit_palette():
+    img = Image.open(BytesIO(render_png(MATRIX, 300, "#00FF00")))
+    assert img.format == "PNG"
+    assert img.mode in ("P", "1")
+    assert img.size == (300, 300)
+
+def test_svg_is_drawn_from_the_module_matrix():
+    svg = render_svg(MATRIX, 300, "#FF0000").decode("ascii")
+
+    assert svg.startswith("<svg")
+    assert 'width="300"' in svg and 'viewBox="0 0 3 3"' in svg
+    assert 'fill="#ff0000"' in svg
+    # One run per dark module of the checkerboard rows
+    assert svg.count("z") == 5
+
+def test_variants_share_one_matrix():
+    variants = [(100, "black", "png"), (400, "#0000FF", "png"), (200, "black", "svg")]
+    with patch.object(qr_rasterizer, "build_matrix", wraps=qr_rasterizer.build_matrix) as build:
+        rendered = render_qr_variants("https://example.com/api/v1/scan/abc", variants)
+
+    build.assert_called_once()
+    assert [Image.open(BytesIO(data)).size for data in rendered[:2]] == [(100, 100), (400, 400)]
+    assert rendered[2].startswith(b"<svg")
+
+def test_matrix_is_memoized_per_encoding():
+    data = "https://example.com/api/v1/scan/memo"
+    assert build_matrix(data) is build_matrix(data)
+    assert build_matrix(data, "H") is not build_matrix(data)
+    assert build_matrix(data, "H").shape[0] > build_matrix(data).shape[0]
+    assert not (build_matrix(data, "L", 0) == build_matrix(data, "L", 1)).all()
+
+def test_packed_matrix_round_trip_and_key_check():
+    data = "https://example.com/api/v1/scan/packed"
+    matrix = build_matrix(data, "M", 5)
+    packed = pack_matrix(matrix, data, "M", 5)
+    assert len(packed) < matrix.size // 7
+
+    with patch.object(qr_rasterizer, "build_matrix") as build:
+        assert (load_matrix(data, "M", 5, packed) == matrix).all()
+    build.assert_not_called()
+
+    # Built for another url (or encoding): ignored and rebuilt
+    assert (load_matrix(data + "x", "M", 5, packed) == build_matrix(data + "x", "M", 5)).all()
+    assert (load_matrix(data, "L", None, packed) == build_matrix(data)).all()
@@ -0,0 +1,51 @@
+import uuid
+from unittest.mock import patch
+from app.src.services.redirect_cache import RedirectCache, normalize_target_url
+from app.src.services.cache_invalidation import dispatch
+
+def test_normalizes_target_url_once():
+    cache = RedirectCache(max_size=10)
+    qr_uuid = uuid.uuid4()
+
+    assert cache.set(qr_uuid, "example.com") == "https://example.com"
+    assert cache.lookup(qr_uuid) == (True, "https://example.com")
+    assert normalize_target_url("http://example.com") == "http://example.com"
+
+def test_negative_entries():
+    cache = RedirectCache(max_size=10)
+    qr_uuid = uuid.uuid4()
+
+    assert cache.lookup(qr_uuid) == (False, None)
+    cache.set_missing(qr_uuid)
+    assert cache.lookup(qr_uuid) == (True, None)
+
+def test_lru_eviction():
+    cache = RedirectCache(max_size=2)
+    first, second, third = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    cache.set(first, "https://a.com")
+    cache.set(second, "https://b.com")
+    cache.lookup(first)
+    cache.set(third, "https://c.com")
+
+    assert cache.lookup(first)[0]
+    assert not cache.lookup(second)[0]
+    assert cache.lookup(third)[0]
+
+def test_entries_expire():
+    cache = RedirectCache(max_size=10, ttl=60)
+    qr_uuid = uuid.uuid4()
+
+    with patch("app.src.services.redirect_cache.time.monotonic", return_value=1000.0):
+        cache.set(qr_uuid, "https://a.com")
+    with patch("app.src.services.redirect_cache.time.monotonic", return_value=1061.0):
+        assert cache.lookup(qr_uuid) == (False, None)
+
+def test_invalidation_payload_dispatch():
+    from app.src.services.redirect_cache import redirect_cache
+    qr_uuid = uuid.uuid4()
+    redirect_cache.set(qr_uuid, "https://a.com")
+
+    dispatch(f"redirect:{qr_uuid}")
+
+    assert redirect_cache.lookup(qr_uuid) == (False, None)
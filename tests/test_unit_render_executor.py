@@ -0,0 +1,46 @@
+import threading
+import time
+import pytest
+from app.src.services.qr_rasterizer import render_qr_png
+from app.src.services.render_executor import RenderExecutor, RenderPoolSaturated
+
+def test_thread_executor_renders():
+    executor = RenderExecutor(kind="thread", workers=2, max_pending=4)
+    try:
+        png = executor.run(render_qr_png, "https://example.com/api/v1/scan/abc", 120, "#000000")
+        assert png.startswith(b"\x89PNG")
+        assert executor.mode == "thread"
+    finally:
+        executor.shutdown()
+
+def test_process_executor_renders():
+    executor = RenderExecutor(kind="process", workers=1, max_pending=2)
+    try:
+        executor.warm_up()
+        png = executor.run(render_qr_png, "https://example.com/api/v1/scan/abc", 120, "#000000")
+        assert png.startswith(b"\x89PNG")
+        assert executor.mode == "process"
+    finally:
+        executor.shutdown()
+
+def test_saturation_is_rejected_and_slots_are_released():
+    executor = RenderExecutor(kind="thread", workers=1, max_pending=1)
+    release = threading.Event()
+    try:
+        blocked = executor.submit(release.wait, 5)
+        with pytest.raises(RenderPoolSaturated):
+            executor.submit(release.wait, 5)
+
+        release.set()
+        blocked.result(timeout=5)
+        # The slot is released by a done-callback right after the result is published
+        for _ in range(100):
+            try:
+                assert executor.run(len, "abc") == 3
+                break
+            except RenderPoolSaturated:
+                time.sleep(0.01)
+        else:
+            pytest.fail("render slot was never released")
+    finally:
+        executor.shutdown()
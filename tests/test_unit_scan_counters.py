@@ -0,0 +1,45 @@
+import threading
+import uuid
+from unittest.mock import MagicMock
+from app.src.services.scan_counters import ShardedScanCounters
+
+def test_counts_are_pending_until_flushed():
+    session = MagicMock()
+    counters = ShardedScanCounters(session_factory=lambda: session, flush_interval_ms=0, stripes=4, shard_id=3)
+    hot, cold = uuid.uuid4(), uuid.uuid4()
+
+    threads = [threading.Thread(target=lambda: [counters.add(hot) for _ in range(1000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counters.add_many({cold: 2})
+    assert counters.pending(hot) == 8000
+    assert counters.stats()["pending_keys"] == 2
+
+    assert counters.flush() == 2
+    session.execute.assert_called_once()
+    session.commit.assert_called_once()
+    assert counters.pending(hot) == 0
+    assert counters.stats()["merged_scans"] == 8002
+    assert counters.stats()["shard_id"] == 3
+    # Nothing left to merge
+    assert counters.flush() == 0
+    session.execute.assert_called_once()
+
+def test_failed_merge_keeps_the_counts():
+    session = MagicMock()
+    session.execute.side_effect = RuntimeError("db down")
+    counters = ShardedScanCounters(session_factory=lambda: session, flush_interval_ms=0)
+    qr_uuid = uuid.uuid4()
+    counters.add(qr_uuid, 5)
+
+    assert counters.flush() == 0
+    session.rollback.assert_called_once()
+    assert counters.pending(qr_uuid) == 5
+    assert counters.stats()["flush_errors"] == 1
+
+def test_no_merger_thread_when_interval_is_zero():
+    counters = ShardedScanCounters(session_factory=MagicMock(), flush_interval_ms=0)
+    counters.start()
+    assert counters._thread is None
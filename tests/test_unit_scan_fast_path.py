@@ -0,0 +1,86 @@
+import uuid
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.src.handlers.scan_fast_path import ScanFastPathMiddleware
+from app.src.services.geo_resolver import GeoResolver, lookup_geo_info_async
+from app.src.services.redirect_cache import RedirectCache
+
+def make_client():
+    inner = FastAPI()
+
+    @inner.get("/api/v1/scan/{qr_uuid}")
+    def regular(qr_uuid: str):
+        return {"handled_by": "regular"}
+
+    return TestClient(ScanFastPathMiddleware(inner, enabled=True))
+
+def test_cached_scan_is_answered_without_the_app():
+    cache = RedirectCache()
+    qr_uuid = uuid.uuid4()
+    cache.set(qr_uuid, "example.com/a b")
+
+    with patch("app.src.handlers.scan_fast_path.redirect_cache", cache), \
+         patch("app.src.handlers.scan_fast_path.scan_ingestion_queue") as ingestion:
+        ingestion.offer.return_value = True
+        response = make_client().get(
+            f"/api/v1/scan/{qr_uuid}",
+            headers={"X-Forwarded-For": "203.0.113.9, 10.0.0.1"},
+            follow_redirects=False
+        )
+
+    assert response.status_code == 307
+    assert response.headers["location"] == "https://example.com/a%20b"
+    record = ingestion.offer.call_args.args[0]
+    assert (record.qr_uuid, record.ip, record.country) == (qr_uuid, "203.0.113.9", None)
+
+def test_misses_and_full_queue_fall_back_to_the_regular_handler():
+    cache = RedirectCache()
+    cached = uuid.uuid4()
+    cache.set(cached, "https://example.com")
+    missing = uuid.uuid4()
+    cache.set_missing(missing)
+
+    with patch("app.src.handlers.scan_fast_path.redirect_cache", cache), \
+         patch("app.src.handlers.scan_fast_path.scan_ingestion_queue") as ingestion:
+        ingestion.offer.return_value = False
+        client = make_client()
+        for path in (f"/api/v1/scan/{uuid.uuid4()}", f"/api/v1/scan/{missing}", "/api/v1/scan/not-a-uuid", f"/api/v1/scan/{cached}"):
+            assert client.get(path, follow_redirects=False).json() == {"handled_by": "regular"}
+
+    assert cache.stats()["misses"] == 0
+
+def test_inline_geo_mode_without_a_local_database_keeps_the_regular_handler():
+    class RemoteResolver(GeoResolver):
+        remote = True
+
+        def resolve(self, ip):
+            return {"country": "United States", "timezone": "America/Chicago"}
+
+    inner = FastAPI()
+
+    @inner.get("/api/v1/scan/{qr_uuid}")
+    async def regular(qr_uuid: str):
+        # What the scan service stores in inline mode
+        return await lookup_geo_info_async("8.8.8.8")
+
+    cache = RedirectCache()
+    qr_uuid = uuid.uuid4()
+    cache.set(qr_uuid, "https://example.com")
+    config = {"SCAN_FAST_PATH": True, "SCAN_WRITE_BEHIND": True, "GEO_LOOKUP_MODE": "inline", "GEO_DB_PATH": None}
+
+    with patch.multiple("app.src.handlers.scan_fast_path", **config), \
+         patch("app.src.handlers.scan_fast_path.redirect_cache", cache), \
+         patch("app.src.handlers.scan_fast_path.scan_ingestion_queue") as ingestion, \
+         patch("app.src.services.geo_resolver._geo_resolver", RemoteResolver()):
+        ingestion.offer.return_value = True
+        middleware = ScanFastPathMiddleware(inner)
+        response = TestClient(middleware).get(f"/api/v1/scan/{qr_uuid}", follow_redirects=False)
+
+        assert not middleware.enabled
+        assert response.json() == {"country": "United States", "timezone": "America/Chicago"}
+        ingestion.offer.assert_not_called()
+
+        for enabling in ({"GEO_LOOKUP_MODE": "deferred"}, {"GEO_DB_PATH": "geo.db"}):
+            with patch.multiple("app.src.handlers.scan_fast_path", **enabling):
+                assert ScanFastPathMiddleware(inner).enabled
@@ -0,0 +1,125 @@
+import asyncio
+import time
+import uuid
+from unittest.mock import MagicMock, patch
+from app.src.repositories.scan_repository import build_scan_rows, build_scan_statements, country_ids, missing_dimensions, timezone_ids
+from app.src.services.geo_resolver import GeoResolver
+from app.src.services.scan_ingestion import ScanIngestionQueue, ScanRecord
+
+def make_record():
+    return ScanRecord(
+        qr_uuid=uuid.uuid4(),
+        ip="1.2.3.4",
+        country="Argentina",
+        timezone="America/Buenos_Aires",
+        created_at=int(time.time() * 1000)
+    )
+
+def test_flushes_in_batches_on_stop():
+    session_factory = MagicMock()
+    ingestion = ScanIngestionQueue(session_factory=session_factory, max_size=100, batch_size=10)
+
+    with patch("app.src.services.scan_ingestion.ScanRepository") as repo_cls:
+        for _ in range(25):
+            assert ingestion.put(make_record())
+        ingestion.stop(timeout=5)
+
+    flushed = sum(len(call.args[0]) for call in repo_cls.return_value.create_many.call_args_list)
+    assert flushed == 25
+    assert all(len(call.args[0]) <= 10 for call in repo_cls.return_value.create_many.call_args_list)
+
+    stats = ingestion.stats()
+    assert stats["enqueued"] == 25
+    assert stats["flushed"] == 25
+    assert stats["depth"] == 0
+    assert stats["flushes"] >= 3
+
+def test_drop_policy_when_full():
+    ingestion = ScanIngestionQueue(session_factory=MagicMock(), max_size=2, overflow="drop")
+    # Keep the flusher from consuming so the queue fills up
+    ingestion._thread = MagicMock()
+
+    assert ingestion.put(make_record())
+    assert ingestion.put(make_record())
+    assert not ingestion.put(make_record())
+    assert ingestion.stats()["dropped"] == 1
+
+def test_failed_flush_is_counted_and_rolled_back():
+    session = MagicMock()
+    ingestion = ScanIngestionQueue(session_factory=lambda: session, batch_size=5, flush_retries=0)
+
+    with patch("app.src.services.scan_ingestion.ScanRepository") as repo_cls:
+        repo_cls.return_value.create_many.side_effect = RuntimeError("db down")
+        ingestion.put(make_record())
+        ingestion.stop(timeout=5)
+
+    session.rollback.assert_called_once()
+    assert ingestion.stats()["failed"] == 1
+    assert ingestion.stats()["flush_errors"] == 1
+
+def test_failed_flush_is_retried_before_counting_failures():
+    session = MagicMock()
+    ingestion = ScanIngestionQueue(session_factory=lambda: session, batch_size=5, flush_retries=2, retry_backoff_ms=1)
+
+    with patch("app.src.services.scan_ingestion.ScanRepository") as repo_cls:
+        repo_cls.return_value.create_many.side_effect = [RuntimeError("db down"), None]
+        ingestion.put(make_record())
+        ingestion.stop(timeout=5)
+
+    stats = ingestion.stats()
+    assert repo_cls.return_value.create_many.call_count == 2
+    assert (stats["flushed"], stats["failed"], stats["flush_retries"]) == (1, 0, 1)
+
+    ingestion = ScanIngestionQueue(session_factory=lambda: session, batch_size=5, flush_retries=2, retry_backoff_ms=1)
+    with patch("app.src.services.scan_ingestion.ScanRepository") as repo_cls:
+        repo_cls.return_value.create_many.side_effect = RuntimeError("db down")
+        ingestion.put(make_record())
+        ingestion.stop(timeout=5)
+
+    stats = ingestion.stats()
+    assert repo_cls.return_value.create_many.call_count == 3
+    assert (stats["failed"], stats["flush_errors"]) == (1, 3)
+
+def test_request_put_gives_up_when_the_queue_stays_full():
+    ingestion = ScanIngestionQueue(session_factory=MagicMock(), max_size=1, overflow="block", request_timeout_ms=20)
+    ingestion._thread = MagicMock()
+
+    assert asyncio.run(ingestion.put_async(make_record()))
+    started = time.monotonic()
+    assert not asyncio.run(ingestion.put_async(make_record()))
+    assert time.monotonic() - started < 1
+    assert ingestion.stats()["overflowed"] == 1
+    assert ingestion.stats()["dropped"] == 0
+
+def test_deferred_geo_lookups_are_local_and_once_per_ip():
+    class Resolver(GeoResolver):
+        calls = []
+
+        def resolve(self, ip):
+            raise AssertionError("remote lookup from the flusher")
+
+        def resolve_local(self, ip):
+            self.calls.append(ip)
+            return {"country": "Argentina", "timezone": "America/Buenos_Aires"} if ip == "1.2.3.4" else None
+
+    batch = [ScanRecord(uuid.uuid4(), ip, None, None, 1) for ip in ("1.2.3.4", "5.6.7.8", "1.2.3.4", "5.6.7.8")]
+    with patch("app.src.services.geo_resolver._geo_resolver", Resolver()):
+        ScanIngestionQueue._enrich(batch)
+
+    assert sorted(Resolver.calls) == ["1.2.3.4", "5.6.7.8"]
+    assert [record.country for record in batch] == ["Argentina", "Unknown", "Argentina", "Unknown"]
+
+def test_scan_rows_are_dictionary_encoded():
+    countries = {"Argentina": 7}
+    with patch.object(country_ids, "_ids", countries), patch.object(timezone_ids, "_ids", {}):
+        rows = build_scan_rows([make_record(), ScanRecord(uuid.uuid4(), " ::1", None, None, 1)])
+        assert [row["ip"] for row in rows] == ["1.2.3.4", "::1"]
+
+        pending = missing_dimensions(rows)
+        assert pending == [(timezone_ids, ["America/Buenos_Aires"])]
+
+        statement, params = build_scan_statements(rows, {timezone_ids: {"America/Buenos_Aires": 3}})[0]
+        assert [(row["country_id"], row["timezone_id"]) for row in params] == [(7, 3), (None, None)]
+        assert "uuid" not in params[0]
+
+    assert build_scan_rows([ScanRecord(uuid.uuid4(), "testclient", None, None, 1)])[0]["ip"] is None
@@ -0,0 +1,15 @@
+from app.src.services.scan_partitions import add_months, month_of, month_start_ms, parse_bound, partition_bounds
+
+def test_month_arithmetic_wraps_years():
+    assert add_months(2024, 11, 3) == (2025, 2)
+    assert add_months(2024, 1, -1) == (2023, 12)
+    assert month_of(month_start_ms(2024, 2)) == (2024, 2)
+    assert month_of(month_start_ms(2024, 3) - 1) == (2024, 2)
+
+    start, end = partition_bounds(2024, 2)
+    assert (end - start) == 29 * 24 * 60 * 60 * 1000
+
+def test_parse_partition_bounds():
+    assert parse_bound("FOR VALUES FROM ('1704067200000') TO ('1706745600000')") == (1704067200000, 1706745600000)
+    assert parse_bound("FOR VALUES FROM (MINVALUE) TO ('1706745600000')") == (None, 1706745600000)
+    assert parse_bound("DEFAULT") is None